@@ -1,10 +1,13 @@
 import pathlib
+import sys
 
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
-files = pathlib.Path(".").glob("*.csv")
+# The folder can be passed, so that the CSVs written by scaling.py
+# can be plotted as well.
+files = pathlib.Path(sys.argv[1] if len(sys.argv) > 1 else ".").glob("*.csv")
 
 dfs = {}
 
@@ -20,13 +23,17 @@ colors = {
     "getML: FastProp": (0.25, 0.17, 0.51),
     "featuretools": (0.96, 0.60, 0.05),
     "tsfresh": (0.32, 0.71, 0.24),
+    "NumPy: sliding window": (0.12, 0.47, 0.71),
 }
 
+tools = [tool for tool in colors if tool in comparisons.index.get_level_values(1)]
+
+colors = {tool: colors[tool] for tool in tools}
+
 # --------------------------------------------------------------------------
 
 ax = (
-    comparisons.speedup_per_feature.unstack()
-    .iloc[:, [1, 0, 2]]
+    comparisons.normalized_runtime_per_feature.unstack()[tools]
     .plot.bar(color=colors.values())
 )
 
@@ -41,8 +48,7 @@ plt.savefig("nrpf.png")
 fig, axes = plt.subplots(nrows=2)
 
 ax2 = (
-    comparisons.features_per_second.unstack()
-    .iloc[:, [1, 0, 2]]
+    comparisons.features_per_second.unstack()[tools]
     .plot.bar(color=colors.values(), ax=axes[0])
 )
 
@@ -54,12 +60,12 @@ ax2.set_title("Features created per second (higher is better)")
 
 sc_data = comparisons.copy()[["features_per_second", "rsquared"]]
 sc_data.rename(columns={"rsquared": "auc/rsquared"}, inplace=True)
-sc_data["auc/rsquared"]["occupancy"] = comparisons["auc"]["occupancy"].values
+if "occupancy" in dfs:
+    sc_data["auc/rsquared"]["occupancy"] = comparisons["auc"]["occupancy"].values
 
 ax4 = (
     sc_data["auc/rsquared"]
-    .unstack()
-    .iloc[:, [1, 0, 2]]
+    .unstack()[tools]
     .plot.bar(color=colors.values(), ax=axes[1], legend=None)
 )
 
@@ -73,7 +79,7 @@ plt.savefig("fps_performance.png")
 # --------------------------------------------------------------------------
 
 ax5 = (
-    sc_data["auc/rsquared"].unstack().iloc[:, [1, 0, 2]].plot.bar(color=colors.values())
+    sc_data["auc/rsquared"].unstack()[tools].plot.bar(color=colors.values())
 )
 
 ax5.set_ylabel("AUC/Rsquared")
@@ -105,13 +111,13 @@ plt.savefig("auc-rsquared_fps.png")
 
 # --------------------------------------------------------------------------
 
-plt.style.use("seaborn")
+# The style was renamed in matplotlib 3.6.
+plt.style.use("seaborn" if "seaborn" in plt.style.available else "seaborn-v0_8")
 
 fig, axes = plt.subplots(nrows=2)
 
 ax = (
-    comparisons.speedup_per_feature.unstack()
-    .iloc[:, [1, 0, 2]]
+    comparisons.normalized_runtime_per_feature.unstack()[tools]
     .plot.bar(color=colors.values(), ax=axes[0])
 )
 
@@ -121,8 +127,7 @@ ax.set_xticklabels([])
 
 ax4 = (
     sc_data["auc/rsquared"]
-    .unstack()
-    .iloc[:, [1, 0, 2]]
+    .unstack()[tools]
     .plot.bar(color=colors.values(), ax=axes[1], legend=None)
 )
 
@@ -0,0 +1,93 @@
+"""
+Measures how long it takes to import each entry point of utils.
+
+Every entry point is imported in a fresh interpreter, so nothing is
+cached between the measurements, and the fastest of several runs is
+reported. "from utils import *" imports all public names, which is
+what every import used to cost before they were resolved lazily:
+
+    python import_time.py --repeats 5
+"""
+
+import argparse
+import pathlib
+import subprocess
+import sys
+
+import pandas as pd
+
+parent = pathlib.Path(__file__).resolve().parent.parent.as_posix()
+
+ENTRY_POINTS = {
+    "Benchmark": "from utils import Benchmark",
+    "FeatureCache": "from utils import FeatureCache",
+    "FTTimeSeriesBuilder": "from utils import FTTimeSeriesBuilder",
+    "FTTimeSeriesBuilder.agg_primitives": (
+        "from utils import FTTimeSeriesBuilder; FTTimeSeriesBuilder.agg_primitives"
+    ),
+    "TSFreshBuilder": "from utils import TSFreshBuilder",
+    "SlidingWindowBuilder": "from utils import SlidingWindowBuilder",
+    "load_or_query": "from utils import load_or_query",
+    "to_getml": "from utils import to_getml",
+    "all (eager)": "from utils import *",
+}
+
+HEAVY_MODULES = ["featuretools", "tsfresh", "getml", "scipy"]
+
+# --------------------------------------------------------------------------
+
+
+def _script(statement):
+    return (
+        "import sys, time, warnings\n"
+        + "warnings.simplefilter('ignore')\n"
+        + "sys.path.insert(0, "
+        + repr(parent)
+        + ")\n"
+        + "begin = time.perf_counter()\n"
+        + statement
+        + "\n"
+        + "print(time.perf_counter() - begin)\n"
+        + "print(','.join(m for m in "
+        + repr(HEAVY_MODULES)
+        + " if m in sys.modules))\n"
+    )
+
+
+def measure(statement, repeats):
+    """
+    Returns the fastest time it takes to execute statement in a fresh
+    interpreter and the heavy modules it has imported.
+    """
+    samples = []
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _script(statement)],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.splitlines()
+        samples.append(float(output[-2]))
+    return min(samples), output[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = {}
+
+    for name, statement in ENTRY_POINTS.items():
+        print("Importing " + name + "...")
+        seconds, modules = measure(statement, args.repeats)
+        rows[name] = dict(seconds=seconds, heavy_modules=modules)
+
+    result = pd.DataFrame(rows).T
+    result["reduction"] = 1.0 - result["seconds"] / result["seconds"]["all (eager)"]
+
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+"""
+Measures how the runtime, the features per second and the peak memory
+of the feature engines scale with the number of rows, the number of ids,
+the memory window and the number of features.
+
+The data is generated locally, so no network access or downloads are
+needed. Every parameter is swept on its own, while the others are held
+at their first value. Every configuration is written to a CSV file in
+the format of the files in comparisons, so the output folder can be
+plotted with comparisons.py:
+
+    python scaling.py --rows 2000 4000 8000 --ids 10 1 100
+    cd scaling && python ../comparisons/comparisons.py
+
+The featuretools, tsfresh and sliding window builders run by default.
+The sliding window builder aggregates with NumPy and serves as a
+control between FastProp and the pure-Python libraries. FastProp
+requires a locally installed getML engine and runs if you pass
+--engines fastprop featuretools tsfresh sliding_window.
+
+The peak memory is the peak resident set size of this process. It does
+not include worker processes or the getML engine.
+"""
+
+import argparse
+import pathlib
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+parent = pathlib.Path(__file__).resolve().parent.parent.as_posix()
+
+if parent not in sys.path:
+    sys.path.append(parent)
+
+from utils import Benchmark, FTTimeSeriesBuilder, SlidingWindowBuilder, TSFreshBuilder
+
+ENGINES = ["fastprop", "featuretools", "tsfresh", "sliding_window"]
+
+LABELS = {"fastprop": "getML: FastProp", "sliding_window": "NumPy: sliding window"}
+
+NUM_COLUMNS = 4
+
+TRAIN_SHARE = 0.8
+
+# --------------------------------------------------------------------------
+
+
+def make_data(num_rows, num_ids, memory, seed):
+    """
+    Generates num_ids time series with NUM_COLUMNS random walks each,
+    sampled once per second. The target depends on a moving average
+    over the memory window, so the features have something to find.
+    """
+    rng = np.random.default_rng(seed)
+
+    rows_per_id = max(num_rows // num_ids, 2)
+
+    ids = np.repeat(np.arange(num_ids), rows_per_id)
+    steps = np.tile(np.arange(rows_per_id), num_ids)
+
+    data = pd.DataFrame({"id": ids})
+    data["ds"] = pd.to_datetime(steps, unit="s")
+
+    for i in range(NUM_COLUMNS):
+        walk = rng.normal(size=(num_ids, rows_per_id)).cumsum(axis=1)
+        data["x" + str(i)] = walk.ravel()
+
+    moving_average = (
+        data.groupby("id")["x0"]
+        .rolling(memory, min_periods=1)
+        .mean()
+        .to_numpy()
+    )
+
+    data["y"] = moving_average - data["x1"] + rng.normal(size=len(data))
+
+    is_train = steps < int(rows_per_id * TRAIN_SHARE)
+
+    return data[is_train].reset_index(drop=True), data[~is_train].reset_index(drop=True)
+
+
+# --------------------------------------------------------------------------
+
+
+def _to_matrix(features):
+    features = features.select_dtypes(include="number")
+    return features.drop(columns=["id", "y"], errors="ignore").to_numpy(dtype=np.float64)
+
+
+def rsquared(features_train, y_train, features_test, y_test):
+    """
+    Scores the features by fitting a linear regression on the
+    training set and evaluating it on the test set.
+    """
+    x_train = np.column_stack([np.ones(len(features_train)), features_train])
+    x_test = np.column_stack([np.ones(len(features_test)), features_test])
+
+    coefficients, *_ = np.linalg.lstsq(x_train, y_train, rcond=None)
+
+    residuals = y_test - x_test @ coefficients
+    total = y_test - y_test.mean()
+
+    return 1.0 - (residuals @ residuals) / (total @ total)
+
+
+# --------------------------------------------------------------------------
+
+
+def run_featuretools(data_train, data_test, memory, num_features, benchmark):
+    builder = FTTimeSeriesBuilder(
+        num_features=num_features,
+        horizon=pd.Timedelta(seconds=0),
+        memory=pd.Timedelta(seconds=memory),
+        column_id="id",
+        time_stamp="ds",
+        target="y",
+    )
+
+    with benchmark("featuretools"):
+        features_train = builder.fit(data_train)
+
+    features_test = builder.transform(data_test)
+
+    return (
+        len(builder.selected_features),
+        _to_matrix(features_train),
+        _to_matrix(features_test),
+    )
+
+
+def run_tsfresh(data_train, data_test, memory, num_features, benchmark):
+    builder = TSFreshBuilder(
+        num_features=num_features,
+        memory=memory,
+        column_id="id",
+        time_stamp="ds",
+        target="y",
+    )
+
+    with benchmark("tsfresh"):
+        features_train = builder.fit(data_train)
+
+    features_test = builder.transform(data_test)
+
+    builder.close()
+
+    return (
+        len(builder.selected_features),
+        _to_matrix(features_train),
+        _to_matrix(features_test),
+    )
+
+
+def run_sliding_window(data_train, data_test, memory, num_features, benchmark):
+    builder = SlidingWindowBuilder(
+        num_features=num_features,
+        horizon=pd.Timedelta(seconds=0),
+        memory=pd.Timedelta(seconds=memory),
+        column_id="id",
+        time_stamp="ds",
+        target="y",
+    )
+
+    with benchmark("sliding_window"):
+        features_train = builder.fit(data_train)
+
+    features_test = builder.transform(data_test)
+
+    return (
+        len(builder.selected_features),
+        _to_matrix(features_train),
+        _to_matrix(features_test),
+    )
+
+
+def run_fastprop(data_train, data_test, memory, num_features, benchmark):
+    import getml
+
+    roles = {
+        getml.data.roles.target: ["y"],
+        getml.data.roles.join_key: ["id"],
+        getml.data.roles.time_stamp: ["ds"],
+        getml.data.roles.numerical: ["x" + str(i) for i in range(NUM_COLUMNS)],
+    }
+
+    data_all = getml.data.DataFrame.from_pandas(
+        pd.concat([data_train, data_test], ignore_index=True), "data_all", roles=roles
+    )
+
+    split = getml.data.split.time(
+        data_all, "ds", test=np.datetime64(data_test["ds"].min())
+    )
+
+    time_series = getml.data.TimeSeries(
+        population=data_all,
+        split=split,
+        time_stamps="ds",
+        on="id",
+        lagged_targets=False,
+        memory=getml.data.time.seconds(memory),
+    )
+
+    fast_prop = getml.feature_learning.FastProp(
+        loss_function=getml.feature_learning.loss_functions.SquareLoss,
+        num_features=num_features,
+    )
+
+    pipe = getml.pipeline.Pipeline(
+        data_model=time_series.data_model,
+        feature_learners=[fast_prop],
+    )
+
+    with benchmark("fastprop"):
+        pipe.fit(time_series.train)
+        features_train = pipe.transform(time_series.train)
+
+    features_test = pipe.transform(time_series.test)
+
+    return features_train.shape[1], features_train, features_test
+
+
+RUNNERS = {
+    "fastprop": run_fastprop,
+    "featuretools": run_featuretools,
+    "tsfresh": run_tsfresh,
+    "sliding_window": run_sliding_window,
+}
+
+# --------------------------------------------------------------------------
+
+
+def make_configurations(args):
+    """
+    Sweeps every parameter on its own, holding the others
+    at their first value.
+    """
+    sweeps = dict(
+        rows=args.rows,
+        ids=args.ids,
+        memory=args.memory,
+        num_features=args.num_features,
+    )
+
+    base = {name: values[0] for name, values in sweeps.items()}
+
+    configurations = []
+
+    for name, values in sweeps.items():
+        for value in values:
+            configuration = dict(base, **{name: value})
+            if configuration not in configurations:
+                configurations.append(configuration)
+
+    return configurations
+
+
+def run_configuration(configuration, engines, repeats, seed):
+    data_train, data_test = make_data(
+        configuration["rows"],
+        configuration["ids"],
+        configuration["memory"],
+        seed,
+    )
+
+    benchmark = Benchmark()
+
+    num_features = {}
+    scores = {}
+
+    for engine in engines:
+        for _ in range(repeats):
+            num_features[engine], features_train, features_test = RUNNERS[engine](
+                data_train,
+                data_test,
+                configuration["memory"],
+                configuration["num_features"],
+                benchmark,
+            )
+
+        scores[engine] = rsquared(
+            features_train,
+            data_train["y"].to_numpy(),
+            features_test,
+            data_test["y"].to_numpy(),
+        )
+
+    return benchmark.to_comparison(
+        num_features,
+        labels=LABELS,
+        extended=True,
+        rsquared=scores,
+    )
+
+
+def _file_name(configuration):
+    return (
+        "-".join(name + "_" + str(value) for name, value in configuration.items())
+        + ".csv"
+    )
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+
+    parser.add_argument("--rows", type=int, nargs="+", default=[2000, 4000, 8000])
+    parser.add_argument("--ids", type=int, nargs="+", default=[10, 1, 100])
+    parser.add_argument("--memory", type=int, nargs="+", default=[15, 30, 60])
+    parser.add_argument(
+        "--num-features", type=int, nargs="+", default=[50, 100, 200]
+    )
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=ENGINES,
+        default=["featuretools", "tsfresh", "sliding_window"],
+    )
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="scaling")
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    output = pathlib.Path(args.output)
+    output.mkdir(parents=True, exist_ok=True)
+
+    configurations = make_configurations(args)
+
+    for i, configuration in enumerate(configurations):
+        print(
+            "Configuration "
+            + str(i + 1)
+            + " of "
+            + str(len(configurations))
+            + ": "
+            + str(configuration)
+        )
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            comparison = run_configuration(
+                configuration, args.engines, args.repeats, args.seed
+            )
+
+        print(comparison)
+
+        comparison.to_csv(output / _file_name(configuration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Compares fitting on a sample of the rows (selection_sample) with
+fitting on all of them.
+
+For every builder, sampling method and sample fraction, fit is timed
+and the selected features are compared with the ones selected on all
+rows: the overlap is the share of the fully selected features that the
+sample has found as well. The R-squared of a linear regression on the
+selected features shows whether the features that were swapped are
+worse:
+
+    python selection_sample.py --rows 20000 --ids 10 --fractions 0.1 0.25 0.5
+"""
+
+import argparse
+import time
+import warnings
+
+import pandas as pd
+
+from scaling import _to_matrix, make_data, rsquared
+from utils import FTTimeSeriesBuilder, TSFreshBuilder
+
+BUILDERS = ["featuretools", "tsfresh"]
+
+# --------------------------------------------------------------------------
+
+
+def make_builder(name, memory, num_features, **kwargs):
+    if name == "featuretools":
+        return FTTimeSeriesBuilder(
+            num_features=num_features,
+            horizon=pd.Timedelta(seconds=0),
+            memory=pd.Timedelta(seconds=memory),
+            column_id="id",
+            time_stamp="ds",
+            target="y",
+            **kwargs,
+        )
+    return TSFreshBuilder(
+        num_features=num_features,
+        memory=memory,
+        column_id="id",
+        time_stamp="ds",
+        target="y",
+        n_jobs=0,
+        **kwargs,
+    )
+
+
+def evaluate(builder, data_train, data_test):
+    """
+    Fits the builder and returns the seconds fit took,
+    the selected features and the R-squared.
+    """
+    begin = time.perf_counter()
+    features_train = builder.fit(data_train)
+    seconds = time.perf_counter() - begin
+    features_test = builder.transform(data_test)
+    score = rsquared(
+        _to_matrix(features_train),
+        data_train["y"].to_numpy(),
+        _to_matrix(features_test),
+        data_test["y"].to_numpy(),
+    )
+    return seconds, set(builder.selected_features), score
+
+
+def compare(name, data_train, data_test, args):
+    print("Fitting " + name + " on all rows...")
+    full_seconds, full_selected, full_score = evaluate(
+        make_builder(name, args.memory, args.num_features), data_train, data_test
+    )
+
+    rows = {
+        (name, "all rows", 1.0): dict(
+            seconds=full_seconds, speedup=1.0, overlap=1.0, rsquared=full_score
+        )
+    }
+
+    for sampling in args.samplings:
+        for fraction in args.fractions:
+            print(
+                "Fitting "
+                + name
+                + " on a "
+                + sampling
+                + " sample of "
+                + str(fraction)
+                + "..."
+            )
+            seconds, selected, score = evaluate(
+                make_builder(
+                    name,
+                    args.memory,
+                    args.num_features,
+                    selection_sample=fraction,
+                    sampling=sampling,
+                ),
+                data_train,
+                data_test,
+            )
+            rows[(name, sampling, fraction)] = dict(
+                seconds=seconds,
+                speedup=full_seconds / seconds,
+                overlap=len(selected & full_selected) / max(len(full_selected), 1),
+                rsquared=score,
+            )
+
+    return rows
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--ids", type=int, default=10)
+    parser.add_argument("--memory", type=int, default=15)
+    parser.add_argument("--num-features", type=int, default=50)
+    parser.add_argument(
+        "--fractions", type=float, nargs="+", default=[0.1, 0.25, 0.5]
+    )
+    parser.add_argument(
+        "--samplings",
+        nargs="+",
+        choices=["stratified", "time_blocked"],
+        default=["stratified", "time_blocked"],
+    )
+    parser.add_argument("--builders", nargs="+", choices=BUILDERS, default=BUILDERS)
+    parser.add_argument("--seed", type=int, default=0)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    data_train, data_test = make_data(args.rows, args.ids, args.memory, args.seed)
+
+    rows = {}
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for name in args.builders:
+            rows.update(compare(name, data_train, data_test, args))
+
+    result = pd.DataFrame(rows).T
+    result.index.names = ["builder", "sampling", "fraction"]
+
+    print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Compares the original two-pass tsfresh extraction (one pool for rolling,
+one extract_features call per settings object) with the single-pass
+extraction of TSFreshBuilder, which shares one worker pool between
+rolling and extraction, on the robot and occupancy data sets.
+
+Run from the fastprop_benchmark folder:
+
+    python tsfresh_single_pass.py
+"""
+
+import pathlib
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+import tsfresh
+from tsfresh.feature_extraction.settings import (
+    IndexBasedFCParameters,
+    MinimalFCParameters,
+)
+from tsfresh.utilities.dataframe_functions import roll_time_series
+
+parent = pathlib.Path(__file__).resolve().parent.parent.as_posix()
+
+if parent not in sys.path:
+    sys.path.append(parent)
+
+from utils import Benchmark, TSFreshBuilder
+
+N_JOBS = tsfresh.defaults.N_PROCESSES
+
+NUM_RUNS = 3
+
+# --------------------------------------------------------------------------
+
+
+def load_robot():
+    only_use = ["30", "34", "37", "38", "4", "59", "61", "7", "77", "78"]
+    data = pd.read_csv("https://static.getml.com/datasets/robotarm/robot-demo.csv")
+    data = data[only_use][:10500]
+    data["id"] = 1
+    data["ds"] = pd.to_datetime(np.arange(0, data.shape[0]), unit="s")
+    return data
+
+
+def load_occupancy():
+    data = pd.read_csv(
+        "https://static.getml.com/datasets/v1/occupancy/preprocessed/"
+        + "occupancy_population_train.csv"
+    )
+    data["date"] = pd.to_datetime(data["date"])
+    data = data.select_dtypes(include=["number", "datetime"])
+    del data["Occupancy"]
+    data["id"] = 1
+    return data
+
+
+# --------------------------------------------------------------------------
+
+
+def extract_two_pass(data_frame, column_id, time_stamp, memory):
+    df_rolled = roll_time_series(
+        data_frame,
+        column_id=column_id,
+        column_sort=time_stamp,
+        max_timeshift=memory,
+        n_jobs=N_JOBS,
+    )
+
+    extracted_minimal = tsfresh.extract_features(
+        df_rolled,
+        column_id=column_id,
+        column_sort=time_stamp,
+        default_fc_parameters=MinimalFCParameters(),
+        n_jobs=N_JOBS,
+    )
+
+    extracted_index_based = tsfresh.extract_features(
+        df_rolled,
+        column_id=column_id,
+        column_sort=time_stamp,
+        default_fc_parameters=IndexBasedFCParameters(),
+        n_jobs=N_JOBS,
+    )
+
+    return pd.concat([extracted_minimal, extracted_index_based], axis=1)
+
+
+# --------------------------------------------------------------------------
+
+data_sets = {
+    "robot": (load_robot(), "ds"),
+    "occupancy": (load_occupancy(), "date"),
+}
+
+benchmark = Benchmark()
+
+results = {}
+
+for name, (data, time_stamp) in data_sets.items():
+    builder = TSFreshBuilder(
+        num_features=200,
+        memory=15,
+        column_id="id",
+        time_stamp=time_stamp,
+        target=None,
+        n_jobs=N_JOBS,
+    )
+
+    with builder, warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        for _ in range(NUM_RUNS):
+            with benchmark(name + "_two_pass"):
+                two_pass = extract_two_pass(data, "id", time_stamp, 15)
+
+            with benchmark(name + "_single_pass"):
+                single_pass = builder._extract_features(data)
+
+    two_pass[np.isnan(two_pass)] = 0.0
+    two_pass[np.isinf(two_pass)] = 0.0
+    pd.testing.assert_frame_equal(two_pass, single_pass)
+
+    results[name] = dict(
+        two_pass=benchmark.runtimes[name + "_two_pass"],
+        single_pass=benchmark.runtimes[name + "_single_pass"],
+    )
+
+comparison = pd.DataFrame(results).T
+comparison["speedup"] = comparison.two_pass / comparison.single_pass
+
+print(comparison)
+
+comparison.to_csv("tsfresh_single_pass.csv")
@@ -0,0 +1,37 @@
+import pathlib
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, pathlib.Path(__file__).resolve().parent.parent.as_posix())
+
+
+@pytest.fixture(autouse=True)
+def _hide_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def make_data(num_ids=4, rows_per_id=40, seed=0):
+    """
+    Generates num_ids random walks sampled once per second, with a
+    target that depends on the recent past of x0.
+    """
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame(
+        {
+            "id": np.repeat(np.arange(num_ids), rows_per_id),
+            "ds": pd.to_datetime(np.tile(np.arange(rows_per_id), num_ids), unit="s"),
+            "x0": rng.normal(size=num_ids * rows_per_id).cumsum(),
+            "x1": rng.normal(size=num_ids * rows_per_id),
+        }
+    )
+    data["y"] = (
+        data.groupby("id")["x0"].rolling(5, min_periods=1).mean().to_numpy()
+        + rng.normal(size=len(data))
+    )
+    return data
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_data
+from utils.add_original_columns import OUTPUTS, _add_original_columns
+
+
+def _features_in_featuretools_order(data):
+    # featuretools returns the rows sorted by time stamp and
+    # _featuretools_index, so the ids are interleaved.
+    positions = np.lexsort((np.arange(len(data)), data["ds"].to_numpy()))
+    return pd.DataFrame(
+        {
+            "id_of_row": data["id"].to_numpy()[positions],
+            "y_of_row": data["y"].to_numpy()[positions],
+            "x0": np.zeros(len(data)),
+        },
+        index=pd.Index(positions, name="_featuretools_index"),
+    )
+
+
+def _to_pandas(result):
+    if isinstance(result, dict):
+        return pd.DataFrame(result)
+    if isinstance(result, pd.DataFrame):
+        return result
+    return result.to_pandas()
+
+
+@pytest.mark.parametrize("output", OUTPUTS)
+@pytest.mark.parametrize("original_index", [None, "shifted"])
+def test_rows_match_their_features(output, original_index):
+    data = make_data(num_ids=3, rows_per_id=5)
+    if original_index == "shifted":
+        data.index = data.index + 100
+    df_selected = _features_in_featuretools_order(data)
+
+    result = _to_pandas(_add_original_columns(data, df_selected, output))
+
+    assert list(result.columns) == ["id_of_row", "y_of_row", "x0", "id", "ds", "x1", "y"]
+    np.testing.assert_array_equal(result["id"], result["id_of_row"])
+    np.testing.assert_array_equal(result["y"], result["y_of_row"])
+    # x0 exists in both, the original column replaces the feature.
+    np.testing.assert_array_equal(
+        np.sort(result["x0"].to_numpy()), np.sort(data["x0"].to_numpy())
+    )
+    np.testing.assert_array_equal(
+        result.set_index(["id", "ds"])["x0"].loc[data.set_index(["id", "ds"]).index],
+        data["x0"],
+    )
+    if output == "pandas":
+        pd.testing.assert_index_equal(result.index, df_selected.index)
+
+
+def test_rows_without_featuretools_index_are_matched_by_position():
+    data = make_data(num_ids=2, rows_per_id=3)
+    df_selected = pd.DataFrame(
+        {"y_of_row": data["y"].to_numpy()},
+        index=pd.MultiIndex.from_arrays([data["id"], data["ds"]]),
+    )
+
+    result = _add_original_columns(data, df_selected)
+
+    pd.testing.assert_index_equal(result.index, df_selected.index)
+    np.testing.assert_array_equal(result["y"], result["y_of_row"])
+
+
+def test_raises_if_the_lengths_differ():
+    data = make_data(num_ids=1, rows_per_id=3)
+    with pytest.raises(ValueError):
+        _add_original_columns(data, pd.DataFrame(index=pd.RangeIndex(2)))
@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from utils import Benchmark
+from utils.benchmark import _peak_rss, _reset_peak_rss
+from utils.stage_profiler import _StageProfiler
+
+
+def test_repeat_passes_positional_arguments_to_func():
+    benchmark = Benchmark(memory=None)
+    calls = []
+
+    def func(*args, **kwargs):
+        calls.append((args, kwargs))
+        return len(calls)
+
+    assert benchmark.repeat("func", func, 1, 2, repeats=3, key="value") == 3
+    assert calls == [((1, 2), {"key": "value"})] * 3
+    assert len(benchmark._data["runtimes"]["func"]) == 3
+
+
+def _allocate(num_bytes):
+    # Writing to the pages makes them resident.
+    block = np.ones(num_bytes // 8)
+    del block
+
+
+@pytest.mark.skipif(not _reset_peak_rss(), reason="The peak cannot be reset.")
+def test_stages_do_not_hide_the_peak_of_the_benchmark():
+    num_bytes = 200 * 2**20
+    benchmark = Benchmark(memory="rss")
+    profiler = _StageProfiler()
+    _reset_peak_rss()
+    resident = _peak_rss()
+
+    with benchmark("outer"):
+        _allocate(num_bytes)
+        with profiler.stage("inner"):
+            pass
+        with profiler.stage("inner"):
+            with profiler.stage("nested"):
+                _allocate(num_bytes // 2)
+
+    outer = benchmark.peak_memory["outer"]
+    inner = profiler.stages["inner"]["peak_memory"]
+    nested = profiler.stages["nested"]["peak_memory"]
+
+    assert outer >= resident + num_bytes * 0.9
+    assert nested <= inner < outer - num_bytes // 4
+    assert nested >= num_bytes // 2
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.choose_primitives import _choose_primitives
+
+
+def _make_costs(**primitives):
+    """
+    Takes (num_features, seconds) per primitive, the estimated seconds
+    are ten times the measured ones.
+    """
+    costs = {}
+    for name, (num_features, seconds) in primitives.items():
+        costs[name] = dict(
+            num_features=num_features,
+            seconds=seconds,
+            features_per_second=num_features / seconds if seconds else np.nan,
+            estimated_seconds=seconds * 10.0,
+            error=None,
+        )
+    return pd.DataFrame.from_dict(costs, orient="index")
+
+
+def test_without_budget_all_usable_primitives_are_chosen():
+    costs = _make_costs(
+        mean=(4, 1.0), std=(4, 1.0), count=(2, 1.0), last=(0, 1.0), slow=(1, 100.0)
+    )
+    costs.loc["failing"] = dict(
+        num_features=0, seconds=np.nan, features_per_second=np.nan,
+        estimated_seconds=np.nan, error="ValueError()",
+    )
+
+    chosen, statuses = _choose_primitives(costs)
+
+    # Ties are broken by name.
+    assert chosen == ["mean", "std", "count"]
+    assert statuses["status"].to_dict() == {
+        "mean": "chosen",
+        "std": "chosen",
+        "count": "chosen",
+        "last": "no features",
+        "slow": "pathological",
+        "failing": "failed",
+    }
+    assert "status" not in costs
+
+
+@pytest.mark.parametrize(
+    "time_budget, expected",
+    [(100.0, ["max", "mean", "count"]), (35.0, ["max", "mean"]), (1.0, ["max"])],
+)
+def test_budget_keeps_the_most_features_per_second(time_budget, expected):
+    costs = _make_costs(count=(2, 1.0), mean=(4, 1.0), max=(8, 2.0))
+
+    chosen, statuses = _choose_primitives(costs, time_budget)
+
+    assert chosen == expected
+    assert (statuses["status"] == "chosen").sum() == len(expected)
+    assert (statuses["status"] == "over budget").sum() == 3 - len(expected)
+
+
+def test_primitives_are_ranked_by_their_cost_per_feature():
+    # first took no measurable time, so it has no features per second,
+    # but is the cheapest. many builds many features, which is just as
+    # expensive as a single feature of single.
+    costs = _make_costs(single=(1, 1.0), many=(10, 10.0), first=(1, 0.0), slow=(1, 2.0))
+
+    chosen, statuses = _choose_primitives(costs, time_budget=115.0)
+
+    assert chosen == ["first", "many", "single"]
+    assert statuses.loc["slow", "status"] == "over budget"
+    assert statuses["seconds_per_feature"].to_dict() == {
+        "single": 10.0, "many": 10.0, "first": 0.0, "slow": 20.0
+    }
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import pearsonr
+
+from utils.correlate_columns import _correlate_columns
+from utils.rank_by_correlation import _rank_by_correlation
+
+
+def _make_columns(num_rows=300, seed=0):
+    """
+    Random columns, one of them constant, two of them identical,
+    one boolean and two containing NaN or inf.
+    """
+    rng = np.random.default_rng(seed)
+    data_frame = pd.DataFrame(
+        rng.normal(size=(num_rows, 20)), columns=["x" + str(i) for i in range(20)]
+    )
+    data_frame["constant"] = 3.0
+    data_frame["copy"] = data_frame["x3"]
+    data_frame["positive"] = data_frame["x0"] > 0
+    data_frame.loc[5, "x7"] = np.nan
+    data_frame.loc[9, "x8"] = np.inf
+    target = data_frame["x0"] * 0.3 - data_frame["x3"] * 0.2 + rng.normal(size=num_rows)
+    return data_frame, target.to_numpy()
+
+
+def _pearsonr(data_frame, target):
+    return np.array(
+        [
+            np.abs(pearsonr(target, data_frame[col].astype(float))[0])
+            if np.isfinite(data_frame[col].astype(float)).all()
+            and data_frame[col].nunique() > 1
+            else np.nan
+            for col in data_frame.columns
+        ]
+    )
+
+
+def test_matches_pearsonr_and_var():
+    data_frame, target = _make_columns()
+
+    correlations, variances = _correlate_columns(data_frame, target, block_size=7)
+
+    expected = _pearsonr(data_frame, target)
+    np.testing.assert_array_equal(np.isnan(correlations), np.isnan(expected))
+    np.testing.assert_allclose(
+        correlations[~np.isnan(expected)], expected[~np.isnan(expected)], atol=1e-12
+    )
+    np.testing.assert_array_equal(
+        variances > 0.0,
+        [np.var(data_frame[col].to_numpy(dtype=float)) > 0.0 for col in data_frame],
+    )
+
+
+def test_ranking_matches_pearsonr():
+    # Ties may be broken either way, so there are none.
+    data_frame, target = _make_columns()
+    data_frame = data_frame.drop(columns="copy")
+
+    expected = _pearsonr(data_frame, target)
+    colnames = np.asarray(data_frame.columns)[data_frame.nunique().to_numpy() > 1]
+    expected = np.nan_to_num(expected[data_frame.nunique().to_numpy() > 1])
+
+    np.testing.assert_array_equal(
+        _rank_by_correlation(data_frame, target, 10),
+        colnames[np.argsort(expected)][::-1][:10],
+    )
+
+
+def test_identical_columns_have_identical_correlations():
+    data_frame, target = _make_columns(num_rows=1001)
+    for i in range(12):
+        data_frame["copy" + str(i)] = data_frame["x3"]
+
+    for block_size in [None, 5]:
+        correlations, _ = _correlate_columns(data_frame, target, block_size=block_size)
+        copies = correlations[data_frame.columns.str.startswith("copy")]
+        assert (copies == correlations[data_frame.columns.get_loc("x3")]).all()
+
+
+def test_ranking_breaks_ties_by_the_order_of_the_columns():
+    # Without a stable sort, the order of the ties would
+    # depend on the other columns, so several seeds are tried.
+    for seed in range(10):
+        data_frame, target = _make_columns(seed=seed)
+        colnames = list(data_frame.columns)
+        colnames.insert(seed, colnames.pop(colnames.index("copy")))
+
+        ranking = list(_rank_by_correlation(data_frame[colnames], target, len(colnames)))
+
+        first, second = sorted(["x3", "copy"], key=colnames.index)
+        assert ranking.index(second) == ranking.index(first) + 1
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_data
+from utils.draw_selection_sample import (
+    BLOCK_ROWS,
+    _draw_selection_sample,
+    _sample_size,
+)
+
+
+def test_sample_size_is_a_fraction_or_a_number_of_rows():
+    assert _sample_size(0.25, 100) == 25
+    assert _sample_size(0.001, 100) == 1
+    assert _sample_size(1.0, 100) == 100
+    assert _sample_size(30, 100) == 30
+    assert _sample_size(300, 100) == 100
+
+
+def test_stratified_sample_draws_the_same_share_of_every_id():
+    data = make_data(num_ids=4, rows_per_id=40).sample(frac=1, random_state=0)
+    data = pd.concat([data, make_data(num_ids=1, rows_per_id=20).assign(id=9)])
+
+    rows = _draw_selection_sample(data, "id", "ds", 0.25, "stratified")
+
+    assert np.all(np.diff(rows) > 0)
+    counts = data["id"].iloc[rows].value_counts().sort_index()
+    assert counts.to_dict() == {0: 10, 1: 10, 2: 10, 3: 10, 9: 5}
+    np.testing.assert_array_equal(
+        rows, _draw_selection_sample(data, "id", "ds", 0.25, "stratified")
+    )
+    assert not np.array_equal(
+        rows, _draw_selection_sample(data, "id", "ds", 0.25, "stratified", seed=1)
+    )
+
+
+def test_time_blocked_sample_draws_whole_blocks():
+    data = make_data(num_ids=3, rows_per_id=2 * BLOCK_ROWS + 10)
+    shuffled = data.sample(frac=1, random_state=0).reset_index(drop=True)
+
+    rows = _draw_selection_sample(shuffled, "id", "ds", 2 * BLOCK_ROWS, "time_blocked")
+
+    assert np.all(np.diff(rows) > 0)
+    sampled = shuffled.iloc[rows]
+    blocks = sampled.groupby(
+        [sampled["id"], (sampled["ds"] - pd.Timestamp(0)).dt.total_seconds() // BLOCK_ROWS]
+    ).size()
+    # Every block is complete, the last one of an id is shorter.
+    assert set(blocks) <= {BLOCK_ROWS, 10}
+    # Blocks are drawn until the sample is large enough, so
+    # it exceeds the requested size by less than a block.
+    assert 2 * BLOCK_ROWS <= blocks.sum() < 3 * BLOCK_ROWS
+
+
+@pytest.mark.parametrize("sampling", ["stratified", "time_blocked"])
+def test_sample_of_all_rows_is_all_rows(sampling):
+    data = make_data(num_ids=2, rows_per_id=10)
+    np.testing.assert_array_equal(
+        _draw_selection_sample(data, "id", "ds", 1.0, sampling), np.arange(20)
+    )
@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from conftest import make_data
+from utils import FeatureCache, FTTimeSeriesBuilder, TSFreshBuilder
+
+
+def _make_builder(name, cache):
+    if name == "featuretools":
+        return FTTimeSeriesBuilder(
+            num_features=5,
+            horizon=pd.Timedelta(seconds=0),
+            memory=pd.Timedelta(seconds=5),
+            column_id="id",
+            time_stamp="ds",
+            target="y",
+            cache=cache,
+        )
+    return TSFreshBuilder(
+        num_features=5,
+        memory=5,
+        column_id="id",
+        time_stamp="ds",
+        target="y",
+        n_jobs=0,
+        cache=cache,
+    )
+
+
+@pytest.mark.parametrize("name", ["featuretools", "tsfresh"])
+def test_hit_matches_miss(name, tmp_path):
+    data = make_data(num_ids=2, rows_per_id=30)
+
+    missed = _make_builder(name, FeatureCache(tmp_path))
+    features_missed = missed.fit(data)
+
+    hit = _make_builder(name, FeatureCache(tmp_path))
+    features_hit = hit.fit(data)
+
+    uncached = _make_builder(name, None)
+    features_uncached = uncached.fit(data)
+
+    assert (missed.cache_hits, missed.cache_misses) == (0, 1)
+    assert (hit.cache_hits, hit.cache_misses) == (1, 0)
+    assert list(hit.selected_features) == list(missed.selected_features)
+    pd.testing.assert_frame_equal(features_hit, features_missed)
+    pd.testing.assert_series_equal(hit.replaced_values, missed.replaced_values)
+
+    # TIME_SINCE depends on when the features were calculated.
+    colnames = [col for col in features_hit.columns if "TIME_SINCE" not in col]
+    pd.testing.assert_frame_equal(features_hit[colnames], features_uncached[colnames])
+
+
+def test_concurrent_writers_of_the_same_key(tmp_path):
+    cache = FeatureCache(tmp_path)
+    matrix = make_data(num_ids=2, rows_per_id=1000)
+
+    def put(i):
+        cache.put("key", matrix, {"writer": 0})
+        cached, meta = cache.get("key")
+        pd.testing.assert_frame_equal(cached, matrix)
+        assert meta == {"writer": 0}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(put, range(32)))
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["key.json", "key.parquet"]
+
+
+def test_failed_write_leaves_no_files(tmp_path):
+    cache = FeatureCache(tmp_path)
+
+    with pytest.raises(TypeError):
+        cache.put("key", make_data(num_ids=1, rows_per_id=10), {"unserializable": object()})
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,269 @@
+import featuretools as ft
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_data
+from utils import FTTimeSeriesBuilder
+from utils.ft_time_series_builder import (
+    _concat_feature_matrices,
+    _infer_logical_types,
+    _make_shards,
+)
+from utils.roll_data_frame import _find_windows
+from utils.sanitize_features import _sanitize_features
+from utils.stage_profiler import _StageProfiler
+
+
+def _builder(**kwargs):
+    return FTTimeSeriesBuilder(
+        num_features=10,
+        horizon=pd.Timedelta(seconds=0),
+        memory=pd.Timedelta(seconds=5),
+        column_id="id",
+        time_stamp="ds",
+        target="y",
+        **kwargs,
+    )
+
+
+def test_transform_without_selected_features_extracts_nothing(monkeypatch):
+    data = make_data(num_ids=2)
+    builder = _builder()
+    builder.selected_features = []
+    builder.feature_definitions = []
+    builder.fitted = True
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("Nothing should be extracted.")
+
+    monkeypatch.setattr(builder, "_extract_features", _fail)
+    monkeypatch.setattr(builder, "_extract_rows", _fail)
+
+    pd.testing.assert_frame_equal(
+        builder.transform(data), data, check_index_type=False, check_names=False
+    )
+    pd.testing.assert_frame_equal(builder.partial_transform(data), data)
+
+
+def _with_step(seed):
+    # Every row knows its own position, so MAX(peripheral.step) over a
+    # window without a horizon is the step of the row the window ends at.
+    data = make_data(num_ids=3, rows_per_id=20, seed=seed)
+    data["step"] = np.arange(len(data), dtype=float)
+    data["y"] = data["step"]
+    return data
+
+
+@pytest.mark.parametrize("max_rows_per_batch", [None, 40])
+def test_features_belong_to_their_rows(max_rows_per_batch):
+    data = _with_step(0).sample(frac=1, random_state=0)
+    builder = _builder(max_rows_per_batch=max_rows_per_batch)
+
+    features = builder.fit(data)
+
+    assert "MAX(peripheral.step)" in builder.selected_features
+    np.testing.assert_array_equal(features["y"], data["y"])
+    np.testing.assert_array_equal(features["id"], data["id"])
+    np.testing.assert_array_equal(features["MAX(peripheral.step)"], data["step"])
+
+    data = _with_step(1).sample(frac=1, random_state=1)
+    features = builder.transform(data)
+
+    np.testing.assert_array_equal(features["id"], data["id"])
+    np.testing.assert_array_equal(features["MAX(peripheral.step)"], data["step"])
+
+
+def _without_time_since(features):
+    # TIME_SINCE depends on when the features were calculated.
+    return features[[col for col in features.columns if "TIME_SINCE" not in col]]
+
+
+def test_partial_transform_matches_transform():
+    builder = _builder()
+    builder.fit(make_data(num_ids=2, rows_per_id=30))
+
+    # The rows of every id arrive in the order of their time stamps, in small batches.
+    data = make_data(num_ids=2, rows_per_id=30, seed=1)
+    expected = builder.transform(data)
+
+    partial = pd.concat(
+        [builder.partial_transform(data.iloc[i : i + 5]) for i in range(0, len(data), 5)]
+    )
+
+    pd.testing.assert_frame_equal(
+        _without_time_since(partial).reset_index(drop=True),
+        _without_time_since(expected).reset_index(drop=True),
+        check_dtype=False,
+        check_categorical=False,
+    )
+
+
+def test_fit_many_matches_separate_fits():
+    data = make_data(num_ids=2, rows_per_id=30)
+    data["z"] = data.groupby("id")["y"].shift(-3).fillna(0.0)
+    pairs = [
+        ("y", pd.Timedelta(seconds=0)),
+        ("z", pd.Timedelta(seconds=0)),
+        ("y", pd.Timedelta(seconds=2)),
+    ]
+
+    builders, features = _builder().fit_many(data, pairs)
+
+    for target, horizon in pairs:
+        other = "z" if target == "y" else "y"
+        expected_builder = FTTimeSeriesBuilder(
+            num_features=10,
+            horizon=horizon,
+            memory=pd.Timedelta(seconds=5),
+            column_id="id",
+            time_stamp="ds",
+            target=target,
+        )
+        expected = expected_builder.fit(data.drop(columns=other))
+        builder = builders[(target, horizon)]
+        assert list(builder.selected_features) == list(expected_builder.selected_features)
+        pd.testing.assert_frame_equal(
+            _without_time_since(features[(target, horizon)]).drop(columns=other),
+            _without_time_since(expected),
+        )
+
+
+def test_rows_without_any_rolled_rows_match_all_rows():
+    # The first ten rows of every id have no rows ten seconds before them.
+    data = make_data(num_ids=2, rows_per_id=20).drop(columns="y")
+    builder = _builder()
+    builder.horizon = pd.Timedelta(seconds=10)
+    builder._profiler = _StageProfiler()
+
+    expected, features = builder._extract_features(data)
+
+    rows = np.arange(10)
+    population = data.copy()
+    population["_featuretools_index"] = np.arange(population.shape[0])
+    feature_matrices, _ = builder._extract_rows(
+        data, rows, _infer_logical_types(population, "ds"), features=features
+    )
+
+    df_extracted, _ = _sanitize_features(
+        _concat_feature_matrices(feature_matrices).loc[rows], replace_inf=False
+    )
+
+    pd.testing.assert_frame_equal(
+        _without_time_since(df_extracted),
+        _without_time_since(expected.loc[rows]),
+        check_dtype=False,
+        check_categorical=False,
+    )
+
+
+@pytest.fixture(scope="module")
+def single_shot():
+    data = make_data(num_ids=3, rows_per_id=30)
+    data_test = make_data(num_ids=3, rows_per_id=30, seed=1)
+    builder = _builder()
+    return data, data_test, builder, builder.fit(data), builder.transform(data_test)
+
+
+def _assert_same_features(builder, features, expected_builder, expected):
+    assert list(builder.selected_features) == list(expected_builder.selected_features)
+    pd.testing.assert_frame_equal(
+        _without_time_since(features),
+        _without_time_since(expected),
+        check_dtype=False,
+        check_categorical=False,
+    )
+
+
+# A window has up to six rows, so 20 rolled rows make batches
+# of a handful of population rows, which split the ids.
+@pytest.mark.parametrize("max_rows_per_batch", [20, 200])
+def test_batches_match_single_shot(single_shot, max_rows_per_batch):
+    data, data_test, expected_builder, expected_train, expected_test = single_shot
+    builder = _builder(max_rows_per_batch=max_rows_per_batch)
+
+    train = builder.fit(data)
+    _assert_same_features(builder, train, expected_builder, expected_train)
+
+    test = builder.transform(data_test)
+    _assert_same_features(builder, test, expected_builder, expected_test)
+
+    assert builder.profile["transform"]["stages"]["extraction"]["calls"] > 1
+
+
+@pytest.mark.parametrize("num_ids, num_shards", [(5, 2), (5, 5), (1, 3), (2, 3)])
+def test_shards_cover_every_row_and_window_once(num_ids, num_shards):
+    data = make_data(num_ids=num_ids, rows_per_id=20).sample(frac=1, random_state=0)
+    windows = _find_windows(
+        data, "id", "ds", pd.Timedelta(seconds=2), pd.Timedelta(seconds=5)
+    )
+    order, lower, upper = windows
+
+    shards = _make_shards(data["id"], windows, num_shards)
+
+    assert len(shards) == num_shards
+    rows = np.concatenate([rows for rows, _ in shards])
+    np.testing.assert_array_equal(np.sort(rows), np.arange(len(data)))
+    for rows, needed in shards:
+        for row in rows:
+            assert np.isin(order[lower[row] : upper[row]], needed).all()
+
+
+@pytest.mark.parametrize("num_ids", [3, 1])
+def test_processes_match_a_single_process(single_shot, num_ids):
+    if num_ids == 1:
+        # A single id is split into time ranges.
+        data = make_data(num_ids=1, rows_per_id=60)
+        data_test = make_data(num_ids=1, rows_per_id=60, seed=1)
+        expected_builder = _builder()
+        expected_train = expected_builder.fit(data)
+        expected_test = expected_builder.transform(data_test)
+    else:
+        data, data_test, expected_builder, expected_train, expected_test = single_shot
+
+    builder = _builder(n_jobs=3)
+
+    train = builder.fit(data)
+    _assert_same_features(builder, train, expected_builder, expected_train)
+
+    test = builder.transform(data_test)
+    _assert_same_features(builder, test, expected_builder, expected_test)
+
+
+def test_transform_calculates_only_the_selected_features(single_shot, monkeypatch):
+    _, data_test, builder, _, expected = single_shot
+    calculated = []
+    calculate_feature_matrix = ft.calculate_feature_matrix
+
+    def spy(features, **kwargs):
+        calculated.extend(features)
+        return calculate_feature_matrix(features, **kwargs)
+
+    monkeypatch.setattr(ft, "calculate_feature_matrix", spy)
+
+    features = builder.transform(data_test)
+
+    assert 0 < len(calculated) <= len(builder.selected_features)
+
+    builder._profiler = _StageProfiler()
+    all_features, _ = builder._extract_features(data_test.drop(columns="y"))
+
+    assert len(builder.selected_features) < all_features.shape[1]
+    pd.testing.assert_frame_equal(features, expected)
+    pd.testing.assert_frame_equal(
+        _without_time_since(features[builder.selected_features]),
+        _without_time_since(all_features[builder.selected_features]),
+        check_names=False,
+    )
+
+
+def test_features_selected_on_a_sample_are_calculated_for_all_rows():
+    data = _with_step(0).sample(frac=1, random_state=0)
+    builder = _builder(selection_sample=0.25)
+
+    features = builder.fit(data)
+
+    assert builder.profile["fit"]["counters"]["sampled_rows"] == len(data) // 4
+    assert "MAX(peripheral.step)" in builder.selected_features
+    np.testing.assert_array_equal(features["MAX(peripheral.step)"], data["step"])
+    pd.testing.assert_frame_equal(features, builder.transform(data))
@@ -0,0 +1,100 @@
+from types import SimpleNamespace
+
+import getml
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from conftest import make_data
+from utils.getml_export import _infer_roles, to_getml
+from utils.sliding_window_builder import SlidingWindowBuilder
+
+
+def _builder(output):
+    return SlidingWindowBuilder(
+        num_features=5,
+        horizon=pd.Timedelta(seconds=0),
+        memory=pd.Timedelta(seconds=5),
+        column_id="id",
+        time_stamp="ds",
+        target="y",
+        output=output,
+    )
+
+
+def _with_other_columns(data):
+    data = data.copy()
+    data.loc[3, "x1"] = np.nan
+    data["count"] = pd.array(np.arange(len(data)), dtype="Int64")
+    data.loc[4, "count"] = pd.NA
+    data["category"] = pd.Categorical(np.where(data.index % 2 == 0, "a", "b"))
+    return data
+
+
+def test_arrow_output_matches_pandas_output():
+    data = _with_other_columns(make_data(num_ids=3, rows_per_id=20))
+
+    expected = _builder("pandas").fit(data)
+    table = _builder("arrow").fit(data)
+
+    assert isinstance(table, pa.Table)
+    assert table.column_names == list(expected.columns)
+    assert pa.types.is_dictionary(table.schema.field("category").type)
+    # NaN stays NaN in float columns, missing values in the others are nulls.
+    assert np.isnan(table.column("x1").to_numpy()[3])
+    assert table.column("count").null_count == 1
+    pd.testing.assert_frame_equal(
+        table.to_pandas().set_axis(expected.index), expected, check_dtype=False
+    )
+
+
+def test_roles_follow_the_builder():
+    data = _with_other_columns(make_data(num_ids=2, rows_per_id=10))
+    data["name"] = "paper"
+    table = pa.Table.from_pandas(data, preserve_index=False)
+
+    roles = _infer_roles(table.schema, _builder("arrow"))
+
+    assert roles == {
+        "join_key": ["id"],
+        "time_stamp": ["ds"],
+        "target": ["y"],
+        "numerical": ["x0", "x1", "count"],
+        "unused_string": ["category", "name"],
+    }
+
+
+def test_to_getml_streams_the_table_with_the_roles(monkeypatch):
+    created = []
+
+    class DataFrame:
+        def __init__(self, name, roles):
+            self.name = name
+            self.roles = roles
+            self.batches = []
+            created.append(self)
+
+        def read_arrow(self, batches):
+            self.batches.extend(batches)
+            return self
+
+    monkeypatch.setattr(getml.data, "DataFrame", DataFrame)
+    data = make_data(num_ids=3, rows_per_id=20)
+    builder = _builder("pandas")
+    features = builder.fit(data)
+
+    df = to_getml(features, "population", builder, batch_rows=25)
+
+    assert created == [df]
+    assert df.name == "population"
+    assert df.roles["join_key"] == ["id"]
+    assert df.roles["target"] == ["y"]
+    assert sorted(df.roles["numerical"]) == sorted(
+        list(builder.selected_features) + ["x0", "x1"]
+    )
+    assert [batch.num_rows for batch in df.batches] == [25, 25, 10]
+    pd.testing.assert_frame_equal(
+        pa.Table.from_batches(df.batches).to_pandas(),
+        features.reset_index(drop=True),
+        check_dtype=False,
+    )
@@ -0,0 +1,256 @@
+import os
+import sqlite3
+from types import SimpleNamespace
+
+import getml
+import pandas as pd
+import pytest
+
+from utils import load
+
+NUM_ROWS = 1000
+
+BATCH_SIZE = 100
+
+
+class _Engine:
+    """
+    Stands in for the getML engine: data frames are held in memory
+    and saved to disk as pandas.DataFrames.
+    """
+
+    def __init__(self):
+        self.memory = {}
+        self.disk = {}
+        self.reads = 0
+        self.saves = 0
+        self.interrupt_read = None
+        self.interrupt_save = None
+        self.csv_reads = 0
+        self.saved_rows = []
+        self.queries = []
+        # Reading a batch takes a second, saving takes a second per 1024
+        # rows, which keeps the clock free of rounding errors.
+        self.clock = 0.0
+
+
+class _View:
+    def __init__(self, data):
+        self.data = data
+
+    def to_pandas(self):
+        return self.data.reset_index(drop=True)
+
+
+def _make_data_frame(engine):
+    class DataFrame:
+        def __init__(self, name):
+            self.name = name
+
+        @classmethod
+        def from_csv(cls, fnames, name, **kwargs):
+            engine.csv_reads += 1
+            engine.memory[name] = pd.concat(
+                [pd.read_csv(fname) for fname in fnames], ignore_index=True
+            )
+            return cls(name)
+
+        @classmethod
+        def from_db(cls, table_name, name, conn, **kwargs):
+            return cls.from_query(f"SELECT * FROM {table_name}", name, conn, **kwargs)
+
+        @classmethod
+        def from_query(cls, query, name, conn, **kwargs):
+            df = cls(name)
+            engine.memory[name] = pd.DataFrame()
+            return df.read_query(query, append=True, conn=conn)
+
+        def read_query(self, query, append, conn):
+            engine.reads += 1
+            engine.clock += 1.0
+            if engine.reads == engine.interrupt_read:
+                raise KeyboardInterrupt
+            batch = pd.read_sql(query, conn.sqlite)
+            engine.memory[self.name] = pd.concat(
+                [engine.memory[self.name], batch], ignore_index=True
+            )
+            return self
+
+        def read_view(self, view):
+            engine.memory[self.name] = view.data.reset_index(drop=True)
+            return self
+
+        def __getitem__(self, index):
+            return _View(engine.memory[self.name][index])
+
+        def nrows(self):
+            return len(engine.memory[self.name])
+
+        def save(self):
+            engine.disk[self.name] = engine.memory[self.name].copy()
+            engine.saves += 1
+            engine.saved_rows.append(len(engine.disk[self.name]))
+            engine.clock += len(engine.disk[self.name]) / 1024
+            if engine.saves == engine.interrupt_save:
+                raise KeyboardInterrupt
+            return self
+
+        def to_parquet(self, fname):
+            engine.memory[self.name].to_parquet(fname)
+
+        def load(self):
+            engine.memory[self.name] = engine.disk[self.name].copy()
+            return self
+
+        def refresh(self):
+            return self
+
+    return DataFrame
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = _Engine()
+    data_frame = _make_data_frame(engine)
+    monkeypatch.setattr(getml, "DataFrame", data_frame)
+    monkeypatch.setattr(getml, "project", SimpleNamespace(name="test"))
+
+    def get(query, conn):
+        engine.queries.append(query)
+        return pd.read_sql(query, conn.sqlite)
+
+    monkeypatch.setattr(getml.database, "get", get)
+    monkeypatch.setattr(load.time, "perf_counter", lambda: engine.clock)
+    monkeypatch.setattr(
+        getml.data, "exists", lambda name: name in engine.memory or name in engine.disk
+    )
+    # Like getml.data.load_data_frame, returns the data frame held in memory.
+    monkeypatch.setattr(getml.data, "load_data_frame", data_frame)
+    return engine
+
+
+@pytest.fixture
+def conn(tmp_path):
+    sqlite = sqlite3.connect(str(tmp_path / "facts.db"))
+    pd.DataFrame({"id": range(NUM_ROWS), "value": range(NUM_ROWS)}).to_sql(
+        "facts", sqlite, index=False
+    )
+    yield SimpleNamespace(dbname="facts.db", sqlite=sqlite)
+    sqlite.close()
+
+
+@pytest.mark.parametrize("key", [None, "id"])
+@pytest.mark.parametrize("interrupt", ["interrupt_read", "interrupt_save"])
+def test_resumed_read_matches_the_source(engine, conn, tmp_path, key, interrupt):
+    # Reading the sixth batch is interrupted after the checkpoint at four
+    # batches, so the data frame in memory holds one batch more than the
+    # checkpoint. Saving the second time is interrupted before the progress
+    # of the checkpoint at four batches is written.
+    setattr(engine, interrupt, 6 if interrupt == "interrupt_read" else 2)
+
+    kwargs = dict(
+        batch_size=BATCH_SIZE, key=key, checkpoint_every=2, cache_dir=tmp_path
+    )
+
+    with pytest.raises(KeyboardInterrupt):
+        load.load_or_query(conn, "facts", **kwargs)
+
+    df = load.load_or_query(conn, "facts", **kwargs)
+
+    result = engine.memory[df.name]
+    assert df.nrows() == NUM_ROWS
+    assert result["id"].tolist() == list(range(NUM_ROWS))
+    assert not (tmp_path / "test" / "facts.progress.json").exists()
+
+
+@pytest.mark.parametrize("key", [None, "id"])
+def test_checkpoints_take_a_fixed_share_of_the_time(engine, conn, tmp_path, key):
+    df = load.load_or_query(
+        conn, "facts", batch_size=BATCH_SIZE, key=key, cache_dir=tmp_path
+    )
+
+    assert engine.memory[df.name]["id"].tolist() == list(range(NUM_ROWS))
+    # Every checkpoint waits ten times as long as the one before took,
+    # so the data frame is saved at 1, 2, 4 and 8 batches and once at the end.
+    assert engine.saved_rows == [100, 200, 400, 800, NUM_ROWS]
+
+
+@pytest.mark.parametrize("num_rows", [NUM_ROWS, NUM_ROWS - 1])
+def test_keyset_pagination_queries_nothing_but_the_batches(engine, conn, tmp_path, num_rows):
+    conn.sqlite.execute(f"DELETE FROM facts WHERE id >= {num_rows}")
+
+    df = load.load_or_query(
+        conn, "facts", batch_size=BATCH_SIZE, key="id", cache_dir=tmp_path
+    )
+
+    assert engine.memory[df.name]["id"].tolist() == list(range(num_rows))
+    # Only the total number of rows is queried, for the progress report.
+    assert len(engine.queries) == 1
+    # An exhausted source only shows in a short batch, which is
+    # an empty one if the number of rows is a multiple of the batch size.
+    assert engine.reads == num_rows // BATCH_SIZE + 1
+
+
+def test_csv_is_only_read_again_if_its_content_changes(engine, tmp_path, monkeypatch):
+    hashes = []
+    hash_file = load._hash_file
+    monkeypatch.setattr(load, "_hash_file", lambda path: hashes.append(path) or hash_file(path))
+
+    csv_file = tmp_path / "facts.csv"
+    data = pd.DataFrame({"id": range(10), "value": range(10)})
+    data.to_csv(csv_file, index=False)
+    kwargs = dict(cache_dir=tmp_path / "cache", snapshot=True)
+
+    load.load_or_retrieve(csv_file, **kwargs)
+    assert engine.csv_reads == 1
+
+    # Unchanged, so the file is neither hashed nor read again.
+    load.load_or_retrieve(csv_file, **kwargs)
+    assert (engine.csv_reads, len(hashes)) == (1, 1)
+
+    # Touched, but not changed, so the file is hashed, but not read again.
+    os.utime(csv_file, ns=(0, 0))
+    load.load_or_retrieve(csv_file, **kwargs)
+    assert (engine.csv_reads, len(hashes)) == (1, 2)
+
+    # The same size, but a different content.
+    data["value"] = data["value"][::-1].to_numpy()
+    data.to_csv(csv_file, index=False)
+    os.utime(csv_file, ns=(10**9, 10**9))
+    load.load_or_retrieve(csv_file, **kwargs)
+    assert (engine.csv_reads, len(hashes)) == (2, 3)
+
+    # Different options change the resulting data frame.
+    load.load_or_retrieve(csv_file, sep=",", **kwargs)
+    assert engine.csv_reads == 3
+
+    pd.testing.assert_frame_equal(load.load_snapshot("facts", cache_dir=tmp_path / "cache"), data)
+
+
+def test_is_valid_ignores_the_modification_time_only():
+    fingerprint = {
+        "files": [{"path": "a.csv", "size": 1, "mtime_ns": 1, "hash": "x"}],
+        "options": "{}",
+    }
+
+    def changed(**changes):
+        return {**fingerprint, "files": [{**fingerprint["files"][0], **changes}]}
+
+    assert load._is_valid(changed(mtime_ns=2), fingerprint)
+    assert not load._is_valid(changed(hash="y"), fingerprint)
+    assert not load._is_valid(changed(size=2), fingerprint)
+    assert not load._is_valid({**fingerprint, "options": '{"sep": ";"}'}, fingerprint)
+    assert not load._is_valid(fingerprint, None)
+
+
+def test_source_changes_are_detected_by_the_probe(engine, conn, tmp_path):
+    kwargs = dict(probe=True, time_stamp="id", cache_dir=tmp_path)
+
+    load.load_or_query(conn, "facts", **kwargs)
+    load.load_or_query(conn, "facts", **kwargs)
+    assert engine.reads == 1
+
+    conn.sqlite.execute(f"INSERT INTO facts VALUES ({NUM_ROWS}, 0)")
+    df = load.load_or_query(conn, "facts", **kwargs)
+    assert engine.reads == 2
+    assert df.nrows() == NUM_ROWS + 1
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_data
+from utils.roll_data_frame import _roll_data_frame, _roll_data_frame_iterrows
+
+
+def _messy(data, seed):
+    """
+    Adds duplicate time stamps, string ids, a missing
+    id and missing time stamps and shuffles the rows.
+    """
+    rng = np.random.default_rng(seed)
+    data["ds"] = data["ds"].dt.floor("3s")
+    data["id"] = data["id"].map({0: "a", 1: "b", 2: None, 3: "d"})
+    data.loc[rng.choice(len(data), 5), "ds"] = pd.NaT
+    return data.sample(frac=1.0, random_state=seed)
+
+
+@pytest.mark.parametrize("messy", [False, True])
+@pytest.mark.parametrize("horizon, memory", [(0, 5), (2, 30)])
+def test_vectorized_matches_iterrows(messy, horizon, memory):
+    data = make_data(num_ids=4)
+    if messy:
+        data = _messy(data, seed=horizon)
+
+    args = (data, "id", "ds", pd.Timedelta(seconds=horizon), pd.Timedelta(seconds=memory))
+
+    pd.testing.assert_frame_equal(
+        _roll_data_frame(*args), _roll_data_frame_iterrows(*args)
+    )
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.sanitize_features import _sanitize_features
+
+
+def _make_features(seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(size=(50, 300))
+    values[rng.random(values.shape) < 0.05] = np.nan
+    values[rng.random(values.shape) < 0.02] = np.inf
+    values[rng.random(values.shape) < 0.02] = -np.inf
+    return pd.DataFrame(values, columns=["f" + str(i) for i in range(300)])
+
+
+def _sanitize_baseline(data_frame, replace_inf):
+    data_frame = data_frame.copy()
+    data_frame[np.isnan(data_frame)] = 0.0
+    if replace_inf:
+        data_frame[np.isinf(data_frame)] = 0.0
+    return data_frame
+
+
+@pytest.mark.parametrize("replace_inf", [True, False])
+def test_matches_replacing_with_masks(replace_inf):
+    data_frame = _make_features()
+    expected = _sanitize_baseline(data_frame, replace_inf)
+    invalid = ~np.isfinite(data_frame) if replace_inf else np.isnan(data_frame)
+
+    sanitized, replaced = _sanitize_features(data_frame.copy(), replace_inf=replace_inf)
+
+    pd.testing.assert_frame_equal(sanitized, expected)
+    pd.testing.assert_series_equal(replaced, invalid.sum(), check_dtype=False)
+
+
+def test_single_float_block_is_sanitized_in_place():
+    data_frame = _make_features()
+    values = data_frame.to_numpy()
+
+    sanitized, _ = _sanitize_features(data_frame)
+
+    assert np.shares_memory(sanitized.to_numpy(), values)
+    assert np.isfinite(values).all()
+
+
+def test_casts_the_float_columns():
+    data_frame = _make_features()
+
+    sanitized, _ = _sanitize_features(data_frame.copy(), dtype=np.float32)
+
+    assert (sanitized.dtypes == np.float32).all()
+    pd.testing.assert_frame_equal(
+        sanitized, _sanitize_baseline(data_frame, True).astype(np.float32)
+    )
+
+
+def test_other_columns_are_filled_and_kept_in_place():
+    data_frame = pd.DataFrame(
+        {
+            "f0": [1.0, np.nan, np.inf],
+            "count": pd.array([1, None, 3], dtype="Int64"),
+            "flag": pd.array([True, None, False], dtype="boolean"),
+            "category": pd.Categorical(["a", None, "b"]),
+            "f1": [np.nan, 2.0, 3.0],
+        }
+    )
+
+    sanitized, replaced = _sanitize_features(data_frame.copy(), dtype=np.float32)
+
+    assert list(sanitized.columns) == list(data_frame.columns)
+    assert sanitized["f0"].tolist() == [1.0, 0.0, 0.0]
+    assert sanitized["f1"].dtype == np.float32
+    assert sanitized["count"].tolist() == [1, 0, 3]
+    assert sanitized["flag"].tolist() == [True, False, False]
+    pd.testing.assert_series_equal(sanitized["category"], data_frame["category"])
+    assert replaced.to_dict() == {"f0": 2, "count": 1, "flag": 1, "category": 0, "f1": 1}
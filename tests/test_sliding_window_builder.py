@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import make_data
+from utils.sliding_window_builder import SlidingWindowBuilder
+
+
+def _irregular_data(seed=0):
+    """
+    Three ids with irregular and repeated time stamps, missing
+    values, a missing time stamp and the rows shuffled.
+    """
+    rng = np.random.default_rng(seed)
+    data = make_data(num_ids=3, rows_per_id=30, seed=seed)
+    seconds = np.sort(rng.integers(0, 60, size=(3, 30)), axis=1).ravel()
+    data["ds"] = pd.to_datetime(seconds, unit="s")
+    data.loc[rng.random(len(data)) < 0.2, "x0"] = np.nan
+    data.loc[5, "ds"] = pd.NaT
+    return data.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def _brute_force(data, horizon, memory):
+    """
+    Aggregates over every window by masking all rows.
+    """
+    times = data["ds"]
+    rows = []
+    for _, row in data.iterrows():
+        window = data[
+            (data["id"] == row["id"])
+            & (times > row["ds"] - horizon - memory)
+            & (times <= row["ds"] - horizon)
+        ]
+        features = {
+            "COUNT": float(len(window)),
+            "TIME_SINCE_LAST": (row["ds"] - window["ds"].max()).total_seconds(),
+        }
+        for col in ["x0", "x1"]:
+            valid = window[window[col].notna()]
+            values = valid[col].to_numpy()
+            seconds = (valid["ds"] - pd.Timestamp(0)).dt.total_seconds().to_numpy()
+            features["COUNT(" + col + ")"] = float(len(values))
+            features["SUM(" + col + ")"] = values.sum()
+            features["MEAN(" + col + ")"] = values.mean() if len(values) else np.nan
+            features["VAR(" + col + ")"] = values.var(ddof=1) if len(values) > 1 else np.nan
+            features["MIN(" + col + ")"] = values.min() if len(values) else np.nan
+            features["MAX(" + col + ")"] = values.max() if len(values) else np.nan
+            features["TREND(" + col + ")"] = (
+                np.polyfit(seconds, values, 1)[0]
+                if len(values) > 1 and np.ptp(seconds) > 0
+                else np.nan
+            )
+        rows.append(features)
+    return pd.DataFrame(rows).fillna(0.0)
+
+
+@pytest.mark.parametrize("horizon, memory", [(0, 10), (3, 10), (0, 100)])
+def test_features_match_brute_force_windows(horizon, memory):
+    data = _irregular_data()
+    builder = SlidingWindowBuilder(
+        num_features=10,
+        horizon=pd.Timedelta(seconds=horizon),
+        memory=pd.Timedelta(seconds=memory),
+        column_id="id",
+        time_stamp="ds",
+        target="y",
+    )
+
+    features = builder._extract_features(data.drop(columns="y"))
+    expected = _brute_force(
+        data, pd.Timedelta(seconds=horizon), pd.Timedelta(seconds=memory)
+    )
+
+    assert sorted(features.columns) == sorted(expected.columns)
+    pd.testing.assert_frame_equal(
+        features, expected[features.columns], check_exact=False, atol=1e-8
+    )
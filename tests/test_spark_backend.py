@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyspark")
+
+from conftest import make_data
+from utils import FTTimeSeriesBuilder, TSFreshBuilder
+from utils import ft_time_series_builder
+from utils.roll_data_frame import _roll_data_frame
+from utils.spark_backend import _get_spark_session, _roll_by_rows, _roll_by_time, _to_spark
+
+
+@pytest.fixture(scope="module")
+def spark():
+    try:
+        spark = _get_spark_session("local[2]")
+    except Exception as exc:
+        pytest.skip("Spark cannot be started: " + repr(exc))
+    yield spark
+    spark.stop()
+
+
+def _irregular_data(seed):
+    # Irregular time stamps, some of them shared by several rows and
+    # some before 1970, where the buckets start at negative values.
+    data = make_data(num_ids=3, rows_per_id=30, seed=seed)
+    rng = np.random.default_rng(seed)
+    seconds = np.round(rng.uniform(-20, 40, size=len(data)) * 2) / 2
+    data["ds"] = pd.to_datetime(seconds, unit="s")
+    return data.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def _pairs(rolled, window, position):
+    return sorted(zip(rolled[window].tolist(), rolled[position].tolist()))
+
+
+# A single id is the case the time buckets are meant for,
+# several ids make sure the buckets do not mix them up.
+# The time stamps are whole seconds, so with whole seconds for the
+# horizon and memory, rows fall exactly onto the window bounds and
+# onto the edges of the buckets, which are horizon + memory wide.
+@pytest.mark.parametrize("num_ids", [1, 3, "irregular"])
+@pytest.mark.parametrize(
+    "horizon, memory", [(0, 5), (2, 5), (0, 1), (3, 40), (5, 0.5), (0, 0)]
+)
+def test_roll_by_time_matches_roll_data_frame(spark, num_ids, horizon, memory):
+    data = (
+        _irregular_data(seed=0) if num_ids == "irregular" else make_data(num_ids=num_ids)
+    )
+    data["_position"] = np.arange(data.shape[0])
+
+    expected = _roll_data_frame(
+        data,
+        "id",
+        "ds",
+        pd.Timedelta(seconds=horizon),
+        pd.Timedelta(seconds=memory),
+    )
+
+    spark_data, _ = _to_spark(spark, data.drop(columns="_position"), "ds")
+    rolled = _roll_by_time(
+        spark_data,
+        "id",
+        pd.Timedelta(seconds=horizon).value,
+        pd.Timedelta(seconds=memory).value,
+    ).toPandas()
+
+    assert _pairs(rolled, "_join_key", "_position") == _pairs(
+        expected, "_featuretools_join_key", "_position"
+    )
+
+
+@pytest.mark.parametrize("num_ids", [1, 3, "irregular"])
+@pytest.mark.parametrize("memory", [0, 1, 5, 29, 30])
+def test_roll_by_rows_matches_preceding_rows(spark, num_ids, memory):
+    data = (
+        _irregular_data(seed=1) if num_ids == "irregular" else make_data(num_ids=num_ids)
+    )
+
+    expected = [
+        (end, position)
+        for _, group in data.sort_values("ds", kind="stable").groupby("id")
+        for i, end in enumerate(group.index)
+        for position in group.index[max(i - memory, 0) : i + 1]
+    ]
+
+    spark_data, _ = _to_spark(spark, data)
+    rolled = _roll_by_rows(spark_data, "id", "ds", memory).toPandas()
+
+    assert _pairs(rolled, "_join_key", "_position") == sorted(expected)
+
+
+def _without_time_since(features):
+    # TIME_SINCE depends on when the features were calculated.
+    return features[[col for col in features.columns if "TIME_SINCE" not in col]]
+
+
+@pytest.mark.parametrize("horizon, memory", [(0, 5), (2, 5), (3, 0.5)])
+def test_ft_time_series_builder_matches_pandas(spark, monkeypatch, horizon, memory):
+    # Most rows are left to Spark, not only those beyond the first 100.
+    monkeypatch.setattr(ft_time_series_builder, "SPARK_LOCAL_ROWS", 10)
+    data = _irregular_data(seed=2)
+    data_test = _irregular_data(seed=3)
+
+    def fit_transform(backend):
+        builder = FTTimeSeriesBuilder(
+            num_features=10,
+            horizon=pd.Timedelta(seconds=horizon),
+            memory=pd.Timedelta(seconds=memory),
+            column_id="id",
+            time_stamp="ds",
+            target="y",
+            backend=backend,
+            spark=spark,
+        )
+        return builder, builder.fit(data), builder.transform(data_test)
+
+    expected_builder, expected_train, expected_test = fit_transform("pandas")
+    builder, train, test = fit_transform("spark")
+
+    assert list(builder.selected_features) == list(expected_builder.selected_features)
+    for features, expected in [(train, expected_train), (test, expected_test)]:
+        pd.testing.assert_frame_equal(
+            _without_time_since(features),
+            _without_time_since(expected),
+            check_dtype=False,
+            check_categorical=False,
+        )
+
+
+# tsfresh needs a memory of at least one row.
+@pytest.mark.parametrize("memory", [1, 5])
+def test_ts_fresh_builder_matches_pandas(spark, memory):
+    data = _irregular_data(seed=4).drop_duplicates(["id", "ds"]).reset_index(drop=True)
+    data_test = _irregular_data(seed=5).drop_duplicates(["id", "ds"]).reset_index(drop=True)
+
+    def fit_transform(backend):
+        builder = TSFreshBuilder(
+            num_features=10,
+            memory=memory,
+            column_id="id",
+            time_stamp="ds",
+            target="y",
+            n_jobs=0,
+            backend=backend,
+            spark=spark,
+        )
+        return builder, builder.fit(data), builder.transform(data_test)
+
+    expected_builder, expected_train, expected_test = fit_transform("pandas")
+    builder, train, test = fit_transform("spark")
+
+    assert list(builder.selected_features) == list(expected_builder.selected_features)
+    pd.testing.assert_frame_equal(train, expected_train)
+    pd.testing.assert_frame_equal(test, expected_test)
@@ -0,0 +1,278 @@
+import gc
+
+import numpy as np
+import pandas as pd
+import pytest
+import tsfresh
+from tsfresh.feature_extraction.settings import (
+    IndexBasedFCParameters,
+    MinimalFCParameters,
+)
+from tsfresh.utilities.dataframe_functions import roll_time_series
+
+from conftest import make_data
+from utils import TSFreshBuilder
+from utils import ts_fresh_builder
+from utils.stage_profiler import _StageProfiler
+
+
+def _builder(**kwargs):
+    return TSFreshBuilder(
+        num_features=10, memory=5, column_id="id", time_stamp="ds", target="y", **kwargs
+    )
+
+
+@pytest.fixture(scope="module")
+def in_memory():
+    data = make_data(num_ids=6)
+    builder = _builder(n_jobs=0)
+    return data, builder, builder.fit(data)
+
+
+# The workers finish in random order, so the order of the columns
+# varies between shards. Several runs make that likely to happen.
+@pytest.mark.parametrize("run", range(3))
+def test_sharded_spill_matches_in_memory_with_workers(in_memory, tmp_path, run):
+    data, expected_builder, expected = in_memory
+    builder = _builder(
+        n_jobs=2, chunksize=1, max_rows_per_batch=150, spill_dir=tmp_path
+    )
+    try:
+        features = builder.fit(data)
+    finally:
+        builder.close()
+    assert sorted(builder.selected_features) == sorted(expected_builder.selected_features)
+    pd.testing.assert_frame_equal(features, expected, check_like=True)
+    assert list(tmp_path.iterdir()) == []
+
+
+def _with_step(seed):
+    # Every row knows its own position, so the maximum of step over
+    # a window is the step of the row the window ends at.
+    data = make_data(num_ids=3, rows_per_id=20, seed=seed)
+    data["step"] = np.arange(len(data), dtype=float)
+    data["y"] = data["step"]
+    return data
+
+
+@pytest.mark.parametrize("max_rows_per_batch", [None, 40])
+def test_features_belong_to_their_rows(tmp_path, max_rows_per_batch):
+    data = _with_step(0).sample(frac=1, random_state=0)
+    builder = _builder(n_jobs=0, max_rows_per_batch=max_rows_per_batch, spill_dir=tmp_path)
+
+    features = builder.fit(data)
+
+    assert "step__maximum" in builder.selected_features
+    ids = features.index.get_level_values(0)
+    np.testing.assert_array_equal(ids, data["id"])
+    np.testing.assert_array_equal(features["y"], data["y"])
+    np.testing.assert_array_equal(features["step__maximum"], data["step"])
+
+    data = _with_step(1).sample(frac=1, random_state=1)
+    features = builder.transform(data)
+
+    np.testing.assert_array_equal(features["id"], data["id"])
+    np.testing.assert_array_equal(features["step__maximum"], data["step"])
+
+
+def test_transform_without_selected_features_extracts_nothing(monkeypatch):
+    data = make_data(num_ids=2)
+    builder = _builder(n_jobs=0)
+    builder.selected_features = []
+    builder.kind_to_fc_parameters = {}
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("Nothing should be extracted.")
+
+    monkeypatch.setattr(builder, "_extract_features", _fail)
+
+    pd.testing.assert_frame_equal(builder.transform(data), data)
+    pd.testing.assert_frame_equal(builder.partial_transform(data), data)
+
+
+def test_partial_transform_matches_transform():
+    builder = _builder(n_jobs=0)
+    builder.fit(make_data(num_ids=3, rows_per_id=30))
+
+    data = make_data(num_ids=3, rows_per_id=30, seed=1)
+    expected = builder.transform(data)
+
+    # The rows arrive in the order of their time stamps, in small batches.
+    stream = data.sort_values("ds", kind="stable")
+    partial = pd.concat(
+        [builder.partial_transform(stream.iloc[i : i + 7]) for i in range(0, len(stream), 7)]
+    ).loc[data.index]
+
+    pd.testing.assert_frame_equal(
+        partial.reset_index(drop=True), expected.reset_index(drop=True)
+    )
+
+
+def test_fit_many_matches_separate_fits():
+    data = make_data(num_ids=3, rows_per_id=30)
+    data["z"] = data.groupby("id")["y"].shift(-3).fillna(0.0)
+    pairs = [("y", 0), ("z", 0), ("y", 3)]
+
+    builders, features = _builder(n_jobs=0).fit_many(data, pairs)
+
+    for target, horizon in pairs:
+        other = "z" if target == "y" else "y"
+        expected_builder = TSFreshBuilder(
+            num_features=10,
+            memory=5,
+            column_id="id",
+            time_stamp="ds",
+            target=target,
+            horizon=horizon,
+            n_jobs=0,
+        )
+        expected = expected_builder.fit(data.drop(columns=other))
+        builder = builders[(target, horizon)]
+        assert list(builder.selected_features) == list(expected_builder.selected_features)
+        pd.testing.assert_frame_equal(
+            features[(target, horizon)].drop(columns=other), expected
+        )
+        pd.testing.assert_frame_equal(
+            builder.transform(data.drop(columns=other)),
+            expected_builder.transform(data.drop(columns=other)),
+        )
+
+
+def _extract_two_pass(data_frame):
+    # The extraction as it was before the settings were merged:
+    # one call to extract_features per settings object.
+    df_rolled = roll_time_series(
+        data_frame, column_id="id", column_sort="ds", max_timeshift=5, n_jobs=0
+    )
+    extracted = pd.concat(
+        [
+            tsfresh.extract_features(
+                df_rolled,
+                column_id="id",
+                column_sort="ds",
+                default_fc_parameters=settings,
+                n_jobs=0,
+            )
+            for settings in [MinimalFCParameters(), IndexBasedFCParameters()]
+        ],
+        axis=1,
+    )
+    return extracted.mask(~np.isfinite(extracted), 0.0)
+
+
+@pytest.mark.parametrize("n_jobs", [0, 2])
+def test_single_pass_matches_two_passes(n_jobs):
+    data = make_data(num_ids=3, rows_per_id=20).drop(columns="y")
+    builder = _builder(n_jobs=n_jobs)
+
+    try:
+        extracted = builder._extract_features(data)
+        # The second call reuses the worker pool.
+        pool = builder._pool
+        pd.testing.assert_frame_equal(builder._extract_features(data), extracted)
+        assert builder._pool is pool
+    finally:
+        builder.close()
+
+    pd.testing.assert_frame_equal(extracted, _extract_two_pass(data))
+
+
+def test_features_selected_on_a_sample_are_calculated_for_all_rows():
+    data = _with_step(0).sample(frac=1, random_state=0)
+    builder = _builder(n_jobs=0, selection_sample=0.25)
+
+    features = builder.fit(data)
+
+    assert builder.profile["fit"]["counters"]["sampled_rows"] == len(data) // 4
+    assert "step__maximum" in builder.selected_features
+    np.testing.assert_array_equal(features["step__maximum"], data["step"])
+    pd.testing.assert_frame_equal(features, builder.transform(data))
+
+
+def test_rolled_windows_match_roll_time_series():
+    data = make_data(num_ids=3, rows_per_id=20).sample(frac=1, random_state=0)
+    window_ids = list(zip(data["id"].iloc[::4], data["ds"].iloc[::4]))
+
+    rolled = ts_fresh_builder._roll_windows(data, "id", "ds", 5, window_ids)
+    expected = roll_time_series(data, column_id="id", column_sort="ds", max_timeshift=5)
+    expected = expected[expected["id"].isin(window_ids)]
+
+    pd.testing.assert_frame_equal(
+        rolled.sort_values(["id", "ds"]).reset_index(drop=True),
+        expected.sort_values(["id", "ds"]).reset_index(drop=True),
+    )
+
+
+def test_selection_sample_rolls_the_history_of_the_sample_only(monkeypatch):
+    data = make_data(num_ids=4, rows_per_id=100)
+    target = data["y"].to_numpy()
+    builder = _builder(n_jobs=0)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("All rows should not be rolled.")
+
+    monkeypatch.setattr(ts_fresh_builder, "roll_time_series", _fail)
+
+    rolled_rows = []
+    for selection_sample in [20, 40]:
+        builder.selection_sample = selection_sample
+        builder._profiler = _StageProfiler()
+        builder._select_on_sample(data.drop(columns="y"), target)
+        rolled_rows.append(builder._profiler.counters["rolled_rows"])
+
+    # A window holds at most memory + 1 of the 400 rows.
+    assert 20 <= rolled_rows[0] <= 20 * 6
+    assert 40 <= rolled_rows[1] <= 40 * 6
+    assert rolled_rows[1] > rolled_rows[0]
+
+
+@pytest.fixture
+def closed_pools(monkeypatch):
+    closed = []
+
+    class Distributor(ts_fresh_builder.MultiprocessingDistributor):
+        def close(self):
+            closed.append(self)
+            super().close()
+
+    monkeypatch.setattr(ts_fresh_builder, "MultiprocessingDistributor", Distributor)
+    return closed
+
+
+def test_pool_is_shut_down_by_the_with_statement(closed_pools):
+    data = make_data(num_ids=2, rows_per_id=10).drop(columns="y")
+
+    with _builder(n_jobs=2) as builder:
+        builder._extract_features(data)
+        pool = builder._pool
+
+    assert closed_pools == [pool]
+    assert builder._pool is None
+
+
+def test_pool_is_shut_down_with_the_builder(closed_pools):
+    data = make_data(num_ids=2, rows_per_id=10).drop(columns="y")
+    builder = _builder(n_jobs=2)
+    builder._extract_features(data)
+    pool = builder._pool
+
+    del builder
+    gc.collect()
+
+    assert closed_pools == [pool]
+
+
+def test_builders_of_fit_many_have_pools_of_their_own(closed_pools):
+    data = make_data(num_ids=3, rows_per_id=20)
+    data["z"] = data.groupby("id")["y"].shift(-3).fillna(0.0)
+
+    with _builder(n_jobs=2) as builder:
+        builders, _ = builder.fit_many(data, [("y", 0), ("z", 0)])
+
+    # The pool of the original builder is shut down, but the others still work.
+    assert len(closed_pools) == 1
+    for other in builders.values():
+        with other:
+            other.transform(data)
+    assert len(closed_pools) == 3
+    assert len(set(map(id, closed_pools))) == 3
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from utils.zuordnung import _getml_patterns, _gnn_patterns, _match_patterns
+
+
+def _make_data(seed=0):
+    """
+    Six papers with five words each. The GNN rows are shuffled and the
+    word indices shifted by an offset. Paper 4 has no GNN row, paper 5
+    matches two of them and the getML rows are unsorted.
+    """
+    rng = np.random.default_rng(seed)
+    num_words = 40
+    offset = 3
+    words = [np.sort(rng.choice(num_words - offset, 5, replace=False)) for _ in range(6)]
+
+    gnn_x = np.zeros((7, num_words), dtype=np.float32)
+    rows = rng.permutation(7)
+    for paper, positions in enumerate(words[:4] + [words[5], words[5]]):
+        gnn_x[rows[paper], positions + offset] = 1.0
+    # Not a single word, so this row matches no paper.
+    gnn_x[rows[6], :] = 0.0
+
+    getml_word_data = pd.DataFrame(
+        {
+            "paper_id": np.repeat(np.arange(100, 106), 5),
+            "word_cited_id": ["word" + str(word) for positions in words for word in positions],
+        }
+    ).sample(frac=1.0, random_state=seed)
+
+    return getml_word_data, gnn_x
+
+
+def _linear_scan(getml_word_data, gnn_x):
+    zuordnung = []
+    for getml_idx in getml_word_data["paper_id"].unique():
+        words = getml_word_data.loc[getml_word_data["paper_id"] == getml_idx, "word_cited_id"]
+        pattern = np.diff(np.sort(words.str[4:].astype(int).to_numpy()))
+        for gnn_idx, row in enumerate(gnn_x):
+            if np.array_equal(np.diff(np.flatnonzero(row == 1)), pattern):
+                zuordnung.append((int(getml_idx), gnn_idx))
+                break
+    return zuordnung
+
+
+def test_matches_a_linear_scan():
+    getml_word_data, gnn_x = _make_data()
+
+    zuordnung, unmatched, ambiguous = _match_patterns(
+        _getml_patterns(getml_word_data), _gnn_patterns(gnn_x)
+    )
+
+    assert zuordnung == _linear_scan(getml_word_data, gnn_x)
+    assert unmatched == [104]
+    assert [paper_id for paper_id, _ in ambiguous] == [105]
+    assert len(ambiguous[0][1]) == 2
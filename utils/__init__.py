@@ -1,4 +1,34 @@
-from .benchmark import Benchmark
-from .ft_time_series_builder import FTTimeSeriesBuilder
-from .load import load_or_query, load_or_retrieve
-from .ts_fresh_builder import TSFreshBuilder
+"""
+The public names are imported on first access, so that importing one of
+them does not import featuretools, tsfresh and getml as well.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "Benchmark": ".benchmark",
+    "FeatureCache": ".feature_cache",
+    "FTTimeSeriesBuilder": ".ft_time_series_builder",
+    "load_or_query": ".load",
+    "load_or_query_many": ".load",
+    "load_or_retrieve": ".load",
+    "load_snapshot": ".load",
+    "SlidingWindowBuilder": ".sliding_window_builder",
+    "to_getml": ".getml_export",
+    "TSFreshBuilder": ".ts_fresh_builder",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    # Cached, so that __getattr__ is only called once per name.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
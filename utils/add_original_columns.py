@@ -1,8 +1,94 @@
 import numpy as np
+import pandas as pd
 
+OUTPUTS = ["pandas", "columns", "arrow"]
 
-def _add_original_columns(original_df, df_selected):
-    for colname in original_df.columns:
-        df_selected[colname] = np.asarray(original_df[colname])
 
-    return df_selected
+def _to_arrow_array(series):
+    """
+    NumPy float and integer columns are passed to pyarrow as they are,
+    which shares their buffers if they are contiguous and copies them
+    once otherwise. NaN stays NaN, which getML reads as missing.
+    Everything else is converted by pyarrow, with missing values
+    becoming nulls.
+    """
+    import pyarrow as pa
+
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "fiu":
+        return pa.array(series.to_numpy())
+    return pa.Array.from_pandas(series)
+
+
+def _align_original_rows(original_df, df_selected):
+    """
+    Returns the rows of original_df indexed like the rows of df_selected
+    they belong to.
+
+    If df_selected is indexed by _featuretools_index, which holds the
+    positions of the rows in original_df, the rows are looked up through
+    that index, so the features may come in any order. Otherwise, the
+    features must be in the order of original_df.
+    """
+    if df_selected.index.name == "_featuretools_index":
+        positions = original_df.reset_index(drop=True).rename_axis(
+            "_featuretools_index"
+        )
+        if positions.index.identical(df_selected.index):
+            return positions
+        return positions.reindex(df_selected.index)
+    if original_df.index.identical(df_selected.index):
+        return original_df
+    return original_df.set_axis(df_selected.index, copy=False)
+
+
+def _add_original_columns(original_df, df_selected, output="pandas"):
+    """
+    Appends the columns of original_df to df_selected, matching the rows as
+    described in _align_original_rows. Columns that exist in both are
+    replaced in place.
+
+    If output is "pandas", both frames are concatenated in one step, without
+    copying their blocks or modifying df_selected. If output is "columns", a
+    dict mapping the column names to NumPy arrays is returned instead, which
+    does not build a data frame at all and can be passed to
+    getml.data.DataFrame.from_dict. If output is "arrow", a pyarrow.Table
+    is returned, which to_getml streams to the getML engine.
+    """
+    if len(original_df) != len(df_selected):
+        raise ValueError(
+            "The original data frame has "
+            + str(len(original_df))
+            + " rows, but the features have "
+            + str(len(df_selected))
+            + "."
+        )
+
+    original_df = _align_original_rows(original_df, df_selected)
+
+    if output == "columns":
+        columns = {col: df_selected[col].to_numpy() for col in df_selected.columns}
+        columns.update({col: original_df[col].to_numpy() for col in original_df.columns})
+        return columns
+
+    if output == "arrow":
+        import pyarrow as pa
+
+        columns = {col: df_selected[col] for col in df_selected.columns}
+        columns.update({col: original_df[col] for col in original_df.columns})
+        return pa.table(
+            [_to_arrow_array(series) for series in columns.values()],
+            names=[str(col) for col in columns],
+        )
+
+    overlap = df_selected.columns.intersection(original_df.columns)
+
+    if len(overlap) == 0:
+        return pd.concat([df_selected, original_df], axis=1, copy=False)
+
+    colnames = list(df_selected.columns) + [
+        col for col in original_df.columns if col not in overlap
+    ]
+
+    return pd.concat(
+        [df_selected.drop(columns=overlap), original_df], axis=1, copy=False
+    )[colnames]
@@ -1,12 +1,127 @@
+import os
+import resource
+import statistics
+import sys
 import time
-from contextlib import contextmanager
+import tracemalloc
+from contextlib import contextmanager, nullcontext
 from datetime import timedelta
 
+import pandas as pd
+
+_CLEAR_REFS = "/proc/self/clear_refs"
+
+_STATUS = "/proc/self/status"
+
+
+def _reset_peak_rss():
+    """
+    Resets the peak resident set size of the process, which
+    is supported by Linux only. Returns whether it worked.
+    """
+    try:
+        with open(_CLEAR_REFS, "w") as file:
+            file.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss():
+    """
+    Returns the peak resident set size of the process in bytes.
+    """
+    if os.path.exists(_STATUS):
+        with open(_STATUS) as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _PeakRSS:
+    """
+    Measures the peak resident set size of a block of code in bytes,
+    which is available as peak once the block has finished.
+
+    The peak of the process is reset when a block is entered. Blocks may
+    be nested, for instance the stages of a builder inside a Benchmark,
+    so the peak reached so far is first carried over to the enclosing
+    blocks, which would lose it otherwise.
+    """
+
+    _open = []
+
+    def __enter__(self):
+        peak = _peak_rss()
+        for block in _PeakRSS._open:
+            block.peak = max(block.peak, peak)
+        _reset_peak_rss()
+        self.peak = 0
+        _PeakRSS._open.append(self)
+        return self
+
+    def __exit__(self, *args):
+        _PeakRSS._open.remove(self)
+        self.peak = max(self.peak, _peak_rss())
+        return False
+
+
+def _cpu_time():
+    """
+    Returns the CPU time of the process and of all of its
+    terminated child processes, such as worker pools, in seconds.
+    """
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
 
 class Benchmark:
-    def __init__(self):
+    """
+    Measures named blocks of code.
+
+    For every block, the wall time (time.perf_counter), the CPU time of
+    the process and its terminated child processes and the peak memory
+    are recorded. Running a block with the same name several times
+    records several samples, which are summarized by their minimum,
+    median and standard deviation.
+
+    Args:
+
+        memory: How to measure the peak memory. "rss" (the default)
+                records the peak resident set size of the process, which
+                is reset before every block on Linux. Blocks may be
+                nested. "tracemalloc"
+                records the peak of the memory allocated through Python,
+                which is more precise but slows down allocation-heavy
+                code. None disables memory measurement.
+
+    Example:
+
+        benchmark = Benchmark()
+
+        for _ in range(3):
+            with benchmark("tsfresh"):
+                tsfresh_train = tsfresh_builder.fit(data_train)
+
+        benchmark.summary()
+    """
+
+    def __init__(self, memory="rss"):
+        if memory not in ("rss", "tracemalloc", None):
+            raise ValueError(
+                "memory must be 'rss', 'tracemalloc' or None, got " + repr(memory) + "."
+            )
+
+        self.memory = memory
+
         self._data = {}
         self._data["runtimes"] = {}
+        self._data["cpu_times"] = {}
+        self._data["peak_memory"] = {}
+        self._data["counters"] = {}
 
     @contextmanager
     def __call__(self, name):
@@ -15,19 +130,239 @@ class Benchmark:
 
     @contextmanager
     def _benchmark_runtime(self, name):
-        begin = time.time()
-        yield
-        end = time.time()
-        self._data["runtimes"][name] = timedelta(seconds=end - begin)
+        started_tracing = self._reset_peak_memory()
+        peak_rss = _PeakRSS() if self.memory == "rss" else nullcontext()
+        cpu_begin = _cpu_time()
+        begin = time.perf_counter()
+        try:
+            with peak_rss:
+                yield
+        finally:
+            end = time.perf_counter()
+            cpu_end = _cpu_time()
+            peak = self._get_peak_memory(peak_rss)
+            # Tracing slows down everything that follows, so we
+            # only leave it on if somebody else has turned it on.
+            if started_tracing:
+                tracemalloc.stop()
+
+        self._data["runtimes"].setdefault(name, []).append(end - begin)
+        self._data["cpu_times"].setdefault(name, []).append(cpu_end - cpu_begin)
+        self._data["peak_memory"].setdefault(name, []).append(peak)
+
+    def _reset_peak_memory(self):
+        """
+        Resets the peak memory and returns whether
+        tracemalloc has been started to do so.
+        """
+        if self.memory == "tracemalloc":
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            return started_tracing
+
+        # The resident set size is measured by _PeakRSS. If the peak
+        # cannot be reset, it reports the overall peak of the process.
+        return False
+
+    def _get_peak_memory(self, peak_rss):
+        if self.memory == "tracemalloc":
+            return tracemalloc.get_traced_memory()[1]
+
+        if self.memory == "rss":
+            return peak_rss.peak
+
+        return None
+
+    def repeat(self, name, func, *args, repeats=5, **kwargs):
+        """
+        Calls func(*args, **kwargs) repeats times, each time as a block
+        named name, and returns the result of the last call.
+        """
+        result = None
+        for _ in range(repeats):
+            with self(name):
+                result = func(*args, **kwargs)
+        return result
+
+    def ingest(self, name, profile):
+        """
+        Adds a profile recorded by a builder as samples. The total is
+        added as a block named name and every stage as a block named
+        name.stage, so they appear in summary. The counters of the last
+        profile are kept in counters.
+
+        Example:
+
+            ft_builder.fit(data_train)
+
+            benchmark.ingest("featuretools", ft_builder.profile["fit"])
+        """
+        self._data["runtimes"].setdefault(name, []).append(profile["wall_time"])
+        self._data["cpu_times"].setdefault(name, []).append(
+            sum(stats["cpu_time"] for stats in profile["stages"].values())
+        )
+        self._data["peak_memory"].setdefault(name, []).append(
+            max(
+                (stats["peak_memory"] for stats in profile["stages"].values()),
+                default=None,
+            )
+        )
+
+        for stage, stats in profile["stages"].items():
+            stage_name = name + "." + stage
+            self._data["runtimes"].setdefault(stage_name, []).append(stats["wall_time"])
+            self._data["cpu_times"].setdefault(stage_name, []).append(stats["cpu_time"])
+            self._data["peak_memory"].setdefault(stage_name, []).append(
+                stats["peak_memory"]
+            )
+
+        self._data["counters"][name] = dict(profile["counters"])
+
+    @property
+    def counters(self):
+        """
+        The counters of the last profile ingested under every name.
+        """
+        return self._data["counters"]
 
     @property
     def runtimes(self):
-        return self._data["runtimes"]
+        """
+        The fastest wall time of every block as a timedelta.
+        """
+        return {
+            name: timedelta(seconds=min(samples))
+            for name, samples in self._data["runtimes"].items()
+        }
+
+    @property
+    def cpu_times(self):
+        """
+        The CPU time of the fastest run of every block as a timedelta.
+        """
+        return {
+            name: timedelta(seconds=self._data["cpu_times"][name][_argmin(samples)])
+            for name, samples in self._data["runtimes"].items()
+        }
+
+    @property
+    def peak_memory(self):
+        """
+        The largest peak memory of every block in bytes.
+        """
+        return {
+            name: max(samples) if None not in samples else None
+            for name, samples in self._data["peak_memory"].items()
+        }
+
+    def summary(self):
+        """
+        Returns a data frame with one row per block, summarizing
+        all of its samples.
+        """
+        rows = {}
+        for name, samples in self._data["runtimes"].items():
+            rows[name] = dict(
+                repeats=len(samples),
+                runtime=timedelta(seconds=min(samples)),
+                runtime_median=timedelta(seconds=statistics.median(samples)),
+                runtime_stddev=timedelta(
+                    seconds=statistics.stdev(samples) if len(samples) > 1 else 0.0
+                ),
+                cpu_time=self.cpu_times[name],
+                peak_memory=self.peak_memory[name],
+            )
+        return pd.DataFrame(rows).T
+
+    def to_comparison(
+        self, num_features, baseline=None, labels=None, extended=False, **scores
+    ):
+        """
+        Returns a data frame in the format of the files in
+        fastprop_benchmark/comparisons.
+
+        Args:
+
+            num_features: A dict mapping the name of each block to the
+                number of features it has built. Determines the rows.
+
+            baseline: The name of the block the runtimes are normalized
+                by. Defaults to the first block in num_features.
+
+            labels: An optional dict mapping the name of each block to
+                the label used as the index, e.g.
+                {"fastprop": "getML: FastProp"}.
+
+            extended: Whether to append the CPU time, peak memory,
+                median runtime and standard deviation of the runtime.
+
+            scores: Additional columns, each a dict mapping the name of
+                each block to a score, e.g. rsquared={...}.
+
+        Example:
+
+            benchmark.to_comparison(
+                num_features=dict(fastprop=134, featuretools=158, tsfresh=120),
+                labels={"fastprop": "getML: FastProp"},
+                rsquared=dict(
+                    fastprop=pipe_fp_pr.rsquared,
+                    featuretools=pipe_ft_pr.rsquared,
+                    tsfresh=pipe_tsf_pr.rsquared,
+                ),
+            ).to_csv("comparisons/robot.csv")
+        """
+        names = list(num_features)
+        baseline = baseline or names[0]
+        labels = labels or {}
+        runtimes = self.runtimes
+
+        def per_feature(name):
+            return runtimes[name] / num_features[name]
+
+        comparison = pd.DataFrame(
+            dict(
+                runtime=[runtimes[name] for name in names],
+                num_features=[num_features[name] for name in names],
+                features_per_second=[
+                    1.0 / per_feature(name).total_seconds() for name in names
+                ],
+                normalized_runtime=[
+                    runtimes[name] / runtimes[baseline] for name in names
+                ],
+                normalized_runtime_per_feature=[
+                    per_feature(name) / per_feature(baseline) for name in names
+                ],
+            )
+        )
+
+        for column, values in scores.items():
+            comparison[column] = [values[name] for name in names]
+
+        if extended:
+            summary = self.summary()
+            for column in ["cpu_time", "peak_memory", "runtime_median", "runtime_stddev"]:
+                comparison[column] = [summary[column][name] for name in names]
+
+        comparison.index = [labels.get(name, name) for name in names]
+
+        return comparison
+
+    def to_csv(self, fname, num_features, **kwargs):
+        """
+        Writes the result of to_comparison to fname.
+        """
+        self.to_comparison(num_features, **kwargs).to_csv(fname)
+
+
+def _argmin(values):
+    return min(range(len(values)), key=values.__getitem__)
 
 
 @contextmanager
 def benchmark(name, data):
-    begin = time.time()
+    begin = time.perf_counter()
     yield
-    end = time.time()
-    data[name] = timedelta(end - begin)
+    end = time.perf_counter()
+    data[name] = timedelta(seconds=end - begin)
@@ -0,0 +1,56 @@
+import numpy as np
+
+# Primitives whose time per feature exceeds the median by more than
+# this factor are considered pathological and never chosen.
+PATHOLOGICAL_FACTOR = 10.0
+
+
+def _choose_primitives(costs, time_budget=None):
+    """
+    Chooses the primitives with the lowest cost per feature, until
+    their estimated time exceeds time_budget. None chooses all of them,
+    except for the ones that failed, built no features or are
+    pathological.
+
+    costs is the data frame returned by profile_primitives. Returns the
+    chosen primitives and a copy of costs with two additional columns,
+    seconds_per_feature, by which the primitives are ranked, and status,
+    which states why a primitive was or was not chosen.
+    """
+    costs = costs.copy()
+    costs["status"] = "chosen"
+
+    costs.loc[costs["num_features"] == 0, "status"] = "no features"
+    costs.loc[costs["error"].notna(), "status"] = "failed"
+
+    # The cost is normalized by the number of features a primitive builds,
+    # so that primitives building many features are not penalized. Unlike
+    # features_per_second, this is well-defined for primitives that took
+    # no measurable time.
+    usable = costs["status"] == "chosen"
+    costs["seconds_per_feature"] = costs["estimated_seconds"] / costs[
+        "num_features"
+    ].where(usable)
+    if usable.any():
+        threshold = PATHOLOGICAL_FACTOR * np.nanmedian(costs["seconds_per_feature"])
+        costs.loc[usable & (costs["seconds_per_feature"] > threshold), "status"] = (
+            "pathological"
+        )
+
+    # Sorted by name first, so that ties are broken deterministically.
+    candidates = (
+        costs[costs["status"] == "chosen"]
+        .sort_index()
+        .sort_values("seconds_per_feature", kind="stable")
+    )
+
+    if time_budget is not None:
+        cumulative = candidates["estimated_seconds"].cumsum()
+        over_budget = cumulative.index[cumulative > time_budget]
+        # At least one primitive is kept, even if it exceeds the budget.
+        if len(over_budget) == len(candidates):
+            over_budget = over_budget[1:]
+        costs.loc[over_budget, "status"] = "over budget"
+        candidates = candidates.drop(index=over_budget)
+
+    return candidates.index.to_list(), costs
@@ -0,0 +1,55 @@
+import numpy as np
+
+# The maximum size of a block of columns in bytes.
+_BLOCK_BYTES = 2**27
+
+
+def _correlate_columns(data_frame, target, block_size=None):
+    """
+    Calculates the absolute Pearson correlation between the target and
+    every column of the data frame, as well as the variance of every
+    column.
+
+    Instead of calling scipy.stats.pearsonr once per column, the columns
+    are centered block by block and correlated with the target in a few
+    vectorized operations, so memory is bounded by the block size.
+
+    Just like pearsonr and np.var, columns containing NaN or inf
+    yield NaN and constant columns yield a correlation of NaN and a
+    variance of 0.
+    """
+    target = np.asarray(target, dtype=np.float64)
+    target = target - target.mean()
+    target = target / np.linalg.norm(target)
+
+    num_rows, num_cols = data_frame.shape
+
+    if block_size is None:
+        block_size = max(1, _BLOCK_BYTES // (8 * max(num_rows, 1)))
+
+    correlations = np.empty(num_cols)
+    variances = np.empty(num_cols)
+
+    for begin in range(0, num_cols, block_size):
+        end = min(begin + block_size, num_cols)
+        # Column-major, so that every column is reduced exactly
+        # like a one-dimensional array would be. The copy is needed,
+        # because the block is centered in place and to_numpy may
+        # return a view of the data frame.
+        block = np.array(
+            data_frame.iloc[:, begin:end].to_numpy(dtype=np.float64, na_value=np.nan),
+            order="F",
+            copy=True,
+        )
+        block -= block.mean(axis=0)
+        variances[begin:end] = np.mean(block * block, axis=0)
+        norms = np.linalg.norm(block, axis=0)
+        # A matrix product could round identical columns differently,
+        # depending on where they are in memory, which would make the
+        # ranking of ties vary from run to run.
+        block *= target[:, np.newaxis]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlations[begin:end] = block.sum(axis=0) / norms
+        del block
+
+    return np.abs(np.clip(correlations, -1.0, 1.0)), variances
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from .roll_data_frame import _to_nanoseconds
+
+SAMPLINGS = ["stratified", "time_blocked"]
+
+# The number of consecutive rows of an id that form a block,
+# if sampling="time_blocked".
+BLOCK_ROWS = 100
+
+
+def _sample_size(selection_sample, num_rows):
+    """
+    selection_sample is either the fraction of rows in (0, 1]
+    or the number of rows.
+    """
+    if isinstance(selection_sample, float) and selection_sample <= 1.0:
+        return max(int(round(selection_sample * num_rows)), 1)
+    return min(int(selection_sample), num_rows)
+
+
+def _draw_selection_sample(
+    data_frame, column_id, time_stamp, selection_sample, sampling, seed=0
+):
+    """
+    Draws the population rows the candidate features are selected on
+    and returns their positions in ascending order.
+
+    "stratified" draws the same share of rows from every id at random,
+    so that every id is represented. "time_blocked" draws blocks of
+    BLOCK_ROWS consecutive rows of an id at random, so that the sample
+    consists of stretches of the time series rather than isolated rows.
+    """
+    num_rows = data_frame.shape[0]
+    size = _sample_size(selection_sample, num_rows)
+
+    if size >= num_rows:
+        return np.arange(num_rows)
+
+    rng = np.random.default_rng(seed)
+    codes = pd.factorize(data_frame[column_id], use_na_sentinel=False)[0]
+
+    if sampling == "stratified":
+        # Shuffles the rows within every id and keeps the first ones.
+        order = np.lexsort((rng.random(num_rows), codes))
+        group_sizes = np.bincount(codes)
+        rank = pd.Series(codes[order]).groupby(codes[order]).cumcount().to_numpy()
+        quota = np.maximum(np.round(group_sizes * (size / num_rows)), 1)
+        return np.sort(order[rank < quota[codes[order]]])
+
+    times, _ = _to_nanoseconds(data_frame[time_stamp])
+    order = np.lexsort((times, codes))
+    rank = pd.Series(codes[order]).groupby(codes[order]).cumcount().to_numpy()
+    _, blocks = np.unique(
+        np.column_stack([codes[order], rank // BLOCK_ROWS]), axis=0, return_inverse=True
+    )
+    blocks = blocks.ravel()
+    block_sizes = np.bincount(blocks)
+
+    # Draws whole blocks until the sample is large enough.
+    permutation = rng.permutation(len(block_sizes))
+    num_blocks = np.searchsorted(np.cumsum(block_sizes[permutation]), size) + 1
+    chosen = np.zeros(len(block_sizes), dtype=bool)
+    chosen[permutation[:num_blocks]] = True
+
+    return np.sort(order[chosen[blocks]])
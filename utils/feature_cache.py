@@ -0,0 +1,179 @@
+"""
+Persistent, content-addressed cache for extracted feature matrices.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+
+def _describe_categoricals(matrix):
+    """
+    Parquet does not preserve categorical columns with non-string
+    categories, so their categories are stored separately.
+    """
+    return {
+        col: {
+            "categories": matrix[col].cat.categories.tolist(),
+            "dtype": str(matrix[col].cat.categories.dtype),
+            "ordered": bool(matrix[col].cat.ordered),
+        }
+        for col in matrix.columns
+        if isinstance(matrix[col].dtype, pd.CategoricalDtype)
+    }
+
+
+def _restore_categoricals(matrix, categoricals):
+    for col, dtype in categoricals.items():
+        matrix[col] = matrix[col].astype(
+            pd.CategoricalDtype(
+                pd.Index(dtype["categories"], dtype=dtype["dtype"]),
+                ordered=dtype["ordered"],
+            )
+        )
+    return matrix
+
+
+def _hash_data_frame(data_frame):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(data_frame.columns)).encode())
+    digest.update(repr([str(dtype) for dtype in data_frame.dtypes]).encode())
+    digest.update(
+        pd.util.hash_pandas_object(data_frame, index=True).to_numpy().tobytes()
+    )
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """
+    Stores feature matrices on disk as Parquet files, keyed by a hash of
+    the input data frame and of everything else the features depend on,
+    such as the parameters of the builder and the library versions.
+
+    The least recently used matrices are evicted once the cache
+    exceeds max_bytes.
+
+    Args:
+
+        directory: The folder the matrices are stored in.
+
+        max_bytes: The maximum size of the cache on disk.
+
+    Example:
+
+        cache = FeatureCache("feature_cache", max_bytes=2**33)
+
+        ft_builder = FTTimeSeriesBuilder(..., cache=cache)
+    """
+
+    def __init__(self, directory=".feature_cache", max_bytes=2**32):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+
+    def key(self, data_frame, *params):
+        """
+        Returns the key for the data frame and the params, which
+        must have a deterministic repr.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(_hash_data_frame(data_frame).encode())
+        digest.update(repr(params).encode())
+        return digest.hexdigest()
+
+    def _paths(self, key):
+        return self.directory / (key + ".parquet"), self.directory / (key + ".json")
+
+    def get(self, key):
+        """
+        Returns the matrix and its metadata stored under
+        the key, or None if there is none.
+        """
+        matrix_path, meta_path = self._paths(key)
+        if not matrix_path.exists() or not meta_path.exists():
+            return None
+        with open(meta_path) as file:
+            meta = json.load(file)
+        matrix = _restore_categoricals(
+            pd.read_parquet(matrix_path), meta.pop("_categoricals")
+        )
+        # The modification time marks the last use.
+        os.utime(matrix_path)
+        return matrix, meta
+
+    def put(self, key, matrix, meta):
+        """
+        Stores the matrix and its metadata under the key and
+        evicts the least recently used entries, if necessary.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        matrix_path, meta_path = self._paths(key)
+        # Written to temporary files first, so that concurrent readers
+        # never see a file that is only partially written. Every writer
+        # has files of its own, so concurrent writers of the same key
+        # never write to or move each other's files.
+        meta = {**meta, "_categoricals": _describe_categoricals(matrix)}
+        meta_tmp = self._write_temporary(lambda file: json.dump(meta, file), "w")
+        try:
+            matrix_tmp = self._write_temporary(matrix.to_parquet)
+        except BaseException:
+            os.unlink(meta_tmp)
+            raise
+        os.replace(meta_tmp, meta_path)
+        os.replace(matrix_tmp, matrix_path)
+        self._evict(keep=matrix_path)
+
+    def _write_temporary(self, write, mode="wb"):
+        """
+        Calls write with a new temporary file in the directory and
+        returns its path. The file is removed if write fails.
+        """
+        with tempfile.NamedTemporaryFile(
+            mode, dir=self.directory, suffix=".tmp", delete=False
+        ) as file:
+            try:
+                write(file)
+            except BaseException:
+                file.close()
+                os.unlink(file.name)
+                raise
+        return file.name
+
+    def fetch(self, key, compute):
+        """
+        Returns the matrix and metadata stored under the key, as well as
+        whether they were found. If they were not, compute is called,
+        which must return both, and the result is stored.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached[0], cached[1], True
+        matrix, meta = compute()
+        self.put(key, matrix, meta)
+        return matrix, meta, False
+
+    def _evict(self, keep):
+        entries = sorted(
+            self.directory.glob("*.parquet"), key=lambda path: path.stat().st_mtime
+        )
+        sizes = {path: path.stat().st_size for path in entries}
+        total = sum(sizes.values())
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            path.with_suffix(".json").unlink(missing_ok=True)
+            total -= sizes[path]
+
+    def clear(self):
+        """
+        Removes all matrices from the cache.
+        """
+        for path in self.directory.glob("*.parquet"):
+            path.unlink(missing_ok=True)
+            path.with_suffix(".json").unlink(missing_ok=True)
@@ -0,0 +1,103 @@
+"""
+On-disk store for feature matrices that do not fit into memory.
+"""
+
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+class _FeatureSpill:
+    """
+    Stores the feature matrices of several shards on disk, one
+    memory-mapped .npy file per shard. The files are column-major, so
+    that a block of columns can be read back from every shard without
+    loading the other columns.
+
+    Args:
+
+        directory: The directory the temporary files are created in.
+            None uses the default temporary directory.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(tempfile.mkdtemp(prefix="feature_spill_", dir=directory))
+        self.columns = None
+        self.dtype = None
+        self._positions = None
+        self._paths = []
+        self._indices = []
+
+    def append(self, matrix):
+        """
+        Writes the feature matrix of a shard to disk. All shards
+        must have the same columns, but not necessarily in the same
+        order, because the workers of tsfresh return their results in
+        the order they finish. They are stored in the order of the
+        first shard.
+        """
+        if self.columns is None:
+            self.columns = list(matrix.columns)
+            self.dtype = np.result_type(*matrix.dtypes)
+            self._positions = {col: i for i, col in enumerate(self.columns)}
+        elif set(matrix.columns) != set(self.columns):
+            raise ValueError("All shards must have the same columns.")
+
+        matrix = matrix[self.columns]
+
+        path = self.directory / ("shard_" + str(len(self._paths)) + ".npy")
+        stored = np.lib.format.open_memmap(
+            path, mode="w+", dtype=self.dtype, shape=matrix.shape, fortran_order=True
+        )
+        stored[:] = matrix.to_numpy(dtype=self.dtype)
+        stored.flush()
+        del stored
+
+        self._paths.append(path)
+        self._indices.append(matrix.index)
+
+    @property
+    def index(self):
+        """
+        The index of all stored rows, in the order they were appended.
+        """
+        return self._indices[0].append(self._indices[1:])
+
+    @property
+    def num_rows(self):
+        return sum(len(index) for index in self._indices)
+
+    def read(self, columns, destination=None):
+        """
+        Reads the columns of all shards into a single data frame.
+        destination is the row every stored row is written to.
+        None keeps the order they were appended in.
+        """
+        positions = [self._positions[col] for col in columns]
+        block = np.empty((self.num_rows, len(positions)), dtype=self.dtype, order="F")
+        offset = 0
+        for path in self._paths:
+            shard = np.load(path, mmap_mode="r")
+            rows = slice(offset, offset + shard.shape[0])
+            target = rows if destination is None else destination[rows]
+            block[target] = shard[:, positions]
+            offset += shard.shape[0]
+            del shard
+        return pd.DataFrame(block, columns=list(columns), copy=False)
+
+    def blocks(self, columns, block_columns, destination=None):
+        """
+        Reads the columns in blocks of at most block_columns columns.
+        """
+        columns = list(columns)
+        for begin in range(0, len(columns), block_columns):
+            yield self.read(columns[begin : begin + block_columns], destination)
+
+    def close(self):
+        """
+        Deletes the files.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
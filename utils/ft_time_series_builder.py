@@ -1,93 +1,212 @@
+import copy
 import datetime
+import functools
+import os
 import time
 import warnings
+from concurrent.futures import ProcessPoolExecutor
 
 import featuretools as ft
 from featuretools.exceptions import UnusedPrimitiveWarning
 import numpy as np
 import pandas as pd
-from pandas.api.types import is_numeric_dtype
-from scipy.stats import pearsonr
+import woodwork as ww
+from pandas.api.types import is_bool_dtype, is_integer_dtype
 
-from .add_original_columns import _add_original_columns
-from .print_time_taken import _print_time_taken
+from .add_original_columns import OUTPUTS, _add_original_columns
+from .choose_primitives import _choose_primitives
+from .draw_selection_sample import SAMPLINGS, _draw_selection_sample
+from .feature_cache import FeatureCache
+from .make_batches import _make_batches
+from .print_time_taken import _print_cache_stats, _print_time_taken
+from .rank_by_correlation import _rank_by_correlation
 from .remove_target_column import _remove_target_column
+from .roll_data_frame import (
+    _find_windows,
+    _gather_rolled,
+    _roll_data_frame,
+    _roll_data_frame_iterrows,
+)
+from .sanitize_features import _sanitize_features
+from .stage_profiler import _StageProfiler
 
 # ------------------------------------------------------------------
 
 
-class _ChunkMaker:
+def _make_entity_set(data_frame, rolled, time_stamp, logical_types=None):
+    relationships = [
+        ("population", "_featuretools_index", "peripheral", "_featuretools_join_key")
+    ]
+
+    if logical_types is None:
+        dataframes = {
+            "population": (
+                data_frame,
+                "_featuretools_index",
+                time_stamp,
+            ),
+            "peripheral": (
+                rolled,
+                "_featuretools_index",
+                time_stamp,
+            ),
+        }
+    else:
+        dataframes = {
+            "population": (
+                data_frame,
+                "_featuretools_index",
+                time_stamp,
+                {k: v for k, v in logical_types.items() if k in data_frame},
+            ),
+            "peripheral": (
+                rolled,
+                "_featuretools_index",
+                time_stamp,
+                {k: v for k, v in logical_types.items() if k in rolled},
+            ),
+        }
+
+    return ft.EntitySet("self-join-entity-set", dataframes, relationships)
+
+
+def _add_placeholder_window(population, rolled):
     """
-    Helpers class to create chunks of data frames.
+    If none of the population rows has a rolled row, featuretools
+    returns aggregations like FIRST(peripheral.ds) as objects, which
+    the transforms on top of them, like DAY, cannot handle. In that
+    case, a copy of the first population row is added as a placeholder
+    with itself as its window, under the _featuretools_index -1, which
+    has to be dropped from the feature matrix.
     """
+    if rolled.shape[0] > 0 or population.shape[0] == 0:
+        return population, rolled
 
-    def __init__(self, data_frame, id_col, time_col, horizon, memory):
-        self.data_frame = data_frame
-        self.id_col = id_col
-        self.time_col = time_col
-        self.horizon = horizon
-        self.memory = memory
+    placeholder = population.iloc[:1].copy()
+    placeholder["_featuretools_index"] = -1
 
-    def make_chunk(self, current_id, now, index):
-        """
-        Generates a chunk of the data frame that
-        contains all rows within horizon and memory.
+    placeholder_rolled = placeholder.drop(columns="_featuretools_index")
+    placeholder_rolled["index"] = 0
+    placeholder_rolled["_featuretools_join_key"] = -1
+    placeholder_rolled["_featuretools_index"] = 0
 
-        Used by roll_data_frame.
-        """
-        begin = now - self.horizon - self.memory
-        end = now - self.horizon
-        chunk = self.data_frame[
-            (self.id_col == current_id)
-            & (self.time_col > begin)
-            & (self.time_col <= end)
-        ]
-        chunk["_featuretools_join_key"] = int(index)
-        return chunk
+    return (
+        pd.concat([population, placeholder]),
+        placeholder_rolled[rolled.columns].astype(rolled.dtypes.to_dict()),
+    )
 
 
 # ------------------------------------------------------------------
 
 
-def _make_entity_set(data_frame, rolled, time_stamp):
-    relationships = [
-        ("population", "_featuretools_index", "peripheral", "_featuretools_join_key")
-    ]
+def _infer_logical_types(data_frame, time_stamp):
+    """
+    Infers the woodwork logical types on the entire population, so
+    that all batches are described by the same schema and therefore
+    produce the same feature definitions.
+    """
+    population = data_frame.copy()
+    population.ww.init(index="_featuretools_index", time_index=time_stamp)
+    return dict(population.ww.logical_types)
 
-    dataframes = {
-        "population": (
-            data_frame,
-            "_featuretools_index",
-            time_stamp,
-        ),
-        "peripheral": (
-            rolled,
-            "_featuretools_index",
-            time_stamp,
-        ),
-    }
 
-    return ft.EntitySet("self-join-entity-set", dataframes, relationships)
+# ------------------------------------------------------------------
+
+
+def _concat_feature_matrices(feature_matrices):
+    """
+    Concatenates the feature matrices of several batches.
+
+    Categorical features whose categories depend on the data are
+    rebuilt from their values, so that their categories are the ones
+    the entire data would have produced, rather than the union of
+    whatever each batch happened to contain.
+    """
+    df_extracted = pd.concat(feature_matrices)
+    for col in df_extracted:
+        dtypes = [matrix[col].dtype for matrix in feature_matrices]
+        if any(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes) and any(
+            dtype != dtypes[0] for dtype in dtypes
+        ):
+            values = np.concatenate(
+                [np.asarray(matrix[col], dtype=object) for matrix in feature_matrices]
+            )
+            df_extracted[col] = pd.Series(
+                values, index=df_extracted.index, dtype=object
+            ).astype("category")
+    return df_extracted
 
 
 # ------------------------------------------------------------------
 
 
-def _roll_data_frame(data_frame, column_id, time_stamp, horizon, memory):
+def _make_shards(ids, windows, num_shards):
     """
-    Duplicates data so that it matches the format
-    required by featuretools.
+    Splits the population rows into shards of roughly equal cost,
+    where the cost of a row is the size of its window plus one.
+
+    Returns a list of (rows, needed), where rows are the population
+    rows of the shard and needed are all rows their windows touch,
+    both as sorted positions into the data frame.
+
+    Windows never cross id boundaries, so if there are at least as
+    many ids as shards, every id goes to exactly one shard. Otherwise,
+    the rows are split into contiguous time ranges and every shard
+    also receives the rows within memory before its first row.
     """
-    id_col = data_frame[column_id]
-    time_col = pd.to_datetime(data_frame[time_stamp])
-    chunk_maker = _ChunkMaker(data_frame, id_col, time_col, horizon, memory)
-    chunks = [
-        chunk_maker.make_chunk(row[column_id], pd.to_datetime(row[time_stamp]), index)
-        for index, row in data_frame.iterrows()
-    ]
-    rolled = pd.concat(chunks, ignore_index=True).reset_index()
-    rolled["_featuretools_index"] = np.arange(rolled.shape[0])
-    return rolled
+    order, lower, upper = windows
+    codes = pd.factorize(ids)[0][order]
+    costs = (upper - lower + 1)[order]
+
+    group_begins = np.flatnonzero(np.diff(codes)) + 1
+    group_begins = np.concatenate([[0], group_begins]).astype(np.int64)
+    group_ends = np.concatenate([group_begins[1:], [len(order)]])
+
+    shards = []
+
+    if len(order) == 0:
+        pass
+    elif len(group_begins) >= num_shards:
+        group_costs = np.add.reduceat(costs, group_begins)
+        loads = np.zeros(num_shards)
+        assignment = [[] for _ in range(num_shards)]
+        for group in np.argsort(-group_costs, kind="stable"):
+            shard = int(np.argmin(loads))
+            loads[shard] += group_costs[group]
+            assignment[shard].append(group)
+        for groups in assignment:
+            if groups:
+                rows = np.sort(
+                    np.concatenate(
+                        [order[group_begins[g] : group_ends[g]] for g in groups]
+                    )
+                )
+                shards.append((rows, rows))
+    else:
+        cumulative = np.cumsum(costs)
+        bounds = np.searchsorted(
+            cumulative, cumulative[-1] * np.arange(1, num_shards) / num_shards
+        )
+        begins = np.concatenate([[0], bounds])
+        ends = np.concatenate([bounds, [len(order)]])
+        for begin, end in zip(begins, ends):
+            if begin == end:
+                continue
+            rows = order[begin:end]
+            first = min(int(lower[rows].min()), begin)
+            last = max(int(upper[rows].max()), end)
+            shards.append((np.sort(rows), np.sort(order[first:last])))
+
+    # Rows with a missing id or time stamp have empty windows.
+    invalid = np.setdiff1d(np.arange(len(lower)), order)
+    if len(invalid):
+        if shards:
+            rows, needed = shards[0]
+            shards[0] = (np.union1d(rows, invalid), np.union1d(needed, invalid))
+        else:
+            shards.append((invalid, invalid))
+
+    return shards
 
 
 # ------------------------------------------------------------------
@@ -107,7 +226,170 @@ def _hide_warnings(func):
                 message="Some specified primitives were not used during DFS")
             return func(*args, **kwargs)
     return wrapper
-    
+
+
+def _extract_shard(builder, data_frame, rows, logical_types, features):
+    """
+    Runs in a worker process. Must be a module-level function,
+    so that it can be pickled. The feature definitions are passed
+    in both directions as serialized by ft.save_features.
+    """
+    if features is not None:
+        features = ft.load_features(features)
+    feature_matrices, features = _hide_warnings(builder._extract_rows)(
+        data_frame, rows, logical_types, features=features
+    )
+    return feature_matrices, ft.save_features(features)
+
+
+# The number of rows extracted locally if backend="spark", which
+# builds the feature definitions and determines the dtypes.
+SPARK_LOCAL_ROWS = 100
+
+# Aggregation primitives that break the feature extraction.
+BREAKING_AGG_PRIMITIVES = [
+    'date_first_event',
+    'kurtosis',
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _list_primitives():
+    return ft.list_primitives()
+
+
+def _agg_primitives():
+    all_primitives = _list_primitives()
+    return (all_primitives[
+        (all_primitives.type == "aggregation")
+        & (~all_primitives.name.isin(BREAKING_AGG_PRIMITIVES))]
+        .name
+        .to_list())
+
+
+def _trans_primitives():
+    all_primitives = _list_primitives()
+    return all_primitives[all_primitives.type == "transform"].name.to_list()
+
+
+class _LazyClassAttribute:
+    """
+    A class attribute that is computed by func on first access and
+    cached, on the class as well as on its instances. Assigning to an
+    instance overrides it for that instance only.
+    """
+
+    def __init__(self, func):
+        self.func = func
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        value = self.func()
+        # Replaces the descriptor, so func is only called once.
+        setattr(owner, self.name, value)
+        return value
+
+
+def _extract_bucket(
+    columns, dtypes, time_stamp, logical_types, features, colnames, population, rolled
+):
+    """
+    Runs on a Spark worker, once per bucket of population rows, and
+    calculates their features from their rolled rows, just like
+    _extract_rows. Must be a module-level function, so that it can be
+    pickled. The features are returned as the columns _f0, _f1, ...,
+    in the order of colnames.
+    """
+    from .spark_backend import _restore_dtypes, _to_spark_values
+
+    features = ft.load_features(features)
+
+    population = population.sort_values("_position")
+    rolled = rolled.sort_values(["_join_key", "_position"])
+
+    population_frame = _restore_dtypes(population[columns].copy(), dtypes)
+    population_frame.index = population["_position"].to_numpy()
+    population_frame["_featuretools_index"] = population["_position"].to_numpy()
+
+    rolled_frame = _restore_dtypes(
+        rolled[columns].reset_index(drop=True), dtypes
+    )
+    rolled_frame["_featuretools_join_key"] = rolled["_join_key"].to_numpy()
+    rolled_frame.insert(0, "index", np.arange(rolled_frame.shape[0]))
+    rolled_frame["_featuretools_index"] = np.arange(rolled_frame.shape[0])
+
+    population_frame, rolled_frame = _add_placeholder_window(
+        population_frame, rolled_frame
+    )
+    entityset = _make_entity_set(
+        population_frame, rolled_frame, time_stamp, logical_types
+    )
+    matrix = _hide_warnings(ft.calculate_feature_matrix)(
+        features, entityset=entityset
+    ).drop(index=-1, errors="ignore")
+
+    result = pd.DataFrame({"_position": matrix.index.to_numpy(dtype=np.int64)})
+    for i, col in enumerate(colnames):
+        result["_f" + str(i)] = _to_spark_values(matrix[col]).reset_index(drop=True)
+    return result
+
+
+def _restore_feature_dtype(values, dtype):
+    """
+    Restores the dtype of a feature returned by Spark, which returns
+    integers and booleans with missing values as float and object.
+    featuretools uses the nullable dtypes for them instead. Categories
+    that do not fit are rebuilt by _concat_feature_matrices, just like
+    for the batches.
+    """
+    if isinstance(dtype, pd.CategoricalDtype):
+        categorical = pd.Series(
+            pd.Categorical(values, dtype=dtype), index=values.index
+        )
+        if categorical.isna().sum() == values.isna().sum():
+            return categorical
+        return values
+    if is_integer_dtype(dtype) or is_bool_dtype(dtype):
+        if values.isna().any():
+            return values.astype("Int64" if is_integer_dtype(dtype) else "boolean")
+        return values.astype(dtype)
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+        return values.astype(dtype)
+    return values
+
+
+def _in_original_order(df_extracted):
+    """
+    featuretools sorts the population by (time stamp, index). The
+    _featuretools_index holds the positions of the rows, so sorting by it
+    restores the order of the data frame, which the target is in.
+    """
+    if df_extracted.index.is_monotonic_increasing:
+        return df_extracted
+    return df_extracted.sort_index()
+
+
+def _uses_primitive(feature, primitive):
+    return any(
+        dependency.primitive.name == primitive
+        for dependency in [feature] + feature.get_dependencies(deep=True)
+    )
+
+
+def _select_definitions(features, selected_features):
+    """
+    Returns the feature definitions behind the selected columns. Features
+    with several outputs are kept if any of their columns was selected.
+    """
+    selected_features = set(selected_features)
+    return [
+        feature
+        for feature in features
+        if selected_features.intersection(feature.get_feature_names())
+    ]
+
 
 class FTTimeSeriesBuilder:
     """
@@ -125,19 +407,99 @@ class FTTimeSeriesBuilder:
         time_stamp: The name of the column containing the time stamps.
 
         target: The name of the target column.
+
+        rolling: The engine used to roll the data frame. "vectorized"
+                 (the default) sorts once and uses binary search to find
+                 the windows, "iterrows" is the original row-by-row
+                 implementation, kept for verification.
+
+        max_rows_per_batch: The maximum number of rows the rolled
+                 frame may have. The size of the rolled frame is
+                 estimated before extraction. If it exceeds
+                 max_rows_per_batch, the population is processed in
+                 batches, so that peak memory stays flat as the data
+                 grows. None (the default) never batches. Requires
+                 rolling="vectorized".
+
+        n_jobs: The number of processes used to run DFS. The data is
+                 sharded by id, balanced by the number of rolled rows,
+                 or by time range, if there are fewer ids than
+                 processes. -1 uses all cores. Requires
+                 rolling="vectorized".
+
+        dtype: The dtype the float features are cast to, for instance
+                 np.float32, which halves their memory footprint.
+                 None keeps float64.
+
+        output: What fit and transform return. "pandas" (the default)
+                 returns a data frame, "columns" returns a dict mapping
+                 the column names to NumPy arrays, which avoids building
+                 a data frame, for instance to pass the features to
+                 getml.data.DataFrame.from_dict. "arrow" returns a
+                 pyarrow.Table, which to_getml sends to the getML engine
+                 with the roles already set.
+
+        cache: A FeatureCache or the path of its directory. The extracted
+                 feature matrices are stored there and reused whenever
+                 the same data is passed to a builder with the same
+                 parameters. None (the default) disables caching.
+
+        time_budget: The number of seconds the feature extraction in fit
+                 should take. If passed, fit first measures the cost of
+                 every aggregation primitive on profile_rows rows (see
+                 profile_primitives) and only uses the primitives with
+                 the lowest estimated seconds per feature, until their
+                 estimated time exceeds the budget. Primitives that fail,
+                 build no features or are pathologically slow are left
+                 out.
+                 The chosen primitives are stored in chosen_primitives,
+                 their costs in primitive_costs. None (the default) uses
+                 all of agg_primitives.
+
+        profile_rows: The number of population rows the primitives
+                 are profiled on.
+
+        backend: "pandas" (the default) rolls and extracts in this
+                 process. "spark" rolls with a range join in Spark and
+                 extracts on buckets of population rows with
+                 applyInPandas, so that the rolled frame never has to fit
+                 into the memory of this process and is spilled to disk
+                 if needed. The buckets contain at most
+                 max_rows_per_batch rolled rows, if it is passed.
+                 Requires pyspark and rolling="vectorized".
+
+        spark: The SparkSession used if backend="spark", or the URL of
+                 the master to create one with. None (the default)
+                 creates a session with master "local[*]", which uses all
+                 cores of this machine.
+
+        selection_sample: The fraction (a float up to 1) or number of
+                 population rows the candidate features are extracted
+                 and selected on. The windows of these rows still cover
+                 all of their history. Only the num_features selected
+                 features are then calculated for all rows, so fit takes
+                 roughly as much less time as the share of rows left
+                 out. None (the default) selects on all rows.
+
+        sampling: How the rows for selection_sample are drawn.
+                 "stratified" (the default) draws the same share of rows
+                 from every id at random, "time_blocked" draws blocks of
+                 consecutive rows of an id.
     """
 
-    all_primitives = ft.list_primitives()
-    breaking_agg_primitives = [
-        'date_first_event',
-        'kurtosis',
-    ]
-    agg_primitives = (all_primitives[
-        (all_primitives.type == "aggregation")
-        & (~all_primitives.name.isin(breaking_agg_primitives))]
-        .name
-        .to_list())
-    trans_primitives = all_primitives[all_primitives.type == "transform"].name.to_list()
+    rolling_engines = {
+        "vectorized": _roll_data_frame,
+        "iterrows": _roll_data_frame_iterrows,
+    }
+
+    backends = ["pandas", "spark"]
+
+    # Listing the primitives takes a while, so it is
+    # only done once they are actually needed.
+    all_primitives = _LazyClassAttribute(_list_primitives)
+    breaking_agg_primitives = BREAKING_AGG_PRIMITIVES
+    agg_primitives = _LazyClassAttribute(_agg_primitives)
+    trans_primitives = _LazyClassAttribute(_trans_primitives)
 
     def __init__(
         self,
@@ -148,7 +510,68 @@ class FTTimeSeriesBuilder:
         time_stamp,
         target,
         allow_lagged_targets=False,
+        rolling="vectorized",
+        max_rows_per_batch=None,
+        n_jobs=1,
+        dtype=None,
+        output="pandas",
+        cache=None,
+        time_budget=None,
+        profile_rows=1000,
+        backend="pandas",
+        spark=None,
+        selection_sample=None,
+        sampling="stratified",
     ):
+        if rolling not in self.rolling_engines:
+            raise ValueError(
+                "rolling must be one of "
+                + str(list(self.rolling_engines))
+                + ", got "
+                + repr(rolling)
+                + "."
+            )
+
+        if max_rows_per_batch is not None and rolling != "vectorized":
+            raise ValueError('max_rows_per_batch requires rolling="vectorized".')
+
+        if n_jobs != 1 and rolling != "vectorized":
+            raise ValueError('n_jobs requires rolling="vectorized".')
+
+        if output not in OUTPUTS:
+            raise ValueError(
+                "output must be one of " + str(OUTPUTS) + ", got " + repr(output) + "."
+            )
+
+        if backend not in self.backends:
+            raise ValueError(
+                "backend must be one of "
+                + str(self.backends)
+                + ", got "
+                + repr(backend)
+                + "."
+            )
+
+        if backend == "spark" and rolling != "vectorized":
+            raise ValueError('backend="spark" requires rolling="vectorized".')
+
+        if selection_sample is not None and rolling != "vectorized":
+            raise ValueError('selection_sample requires rolling="vectorized".')
+
+        if selection_sample is not None and selection_sample <= 0:
+            raise ValueError(
+                "selection_sample must be positive, got " + repr(selection_sample) + "."
+            )
+
+        if sampling not in SAMPLINGS:
+            raise ValueError(
+                "sampling must be one of "
+                + str(SAMPLINGS)
+                + ", got "
+                + repr(sampling)
+                + "."
+            )
+
         self.num_features = num_features
         self.horizon = horizon
         self.memory = memory
@@ -156,28 +579,57 @@ class FTTimeSeriesBuilder:
         self.time_stamp = time_stamp
         self.target = target
         self.allow_lagged_targets = allow_lagged_targets
+        self.rolling = rolling
+        self.max_rows_per_batch = max_rows_per_batch
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+        self.output = output
+        self.cache = (
+            FeatureCache(cache)
+            if cache is not None and not isinstance(cache, FeatureCache)
+            else cache
+        )
+
+        self.time_budget = time_budget
+        self.profile_rows = profile_rows
+        self.backend = backend
+        self.spark = spark
+        self.selection_sample = selection_sample
+        self.sampling = sampling
 
         self._runtime = None
         self.fitted = False
         self.max_depth = 2
 
+        self.chosen_primitives = None
+        self.primitive_costs = None
+
         self.selected_features = []
+        self.feature_definitions = []
+        self.replaced_values = None
 
-    def _extract_features(self, data_frame):
-        data_frame = data_frame.reset_index()
-        del data_frame["index"]
-        rolled = _roll_data_frame(
-            data_frame, self.column_id, self.time_stamp, self.horizon, self.memory
-        )
+        self._history = {}
 
-        data_frame["_featuretools_index"] = np.arange(data_frame.shape[0])
+        self.cache_hits = 0
+        self.cache_misses = 0
 
-        entityset = _make_entity_set(data_frame, rolled, self.time_stamp)
-        df_extracted, _ = ft.dfs(
+        self._profiler = _StageProfiler()
+        self._profiles = {}
+
+    def _primitives_in_use(self):
+        if self.chosen_primitives is None:
+            return self.agg_primitives
+        return self.chosen_primitives
+
+    def _run_dfs(self, entityset, features_only=False, agg_primitives=None):
+        return ft.dfs(
             entityset=entityset,
-            agg_primitives=self.agg_primitives,
+            agg_primitives=(
+                self._primitives_in_use() if agg_primitives is None else agg_primitives
+            ),
             target_dataframe_name="population",
             max_depth=self.max_depth,
+            features_only=features_only,
             ignore_columns={
                 "peripheral": [
                     self.column_id,
@@ -189,73 +641,771 @@ class FTTimeSeriesBuilder:
             },
         )
 
-        for col in df_extracted:
-            if is_numeric_dtype(df_extracted[col]):
-                df_extracted[col][df_extracted[col].isna()] = 0
+    def _extract_features(self, data_frame, features=None):
+        """
+        Extracts the features and returns the feature matrix as well as
+        the feature definitions. If features is passed, only these
+        definitions are calculated instead of running the full DFS.
 
-        return df_extracted
+        If there is a cache, the result is looked up there first.
+        """
+        if self.cache is None:
+            return self._compute_features(data_frame, features)
 
-    def _select_features(self, data_frame, target):
-        colnames = np.asarray(data_frame.columns)
-        print("Selecting the best out of " + str(len(colnames)) + " features...")
-        colnames = np.asarray(
-            [
-                col
-                for col in colnames
-                if is_numeric_dtype(data_frame[col])
-                and np.var(np.asarray(data_frame[col])) > 0.0
+        serialized = None if features is None else ft.save_features(features)
+
+        key = self.cache.key(
+            data_frame,
+            "featuretools",
+            ft.__version__,
+            ww.__version__,
+            pd.__version__,
+            np.__version__,
+            self.horizon,
+            self.memory,
+            self.column_id,
+            self.time_stamp,
+            self.max_depth,
+            sorted(self._primitives_in_use()),
+            str(np.dtype(self.dtype or np.float64)),
+            serialized,
+        )
+
+        def compute():
+            df_extracted, definitions = self._compute_features(data_frame, features)
+            return df_extracted, {
+                "features": ft.save_features(definitions),
+                "replaced_values": self.replaced_values.to_dict(),
+            }
+
+        df_extracted, meta, hit = self.cache.fetch(key, compute)
+
+        if hit:
+            self.cache_hits += 1
+            self._profiler.count("cache_hits", 1)
+        else:
+            self.cache_misses += 1
+            self._profiler.count("cache_misses", 1)
+
+        self.replaced_values = pd.Series(meta["replaced_values"], dtype=np.int64)
+
+        return df_extracted, ft.load_features(meta["features"])
+
+    def _compute_features(self, data_frame, features=None):
+        data_frame = data_frame.reset_index()
+        del data_frame["index"]
+
+        num_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+
+        windows = None
+        if self.backend == "spark":
+            pass
+        elif self.max_rows_per_batch is not None or num_jobs > 1:
+            with self._profiler.stage("rolling"):
+                windows = _find_windows(
+                    data_frame,
+                    self.column_id,
+                    self.time_stamp,
+                    self.horizon,
+                    self.memory,
+                )
+            num_rolled = int(np.sum(windows[2] - windows[1]))
+            if self.max_rows_per_batch is not None:
+                if num_rolled > self.max_rows_per_batch:
+                    print(
+                        "The rolled data frame would have "
+                        + str(num_rolled)
+                        + " rows, extracting in batches of at most "
+                        + str(self.max_rows_per_batch)
+                        + " rows..."
+                    )
+                elif num_jobs <= 1:
+                    windows = None
+
+        if self.backend == "spark":
+            df_extracted, features = self._extract_features_spark(
+                data_frame, features
+            )
+        elif windows is None:
+            df_extracted, features = self._extract_features_single(
+                data_frame, features
+            )
+        else:
+            df_extracted, features = self._extract_features_sharded(
+                data_frame, windows, num_jobs, features
+            )
+
+        df_extracted = _in_original_order(df_extracted)
+
+        with self._profiler.stage("sanitization"):
+            df_extracted, self.replaced_values = _sanitize_features(
+                df_extracted, replace_inf=False, dtype=self.dtype
+            )
+
+        return df_extracted, features
+
+    def _extract_features_single(self, data_frame, features):
+        with self._profiler.stage("rolling"):
+            rolled = self.rolling_engines[self.rolling](
+                data_frame, self.column_id, self.time_stamp, self.horizon, self.memory
+            )
+
+        self._profiler.count("population_rows", data_frame.shape[0])
+        self._profiler.count("rolled_rows", rolled.shape[0])
+
+        data_frame["_featuretools_index"] = np.arange(data_frame.shape[0])
+
+        with self._profiler.stage("extraction"):
+            entityset = _make_entity_set(data_frame, rolled, self.time_stamp)
+
+            if features is None:
+                df_extracted, features = self._run_dfs(entityset)
+            else:
+                df_extracted = ft.calculate_feature_matrix(
+                    features, entityset=entityset
+                )
+
+        return df_extracted, features
+
+    def _extract_features_sharded(self, data_frame, windows, num_jobs, features):
+        population = data_frame.copy()
+        population["_featuretools_index"] = np.arange(population.shape[0])
+        logical_types = _infer_logical_types(population, self.time_stamp)
+
+        num_shards = min(num_jobs, data_frame.shape[0])
+
+        if num_shards <= 1:
+            feature_matrices, features = self._extract_rows(
+                data_frame,
+                np.arange(data_frame.shape[0]),
+                logical_types,
+                windows,
+                features,
+            )
+        else:
+            shards = _make_shards(data_frame[self.column_id], windows, num_shards)
+            print("Extracting features in " + str(len(shards)) + " processes...")
+            # The workers profile copies of the builder, so the
+            # counters are taken from the windows instead.
+            self._profiler.count("population_rows", data_frame.shape[0])
+            self._profiler.count("rolled_rows", int(np.sum(windows[2] - windows[1])))
+            serialized = None if features is None else ft.save_features(features)
+            with self._profiler.stage("extraction"), ProcessPoolExecutor(
+                max_workers=len(shards)
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _extract_shard,
+                        self,
+                        data_frame.iloc[needed],
+                        np.searchsorted(needed, rows),
+                        logical_types,
+                        serialized,
+                    )
+                    for rows, needed in shards
+                ]
+                results = [future.result() for future in futures]
+            feature_matrices = [
+                matrix for matrices, _ in results for matrix in matrices
             ]
+            if features is None:
+                features = ft.load_features(results[0][1])
+
+        df_extracted = _concat_feature_matrices(feature_matrices)
+        return df_extracted, features
+
+    def _extract_features_spark(self, data_frame, features):
+        # pyspark is only needed, and therefore only imported, here.
+        from .spark_backend import (
+            _apply_to_buckets,
+            _get_spark_session,
+            _make_schema,
+            _num_buckets,
+            _roll_by_time,
+            _to_spark,
         )
-        correlations = np.asarray(
-            [np.abs(pearsonr(target, data_frame[col]))[0] for col in colnames]
+
+        spark = _get_spark_session(self.spark)
+
+        population = data_frame.copy()
+        population["_featuretools_index"] = np.arange(population.shape[0])
+        logical_types = _infer_logical_types(population, self.time_stamp)
+
+        with self._profiler.stage("rolling"):
+            windows = _find_windows(
+                data_frame, self.column_id, self.time_stamp, self.horizon, self.memory
+            )
+
+        # The first rows are extracted locally. That builds the feature
+        # definitions and tells us the dtypes of the result.
+        num_local = min(SPARK_LOCAL_ROWS, data_frame.shape[0])
+        feature_matrices, features = self._extract_rows(
+            data_frame, np.arange(num_local), logical_types, windows, features
         )
-        correlations[np.isnan(correlations) | np.isinf(correlations)] = 0.0
+        colnames = list(feature_matrices[0].columns)
 
-        self.selected_features = colnames[np.argsort(correlations)][::-1][
-            : self.num_features
-        ]
+        if num_local < data_frame.shape[0]:
+            remaining = windows[2][num_local:] - windows[1][num_local:]
+            self._profiler.count("population_rows", data_frame.shape[0] - num_local)
+            self._profiler.count("rolled_rows", int(np.sum(remaining)))
+
+            data, dtypes = _to_spark(spark, data_frame, self.time_stamp)
+            rolled = _roll_by_time(
+                data,
+                self.column_id,
+                pd.Timedelta(self.horizon).value,
+                pd.Timedelta(self.memory).value,
+            )
+
+            extract = functools.partial(
+                _extract_bucket,
+                list(data_frame.columns),
+                dtypes,
+                self.time_stamp,
+                logical_types,
+                ft.save_features(features),
+                colnames,
+            )
+
+            schema = _make_schema(
+                {
+                    "_position": np.dtype(np.int64),
+                    **{
+                        "_f" + str(i): feature_matrices[0][col].dtype
+                        for i, col in enumerate(colnames)
+                    },
+                }
+            )
+
+            print("Extracting features with Spark...")
+
+            with self._profiler.stage("extraction"):
+                result = _apply_to_buckets(
+                    rolled,
+                    extract,
+                    schema,
+                    _num_buckets(spark, int(np.sum(remaining)), self.max_rows_per_batch),
+                    population=data,
+                    first_position=num_local,
+                ).toPandas()
+
+            matrix = result.set_index("_position").set_axis(colnames, axis=1)
+            matrix.index.name = feature_matrices[0].index.name
+            for col in colnames:
+                matrix[col] = _restore_feature_dtype(
+                    matrix[col], feature_matrices[0][col].dtype
+                )
+            feature_matrices.append(matrix)
+
+        df_extracted = _concat_feature_matrices(feature_matrices)
+        return df_extracted, features
+
+    def _extract_rows(
+        self, data_frame, rows, logical_types, windows=None, features=None
+    ):
+        """
+        Extracts the features for the population rows at the positions
+        rows, in batches of at most max_rows_per_batch rolled rows.
+
+        The index of data_frame must contain the global row positions,
+        so that shards of the data frame can be passed as well.
+
+        Returns the feature matrices of all batches and the feature
+        definitions, which are built by DFS unless features is passed.
+        """
+        if windows is None:
+            windows = _find_windows(
+                data_frame, self.column_id, self.time_stamp, self.horizon, self.memory
+            )
+        order, lower, upper = windows
+
+        population = data_frame.iloc[rows].copy()
+        population["_featuretools_index"] = np.asarray(data_frame.index)[rows]
+        join_keys = population["_featuretools_index"].to_numpy()
+
+        max_rows_per_batch = (
+            np.inf if self.max_rows_per_batch is None else self.max_rows_per_batch
+        )
+
+        feature_matrices = []
+
+        self._profiler.count("population_rows", len(rows))
+
+        for begin, end in _make_batches((upper - lower)[rows], max_rows_per_batch):
+            batch = rows[begin:end]
+            with self._profiler.stage("rolling"):
+                rolled = _gather_rolled(
+                    data_frame, order, lower[batch], upper[batch], join_keys[begin:end]
+                )
+            self._profiler.count("rolled_rows", rolled.shape[0])
+            with self._profiler.stage("extraction"):
+                entityset = _make_entity_set(
+                    *_add_placeholder_window(population.iloc[begin:end], rolled),
+                    self.time_stamp,
+                    logical_types,
+                )
+                if features is None:
+                    features = self._run_dfs(entityset, features_only=True)
+                feature_matrices.append(
+                    ft.calculate_feature_matrix(features, entityset=entityset).drop(
+                        index=-1, errors="ignore"
+                    )
+                )
+            del rolled, entityset
+
+        return feature_matrices, features
+
+    @_hide_warnings
+    def profile_primitives(self, data_frame, primitives=None, seed=0):
+        """
+        Measures how long every aggregation primitive takes to calculate
+        its features on a random sample of profile_rows population rows.
+
+        Returns a data frame with one row per primitive, containing
+        the number of features it builds, the seconds it takes on the
+        sample, the features per second, the seconds it is estimated to
+        take on the entire data frame and the error, if it has failed.
+
+        Args:
+
+            data_frame: The data frame to profile on, without the target.
+
+            primitives: The primitives to profile. Defaults to
+                agg_primitives.
+
+            seed: The seed used to draw the sample.
+        """
+        primitives = self.agg_primitives if primitives is None else primitives
+
+        data_frame = data_frame.reset_index(drop=True)
+        windows = _find_windows(
+            data_frame, self.column_id, self.time_stamp, self.horizon, self.memory
+        )
+        order, lower, upper = windows
+
+        num_rows = min(self.profile_rows, data_frame.shape[0])
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(data_frame.shape[0], num_rows, replace=False))
+
+        population = data_frame.iloc[rows].copy()
+        population["_featuretools_index"] = rows
+        rolled = _gather_rolled(data_frame, order, lower[rows], upper[rows], rows)
+        entityset = _make_entity_set(
+            population,
+            rolled,
+            self.time_stamp,
+            _infer_logical_types(population, self.time_stamp),
+        )
+
+        # The time scales with the number of rolled and population rows.
+        scale = (np.sum(upper - lower) + data_frame.shape[0]) / max(
+            rolled.shape[0] + num_rows, 1
+        )
+
+        costs = {}
+
+        for primitive in primitives:
+            try:
+                features = [
+                    feature
+                    for feature in self._run_dfs(
+                        entityset, features_only=True, agg_primitives=[primitive]
+                    )
+                    if _uses_primitive(feature, primitive)
+                ]
+                begin = time.perf_counter()
+                if features:
+                    ft.calculate_feature_matrix(features, entityset=entityset)
+                seconds = time.perf_counter() - begin
+                error = None
+            except Exception as exc:
+                features, seconds, error = [], np.nan, repr(exc)
+
+            costs[primitive] = dict(
+                num_features=len(features),
+                seconds=seconds,
+                features_per_second=len(features) / seconds if seconds else np.nan,
+                estimated_seconds=seconds * scale,
+                error=error,
+            )
+
+        return pd.DataFrame.from_dict(costs, orient="index")
+
+    def _choose_primitives(self, data_frame):
+        print(
+            "Profiling "
+            + str(len(self.agg_primitives))
+            + " primitives on "
+            + str(min(self.profile_rows, data_frame.shape[0]))
+            + " rows..."
+        )
+        costs = self.profile_primitives(data_frame)
+        self.chosen_primitives, self.primitive_costs = _choose_primitives(
+            costs, self.time_budget
+        )
+        chosen = self.primitive_costs.loc[self.chosen_primitives]
+        print(
+            "Chose "
+            + str(len(self.chosen_primitives))
+            + " primitives, which are estimated to take "
+            + str(round(chosen["estimated_seconds"].sum(), 2))
+            + " seconds: "
+            + ", ".join(self.chosen_primitives)
+        )
+
+    def _select_features(self, data_frame, target):
+        print(
+            "Selecting the best out of " + str(len(data_frame.columns)) + " features..."
+        )
+        self.selected_features = _rank_by_correlation(
+            data_frame, target, self.num_features
+        )
         return data_frame[self.selected_features]
 
+    def _select_on_sample(self, data_frame, target):
+        """
+        Extracts the candidate features for a sample of the population
+        rows, selects the best of them and returns the definitions
+        behind the selected columns.
+        """
+        data_frame = data_frame.reset_index(drop=True)
+
+        rows = _draw_selection_sample(
+            data_frame,
+            self.column_id,
+            self.time_stamp,
+            self.selection_sample,
+            self.sampling,
+        )
+
+        print(
+            "Selecting on a sample of "
+            + str(len(rows))
+            + " out of "
+            + str(data_frame.shape[0])
+            + " rows..."
+        )
+
+        self._profiler.count("sampled_rows", len(rows))
+
+        # The logical types are inferred on all rows, so
+        # that DFS builds the same features as it would on them.
+        population = data_frame.copy()
+        population["_featuretools_index"] = np.arange(population.shape[0])
+        logical_types = _infer_logical_types(population, self.time_stamp)
+
+        feature_matrices, features = self._extract_rows(
+            data_frame, rows, logical_types
+        )
+        df_extracted = _concat_feature_matrices(feature_matrices).loc[rows]
+
+        with self._profiler.stage("sanitization"):
+            df_extracted, _ = _sanitize_features(
+                df_extracted, replace_inf=False, dtype=self.dtype
+            )
+
+        self._profiler.count("candidate_features", df_extracted.shape[1])
+
+        with self._profiler.stage("selection"):
+            self._select_features(df_extracted, target[rows])
+
+        return _select_definitions(features, self.selected_features)
+
+    def _extract_selected(self, data_frame):
+        """
+        Calculates the feature definitions behind the selected columns
+        for all rows. If no feature has been selected, there is nothing
+        to calculate, so DFS is not run at all, which an empty list of
+        definitions would not guarantee.
+        """
+        if len(self.selected_features) == 0:
+            return pd.DataFrame(
+                index=pd.RangeIndex(data_frame.shape[0], name="_featuretools_index")
+            )
+
+        df_extracted, _ = self._extract_features(data_frame, self.feature_definitions)
+
+        return df_extracted[self.selected_features]
+
     @_hide_warnings
     def fit(self, data_frame):
         """
         Fits the DFS on the data frame and returns
         the features for the training set.
+
+        If selection_sample is passed, the DFS is fitted on a
+        sample of the rows and only the selected features are
+        calculated for all of them.
         """
         print("featuretools: Trying features...")
         begin = time.time()
+        self._profiler = _StageProfiler()
         target = np.asarray(data_frame[self.target])
         df_for_extraction = (
             data_frame
             if self.allow_lagged_targets
             else _remove_target_column(data_frame, self.target)
         )
-        df_extracted = self._extract_features(df_for_extraction)
-        df_selected = self._select_features(df_extracted, target)
-        df_selected = _add_original_columns(data_frame, df_selected)
+        if self.time_budget is not None:
+            with self._profiler.stage("primitive_profiling"):
+                self._choose_primitives(df_for_extraction)
+            self._profiler.count("chosen_primitives", len(self.chosen_primitives))
+        if self.selection_sample is None:
+            df_extracted, features = self._extract_features(df_for_extraction)
+            self._profiler.count("candidate_features", df_extracted.shape[1])
+            with self._profiler.stage("selection"):
+                df_selected = self._select_features(df_extracted, target)
+                self.feature_definitions = _select_definitions(
+                    features, self.selected_features
+                )
+        else:
+            self.feature_definitions = self._select_on_sample(
+                df_for_extraction, target
+            )
+            df_selected = self._extract_selected(df_for_extraction)
+        self._profiler.count("selected_features", len(self.selected_features))
+        self._history = {}
+        with self._profiler.stage("add_original_columns"):
+            df_selected = _add_original_columns(data_frame, df_selected, self.output)
+        self._profiles["fit"] = self._profiler.to_dict()
         end = time.time()
         _print_time_taken(begin, end)
+        if self.cache is not None:
+            _print_cache_stats(self.cache_hits, self.cache_misses)
         self.fitted = True
         self._runtime = datetime.timedelta(seconds=end - begin)
         return df_selected
 
+    def _copy_for(self, target, horizon):
+        """
+        Returns an unfitted copy of the builder with a different
+        target and horizon, which shares the profiler and the cache.
+        """
+        builder = copy.copy(self)
+        builder.target = target
+        builder.horizon = horizon
+        builder._history = {}
+        builder._profiles = {}
+        return builder
+
+    @_hide_warnings
+    def fit_many(self, data_frame, pairs):
+        """
+        Fits one selection per (target, horizon) pair in pairs.
+
+        The windows depend on the horizon, but not on the target, so the
+        candidate features are extracted once per distinct horizon and
+        only the selection runs once per pair. All targets are left out
+        of the extraction, unless allow_lagged_targets is set, so that
+        no target ends up in the features of another one. The builder
+        itself is not fitted.
+
+        Returns two dicts, both keyed by the pairs: the fitted copies
+        of the builder, which have the target and horizon of their pair,
+        and their features for the training set.
+
+        Args:
+
+            data_frame: The data frame to fit on, containing all targets.
+
+            pairs: The (target, horizon) pairs, for instance
+                [("y", pd.Timedelta(0)), ("y", pd.Timedelta(hours=1))].
+        """
+        pairs = list(dict.fromkeys(tuple(pair) for pair in pairs))
+
+        if not pairs:
+            raise ValueError("pairs must contain at least one (target, horizon) pair.")
+
+        if self.selection_sample is not None:
+            raise ValueError("fit_many does not support selection_sample.")
+
+        targets = list(dict.fromkeys(target for target, _ in pairs))
+        horizons = list(dict.fromkeys(horizon for _, horizon in pairs))
+
+        print(
+            "featuretools: Trying features for "
+            + str(len(targets))
+            + " targets and "
+            + str(len(horizons))
+            + " horizons..."
+        )
+        begin = time.time()
+        self._profiler = _StageProfiler()
+
+        df_for_extraction = data_frame
+        if not self.allow_lagged_targets:
+            for target in targets:
+                df_for_extraction = _remove_target_column(df_for_extraction, target)
+
+        if self.time_budget is not None:
+            with self._profiler.stage("primitive_profiling"):
+                self._choose_primitives(df_for_extraction)
+            self._profiler.count("chosen_primitives", len(self.chosen_primitives))
+
+        builders = {}
+        features_train = {}
+
+        for horizon in horizons:
+            extractor = self._copy_for(self.target, horizon)
+            df_extracted, features = extractor._extract_features(df_for_extraction)
+            self.cache_hits = extractor.cache_hits
+            self.cache_misses = extractor.cache_misses
+            self._profiler.count("candidate_features", df_extracted.shape[1])
+
+            for target, horizon_of_pair in pairs:
+                if horizon_of_pair != horizon:
+                    continue
+                builder = extractor._copy_for(target, horizon)
+                with self._profiler.stage("selection"):
+                    df_selected = builder._select_features(
+                        df_extracted, np.asarray(data_frame[target])
+                    )
+                    builder.feature_definitions = _select_definitions(
+                        features, builder.selected_features
+                    )
+                self._profiler.count("selected_features", len(builder.selected_features))
+                with self._profiler.stage("add_original_columns"):
+                    features_train[(target, horizon)] = _add_original_columns(
+                        data_frame, df_selected, self.output
+                    )
+                builders[(target, horizon)] = builder
+
+            del df_extracted
+
+        self._profiles["fit_many"] = self._profiler.to_dict()
+        end = time.time()
+        _print_time_taken(begin, end)
+        if self.cache is not None:
+            _print_cache_stats(self.cache_hits, self.cache_misses)
+
+        for builder in builders.values():
+            builder._profiler = _StageProfiler()
+            builder.fitted = True
+            builder._runtime = datetime.timedelta(seconds=end - begin)
+
+        return builders, features_train
+
     @property
     def runtime(self):
         if self.fitted:
             return self._runtime
-    
+
+    @property
+    def profile(self):
+        """
+        The profiles of the last calls to fit, fit_many, transform and
+        partial_transform, keyed by the name of the method.
+
+        Every profile contains the total wall time and, for every
+        stage (rolling, extraction, sanitization, selection and
+        add_original_columns), the wall time, CPU time and peak memory,
+        which is the peak resident set size of this process. The
+        counters contain the number of population and rolled rows,
+        the average window size, the number of sampled rows, candidate
+        and selected features and the cache hits and misses. Times are
+        in seconds, memory is in bytes. Can be passed to Benchmark.ingest.
+        """
+        return self._profiles
+
     @_hide_warnings
     def transform(self, data_frame):
         """
-        Fits the DFS on the data frame and returns
-        the features for the training set.
+        Calculates the features selected by fit for the data frame.
+        Only the feature definitions behind the selected columns are
+        calculated, not the full DFS.
         """
+        self._profiler = _StageProfiler()
         df_for_extraction = (
             data_frame
             if self.allow_lagged_targets
             else _remove_target_column(data_frame, self.target)
         )
-        df_extracted = self._extract_features(df_for_extraction)
-        df_selected = df_extracted[self.selected_features]
-        df_selected = _add_original_columns(data_frame, df_selected)
+        df_selected = self._extract_selected(df_for_extraction)
+        self._profiler.count("selected_features", len(self.selected_features))
+        with self._profiler.stage("add_original_columns"):
+            df_selected = _add_original_columns(data_frame, df_selected, self.output)
+        self._profiles["transform"] = self._profiler.to_dict()
+        return df_selected
+
+    def _evict(self, data_frame):
+        """
+        Keeps the rows that can still fall into the window of a row
+        that is later than the latest row of its id.
+        """
+        times = pd.to_datetime(data_frame[self.time_stamp])
+        latest = times.groupby(data_frame[self.column_id]).transform("max")
+        return data_frame[times > latest - self.horizon - self.memory]
+
+    @_hide_warnings
+    def partial_transform(self, new_rows):
+        """
+        Calculates the features selected by fit for new rows, which
+        are appended to the rows passed to previous calls.
+
+        Only the recent history of every id, the rows within memory
+        and horizon of its latest row, is kept, so the time per call
+        depends on the number of new rows and the size of their windows,
+        but not on the length of the history. The rows of every id must
+        arrive in the order of their time stamps. The result matches
+        that of transform on all rows passed so far, in the order
+        of new_rows. fit resets the history.
+        """
+        if not self.fitted:
+            raise ValueError("The builder must be fitted before partial_transform.")
+
+        self._profiler = _StageProfiler()
+
+        df_for_extraction = (
+            new_rows
+            if self.allow_lagged_targets
+            else _remove_target_column(new_rows, self.target)
+        ).reset_index(drop=True)
+
+        # The history is kept per id, because other ids
+        # do not affect the windows of the new rows.
+        history = [
+            self._history[key]
+            for key in df_for_extraction[self.column_id].unique()
+            if key in self._history
+        ]
+        data_frame = pd.concat(history + [df_for_extraction], ignore_index=True)
+
+        if len(self.selected_features) == 0:
+            df_selected = pd.DataFrame(index=new_rows.index)
+        else:
+            rows = np.arange(
+                data_frame.shape[0] - new_rows.shape[0], data_frame.shape[0]
+            )
+
+            population = data_frame.copy()
+            population["_featuretools_index"] = np.arange(population.shape[0])
+            logical_types = _infer_logical_types(population, self.time_stamp)
+
+            feature_matrices, _ = self._extract_rows(
+                data_frame, rows, logical_types, features=self.feature_definitions
+            )
+            df_extracted = _concat_feature_matrices(feature_matrices).loc[rows]
+
+            with self._profiler.stage("sanitization"):
+                df_extracted, self.replaced_values = _sanitize_features(
+                    df_extracted, replace_inf=False, dtype=self.dtype
+                )
+
+            df_selected = df_extracted[self.selected_features].set_axis(
+                new_rows.index
+            )
+
+        for key in df_for_extraction[self.column_id].unique():
+            self._history.pop(key, None)
+
+        for key, rows_of_id in self._evict(data_frame).groupby(
+            self.column_id, sort=False
+        ):
+            self._history[key] = rows_of_id
+
+        with self._profiler.stage("add_original_columns"):
+            df_selected = _add_original_columns(new_rows, df_selected, self.output)
+
+        self._profiles["partial_transform"] = self._profiler.to_dict()
+
         return df_selected
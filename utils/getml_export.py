@@ -0,0 +1,84 @@
+import pandas as pd
+
+# The number of rows sent to the getML engine at a time.
+BATCH_ROWS = 100_000
+
+
+def _is_numeric(arrow_type):
+    import pyarrow as pa
+
+    return (
+        pa.types.is_integer(arrow_type)
+        or pa.types.is_floating(arrow_type)
+        or pa.types.is_boolean(arrow_type)
+    )
+
+
+def _infer_roles(schema, builder):
+    """
+    The id is the join key, the time stamp and the target keep their
+    roles and every other numerical column, the features as well as the
+    original columns, is numerical. The remaining columns are unused.
+    """
+    roles = {
+        "join_key": [],
+        "time_stamp": [],
+        "target": [],
+        "numerical": [],
+        "unused_string": [],
+    }
+
+    special = {
+        builder.column_id: "join_key",
+        builder.time_stamp: "time_stamp",
+        builder.target: "target",
+    }
+
+    for field in schema:
+        if field.name in special:
+            roles[special[field.name]].append(field.name)
+        elif _is_numeric(field.type):
+            roles["numerical"].append(field.name)
+        else:
+            roles["unused_string"].append(field.name)
+
+    return roles
+
+
+def to_getml(features, name, builder, batch_rows=BATCH_ROWS):
+    """
+    Sends the features returned by a builder's fit or transform to the
+    getML engine and returns the getml.data.DataFrame.
+
+    The roles are assigned when the data frame is created, based on the
+    builder's column_id, time_stamp and target, so there is no need to
+    set them column by column afterwards. The table is sent in record
+    batches of batch_rows rows, so no intermediate copy of the whole
+    table is made.
+
+    Args:
+
+        features: The features, ideally returned with output="arrow".
+            Data frames and dicts of columns are converted to a
+            pyarrow.Table first.
+
+        name: The name of the data frame in the getML engine.
+
+        builder: The fitted builder that has returned the features.
+
+        batch_rows: The number of rows per record batch.
+    """
+    import getml
+    import pyarrow as pa
+
+    # The index is not a column of the features, so it is not sent.
+    if isinstance(features, pd.DataFrame):
+        features = pa.Table.from_pandas(features, preserve_index=False)
+    elif not isinstance(features, pa.Table):
+        features = pa.table(features)
+
+    roles = _infer_roles(features.schema, builder)
+
+    data_frame = getml.data.DataFrame(name, roles)
+
+    return data_frame.read_arrow(features.to_batches(max_chunksize=batch_rows))
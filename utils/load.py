@@ -1,49 +1,547 @@
+import hashlib
+import json
+import os
+import queue
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import getml
+import pandas as pd
 
+CACHE_DIR = Path(".getml_cache")
 
-def load_or_query(conn, name, **kwargs):
+# The size of the chunks CSV files are hashed in.
+_HASH_CHUNK_BYTES = 2**20
+
+# Unless checkpoint_every is passed, a checkpoint is written once the
+# batches read since the last one have taken this many times as long as
+# saving the data frame did. Saving the entire data frame takes longer
+# the more rows it has, so this keeps the checkpoints to a fixed share
+# of the time instead of writing every row over and over again.
+CHECKPOINT_RATIO = 10
+
+
+def _cache_path(name, suffix, cache_dir):
+    cache_dir = Path(cache_dir or CACHE_DIR) / str(getml.project.name)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / (name + suffix)
+
+
+def _read_json(name, suffix, cache_dir):
+    path = _cache_path(name, suffix, cache_dir)
+    if not path.exists():
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+def _write_json(name, suffix, content, cache_dir):
+    # Written to a temporary file first, so that an interruption
+    # never leaves a truncated file behind.
+    path = _cache_path(name, suffix, cache_dir)
+    with open(path.with_suffix(".tmp"), "w") as file:
+        json.dump(content, file, indent=2, default=str)
+    os.replace(path.with_suffix(".tmp"), path)
+
+
+def _read_fingerprint(name, cache_dir):
+    return _read_json(name, ".json", cache_dir)
+
+
+def _write_fingerprint(name, fingerprint, cache_dir):
+    _write_json(name, ".json", fingerprint, cache_dir)
+
+
+def _options(kwargs):
     """
-    Loads the data from disk (the project folder) if present, if not, queries it from
-    the database associated with `conn`.
+    Keyword arguments like the roles change the resulting data frame,
+    so they are part of the fingerprint.
+    """
+    return json.dumps(kwargs, sort_keys=True, default=str)
+
+
+def _hash_file(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
-    `kwargs` are passed to `getml.data.DataFrame.from_db`.
+def _fingerprint_url(url):
+    """
+    Fingerprints a remote file by the headers of a HEAD request.
+    Returns None, if the server cannot be reached.
+    """
+    request = urllib.request.Request(url, method="HEAD")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            headers = response.headers
+    except OSError:
+        return None
+    return {
+        "path": url,
+        "size": headers.get("Content-Length"),
+        "etag": headers.get("ETag"),
+        "last_modified": headers.get("Last-Modified"),
+    }
+
+
+def _fingerprint_file(path, previous):
+    """
+    Fingerprints a local file by its size, modification time and
+    content hash. The file is only hashed if its size or modification
+    time differ from the previous fingerprint.
+    """
+    stat = os.stat(path)
+    fingerprint = {
+        "path": str(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+    if (
+        previous is not None
+        and previous.get("size") == stat.st_size
+        and previous.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        fingerprint["hash"] = previous["hash"]
+    else:
+        fingerprint["hash"] = _hash_file(path)
+    return fingerprint
+
+
+def _fingerprint_csv(csv_files, kwargs, previous):
+    """
+    Returns the fingerprint of the CSV files or None, if
+    a remote file cannot be checked.
+    """
+    previous_files = {
+        file["path"]: file for file in (previous or {}).get("files", [])
+    }
+
+    files = []
+    for csv_file in csv_files:
+        csv_file = str(csv_file)
+        if "://" in csv_file:
+            fingerprint = _fingerprint_url(csv_file)
+            if fingerprint is None:
+                return None
+        else:
+            fingerprint = _fingerprint_file(csv_file, previous_files.get(csv_file))
+        files.append(fingerprint)
+
+    return {"files": files, "options": _options(kwargs)}
+
+
+def _is_valid(fingerprint, previous):
+    """
+    The modification times are not compared, so a file that has
+    been touched, but not changed, does not invalidate the cache.
     """
 
+    def _strip(fingerprint):
+        return {
+            "files": [
+                {key: value for key, value in file.items() if key != "mtime_ns"}
+                for file in fingerprint.get("files", [])
+            ],
+            **{key: value for key, value in fingerprint.items() if key != "files"},
+        }
+
+    return previous is not None and _strip(fingerprint) == _strip(previous)
+
+
+def _probe(conn, source, time_stamp):
+    """
+    Counts the rows of the source and retrieves its latest time stamp,
+    so that appended rows invalidate the cache.
+    """
+    columns = "COUNT(*) AS num_rows"
+    if time_stamp is not None:
+        columns += f", MAX({time_stamp}) AS max_time_stamp"
+    probe = getml.database.get(f"SELECT {columns} FROM {source} AS source", conn=conn)
+    return {col: str(probe[col].iloc[0]) for col in probe.columns}
+
+
+def _fingerprint_db(conn, name, query, probe, time_stamp, kwargs):
+    fingerprint = {
+        "dbname": conn.dbname,
+        "table_name": name if query is None else None,
+        "query": query,
+        "options": _options(kwargs),
+    }
+    if probe:
+        source = name if query is None else f"({query})"
+        fingerprint["probe"] = _probe(conn, source, time_stamp)
+    return fingerprint
+
+
+def _save(df, fingerprint, snapshot, cache_dir):
+    df.save()
+    _write_fingerprint(df.name, fingerprint, cache_dir)
+    if snapshot:
+        df.to_parquet(str(_cache_path(df.name, ".parquet", cache_dir)))
+
+
+def _load(name, fingerprint, previous, snapshot, cache_dir):
+    """
+    Loads the data frame from the project folder. If the fingerprint could
+    not be checked, the data frame is reused as it is.
+    """
+    print(f"Loading {name!r} from disk (project folder).")
+    df = getml.data.load_data_frame(name)
+    if fingerprint is not None and fingerprint != previous:
+        _write_fingerprint(name, fingerprint, cache_dir)
+    if snapshot and not _cache_path(name, ".parquet", cache_dir).exists():
+        df.to_parquet(str(_cache_path(name, ".parquet", cache_dir)))
+    return df
+
+
+def _is_cached(name, fingerprint, previous):
     if not getml.data.exists(name):
-        print(f"Querying {name!r} from {conn.dbname!r}...")
-        df = getml.DataFrame.from_db(name=name, table_name=name, conn=conn, **kwargs)
-        df.save()
+        return False
+    if fingerprint is None:
+        print(f"Could not check the source of {name!r}, reusing the cached version.")
+        return True
+    if not _is_valid(fingerprint, previous):
+        print(f"The source of {name!r} has changed, refreshing the cached version.")
+        return False
+    return True
+
+
+def _literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return repr(value)
+
+
+def _batch_query(source, batch_size, key, last_key, offset, columns="*"):
+    """
+    Returns the query for the next batch. If a key is passed, the batch
+    starts after the last key (keyset pagination), otherwise at the offset.
+    """
+    if key is None:
+        return (
+            f"SELECT {columns} FROM {source} AS source "
+            f"LIMIT {batch_size} OFFSET {offset}"
+        )
+    where = "" if last_key is None else f" WHERE {key} > {_literal(last_key)}"
+    return (
+        f"SELECT {columns} FROM {source} AS source{where} "
+        f"ORDER BY {key} LIMIT {batch_size}"
+    )
+
+
+def _next_query(source, batch_size, key, progress, total):
+    """
+    Returns the query for the next batch or None if the source is exhausted.
+    With a key, that only shows once a batch comes back short, so no query
+    is needed to find out in advance.
+    """
+    if key is None:
+        if progress["rows"] >= total:
+            return None
+        return _batch_query(source, batch_size, None, None, progress["rows"])
+    return _batch_query(source, batch_size, key, progress["last_key"], None)
+
+
+def _last_key(df, key):
+    """
+    Retrieves the key of the last row of the data frame, which
+    is the last key of the batch that has just been appended.
+    """
+    last_key = df[df.nrows() - 1 : df.nrows()].to_pandas()[key].iloc[0]
+    return last_key.item() if hasattr(last_key, "item") else last_key
+
+
+def _load_checkpoint(name, progress):
+    """
+    Loads the data frame as it was saved at the last checkpoint. If it is
+    still held in memory, the data frame may contain the batches read after
+    that checkpoint, so it is reloaded from disk rather than retrieved. If the
+    read was interrupted after saving, but before the progress was written,
+    the batches beyond the progress are dropped again.
+    """
+    df = getml.DataFrame(name).load()
+    if df.nrows() > progress["rows"]:
+        df = df.read_view(df[: progress["rows"]])
+    return df
+
+
+def _read_in_batches(
+    conn, name, source, batch_size, key, progress, checkpoint, checkpoint_every, **kwargs
+):
+    """
+    Reads the source into a getML data frame batch by batch, appending every
+    batch to the data frame. Every checkpoint_every batches or, if it is None,
+    as described in CHECKPOINT_RATIO, the data frame is saved and checkpoint is
+    called with the progress, so that an interrupted read can be resumed by
+    passing that progress.
+    """
+    total = int(
+        getml.database.get(
+            f"SELECT COUNT(*) AS num_rows FROM {source} AS source", conn=conn
+        )["num_rows"].iloc[0]
+    )
+
+    if progress is None:
+        df = None
+        progress = {"rows": 0, "last_key": None}
+    else:
+        print(f"Resuming {name!r} after {progress['rows']:,} rows.")
+        df = _load_checkpoint(name, progress)
+
+    begin = time.perf_counter()
+    rows_read = 0
+    num_batches = 0
+    checkpointed = begin
+    save_seconds = 0.0
+
+    while True:
+        query = _next_query(source, batch_size, key, progress, total)
+
+        if query is None:
+            break
+
+        if df is None:
+            df = getml.DataFrame.from_query(query=query, name=name, conn=conn, **kwargs)
+        else:
+            df.read_query(query, append=True, conn=conn)
+
+        num_rows = df.nrows() - progress["rows"]
+
+        if num_rows == 0:
+            break
+
+        progress = {
+            "rows": progress["rows"] + num_rows,
+            "last_key": None if key is None else _last_key(df, key),
+        }
+        rows_read += num_rows
+        num_batches += 1
+
+        if (
+            num_batches % checkpoint_every == 0
+            if checkpoint_every is not None
+            else time.perf_counter() - checkpointed >= CHECKPOINT_RATIO * save_seconds
+        ):
+            save_begin = time.perf_counter()
+            df.save()
+            checkpoint(progress)
+            checkpointed = time.perf_counter()
+            save_seconds = checkpointed - save_begin
+
+        rows_per_second = rows_read / max(time.perf_counter() - begin, 1e-9)
+
+        print(
+            f"{name!r}: {progress['rows']:,} of {max(total, progress['rows']):,} rows "
+            f"({rows_per_second:,.0f} rows/s)."
+        )
+
+        if key is not None and num_rows < batch_size:
+            break
+
+    if df is None or df.nrows() == 0:
+        raise ValueError(f"{source!r} contains no rows.")
+
+    return df
+
+
+def load_or_query(
+    conn,
+    name,
+    query=None,
+    probe=False,
+    time_stamp=None,
+    snapshot=False,
+    cache_dir=None,
+    batch_size=None,
+    key=None,
+    checkpoint_every=None,
+    **kwargs,
+):
+    """
+    Loads the data from disk (the project folder) if present and up to date, if not,
+    queries it from the database associated with `conn`.
+
+    The cached data frame is considered up to date, if it has been queried with the
+    same table name or `query` and the same `kwargs`. If `probe` is True, the number
+    of rows and, if `time_stamp` is passed, the latest value of that column must
+    match as well, which costs one aggregation query.
+
+    If `batch_size` is passed, the data is read in batches of that many rows, which
+    are appended to the data frame one by one, and the throughput is reported after
+    every batch. If `key` is passed, the batches are ordered by that column, which
+    must be unique, and every batch starts after the last key of the previous one,
+    which an index on `key` finds right away. Without a key, the batches are read
+    by offset, which is only a fallback: the database has to skip over all rows
+    before the offset for every batch, so every batch takes longer than the one
+    before, and it relies on the database returning the rows in the same order
+    every time.
+
+    While reading in batches, the data frame is saved along with the progress, so
+    that an interrupted read resumes from the last checkpoint when called again.
+    Every save writes the entire data frame, so by default, a checkpoint is only
+    written once the batches read since the last one have taken ten times as long
+    as saving did. If `checkpoint_every` is passed, a checkpoint is written every
+    `checkpoint_every` batches instead.
+
+    If `snapshot` is True, a Parquet snapshot is written to `cache_dir`, which can be
+    read into pandas by `load_snapshot`.
+
+    `kwargs` are passed to `getml.data.DataFrame.from_db` or, if a `query` is passed
+    or the data is read in batches, to `getml.data.DataFrame.from_query`.
+    """
+
+    previous = _read_fingerprint(name, cache_dir)
+    fingerprint = _fingerprint_db(conn, name, query, probe, time_stamp, kwargs)
+
+    progress = _read_json(name, ".progress.json", cache_dir)
+    batches = {"batch_size": batch_size, "key": key}
+    resume = (
+        batch_size is not None
+        and progress is not None
+        and progress["fingerprint"] == {**fingerprint, "probe": None}
+        and progress["batches"] == batches
+        and getml.data.exists(name)
+    )
+
+    if not resume and _is_cached(name, fingerprint, previous):
+        df = _load(name, fingerprint, previous, snapshot, cache_dir)
+    elif batch_size is not None:
+        print(f"Querying {name!r} from {conn.dbname!r} in batches of {batch_size:,}...")
+
+        # A partially read data frame must never be taken for a cached one.
+        _cache_path(name, ".json", cache_dir).unlink(missing_ok=True)
+
+        def checkpoint(batch_progress):
+            _write_json(
+                name,
+                ".progress.json",
+                {
+                    "fingerprint": {**fingerprint, "probe": None},
+                    "batches": batches,
+                    **batch_progress,
+                },
+                cache_dir,
+            )
+
+        df = _read_in_batches(
+            conn,
+            name,
+            name if query is None else f"({query})",
+            batch_size,
+            key,
+            progress if resume else None,
+            checkpoint,
+            checkpoint_every,
+            **kwargs,
+        )
+        _save(df, fingerprint, snapshot, cache_dir)
+        _cache_path(name, ".progress.json", cache_dir).unlink(missing_ok=True)
     else:
-        print(f"Loading {name!r} from disk (project folder).")
-        df = getml.data.load_data_frame(name)
+        print(f"Querying {name!r} from {conn.dbname!r}...")
+        if query is None:
+            df = getml.DataFrame.from_db(
+                name=name, table_name=name, conn=conn, **kwargs
+            )
+        else:
+            df = getml.DataFrame.from_query(
+                name=name, query=query, conn=conn, **kwargs
+            )
+        _save(df, fingerprint, snapshot, cache_dir)
 
     print()
 
     return df
 
 
-def load_or_retrieve(csv_file, name=None, **kwargs):
+def load_or_query_many(conns, names, **kwargs):
+    """
+    Calls `load_or_query` for every name in `names` concurrently.
+
+    `conns` is a connection or a list of connections, which serves as a pool:
+    Every connection is used by one table at a time, so as many tables are
+    queried at the same time as there are connections.
+
+    `kwargs` are passed to `load_or_query`.
+
+    Returns a dict mapping the names to the data frames.
+    """
+
+    if isinstance(conns, getml.database.Connection):
+        conns = [conns]
+
+    pool = queue.Queue()
+    for conn in conns:
+        pool.put(conn)
+
+    def _load_one(name):
+        conn = pool.get()
+        try:
+            return load_or_query(conn, name, **kwargs)
+        finally:
+            pool.put(conn)
+
+    with ThreadPoolExecutor(max_workers=len(conns)) as executor:
+        return dict(zip(names, executor.map(_load_one, names)))
+
+
+def load_or_retrieve(csv_file, name=None, snapshot=False, cache_dir=None, **kwargs):
     """
-    Loads the data from disk (the project folder) if present, if not, retrieves the
-    and reads the `csv_file`.
+    Loads the data from disk (the project folder) if present and up to date, if not,
+    retrieves and reads the `csv_file`.
+
+    The cached data frame is considered up to date, if the size and content hash of
+    every local file and the ETag, Last-Modified and Content-Length headers of every
+    remote file match those recorded when it was read, and so do the `kwargs`. Local
+    files are only hashed again if their size or modification time has changed.
+
+    If `snapshot` is True, a Parquet snapshot is written to `cache_dir`, which can be
+    read into pandas by `load_snapshot`.
 
     `kwargs` are passed to `getml.data.DataFrame.from_csv`.
 
     If no name is supplied, the df's name is inferred from the filename.
     """
 
+    csv_files = [csv_file] if isinstance(csv_file, (str, Path)) else list(csv_file)
+
     if name is None:
-        name = Path(csv_file).stem
+        name = Path(str(csv_files[0])).stem
 
-    if not getml.data.exists(name):
-        df = getml.DataFrame.from_csv(fnames=csv_file, name=name, **kwargs)
-        df.save()
+    previous = _read_fingerprint(name, cache_dir)
+    fingerprint = _fingerprint_csv(csv_files, kwargs, previous)
+
+    if _is_cached(name, fingerprint, previous):
+        df = _load(name, fingerprint, previous, snapshot, cache_dir)
     else:
-        print(f"Loading {name!r} from disk (project folder).")
-        df = getml.data.load_data_frame(name)
+        df = getml.DataFrame.from_csv(
+            fnames=[str(csv_file) for csv_file in csv_files], name=name, **kwargs
+        )
+        _save(df, fingerprint or {}, snapshot, cache_dir)
 
     print()
 
     return df
+
+
+def load_snapshot(name, cache_dir=None, **kwargs):
+    """
+    Reads the Parquet snapshot written by `load_or_query` or `load_or_retrieve`
+    into a pandas DataFrame, without going through the getML engine.
+
+    `kwargs` are passed to `pandas.read_parquet`.
+    """
+
+    path = _cache_path(name, ".parquet", cache_dir)
+
+    if not path.exists():
+        raise ValueError(
+            f"There is no snapshot of {name!r} in {str(path.parent)!r}. "
+            "Pass snapshot=True to load_or_query or load_or_retrieve."
+        )
+
+    return pd.read_parquet(path, **kwargs)
@@ -0,0 +1,19 @@
+import numpy as np
+
+
+def _make_batches(window_sizes, max_rows_per_batch):
+    """
+    Splits the population rows into contiguous batches, such that
+    the rolled frame of every batch has at most max_rows_per_batch
+    rows. A single window larger than that forms a batch on its own.
+    Passing the number of rolled rows per id instead of per row
+    splits the ids into batches the same way.
+    """
+    cumulative = np.cumsum(window_sizes)
+    begin = 0
+    while begin < len(window_sizes):
+        offset = cumulative[begin] - window_sizes[begin]
+        end = int(np.searchsorted(cumulative, offset + max_rows_per_batch, side="right"))
+        end = max(end, begin + 1)
+        yield begin, end
+        begin = end
@@ -13,3 +13,10 @@ def _print_time_taken(begin, end):
     print("Time taken: " + str(hours) + "h:" + str(minutes) + "m:" + str(seconds))
 
     print("")
+
+
+def _print_cache_stats(hits, misses):
+
+    print("Feature cache: " + str(hits) + " hits, " + str(misses) + " misses")
+
+    print("")
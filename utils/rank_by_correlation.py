@@ -0,0 +1,26 @@
+import numpy as np
+from pandas.api.types import is_numeric_dtype
+
+from .correlate_columns import _correlate_columns
+
+
+def _rank_by_correlation(data_frame, target, num_features):
+    """
+    Returns the names of the num_features numeric columns with the
+    highest absolute correlation with the target, best first.
+
+    Constant columns are never selected. Columns whose correlation
+    is NaN or inf rank like uncorrelated ones. Ties are ranked in the
+    order of the columns.
+    """
+    colnames = np.asarray(
+        [col for col in data_frame.columns if is_numeric_dtype(data_frame[col])]
+    )
+    correlations, variances = _correlate_columns(data_frame[colnames], target)
+    colnames = colnames[variances > 0.0]
+    correlations = correlations[variances > 0.0]
+    correlations[np.isnan(correlations) | np.isinf(correlations)] = 0.0
+
+    # A stable sort ranks ties in the order of the columns. Otherwise,
+    # their order would depend on the values of the other columns.
+    return colnames[np.argsort(-correlations, kind="stable")][:num_features]
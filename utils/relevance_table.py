@@ -0,0 +1,99 @@
+import pandas as pd
+from statsmodels.stats.multitest import multipletests
+from tsfresh import defaults
+from tsfresh.feature_selection.relevance import (
+    combine_relevance_tables,
+    get_feature_type,
+    infer_ml_task,
+)
+from tsfresh.feature_selection.significance_tests import (
+    target_binary_feature_binary_test,
+    target_binary_feature_real_test,
+    target_real_feature_binary_test,
+    target_real_feature_real_test,
+)
+
+
+def _test_feature(feature, feature_type, y, ml_task, labels):
+    """
+    Returns the p-values of the feature, one per label for
+    classification and a single one for regression.
+    """
+    if ml_task == "regression":
+        test = (
+            target_real_feature_real_test
+            if feature_type == "real"
+            else target_real_feature_binary_test
+        )
+        return [test(feature, y)]
+    if feature_type == "real":
+        return [
+            target_binary_feature_real_test(
+                feature, y == label, defaults.TEST_FOR_BINARY_TARGET_REAL_FEATURE
+            )
+            for label in labels
+        ]
+    return [target_binary_feature_binary_test(feature, y == label) for label in labels]
+
+
+def _relevance_table(blocks, y):
+    """
+    Calculates the same relevance table as tsfresh.select_features with
+    its default settings, but from blocks of columns, so that the entire
+    feature matrix never has to be in memory.
+
+    Every feature is tested on its own, so the p-values are calculated
+    block by block. Only the multiple testing procedure, which needs all
+    p-values, runs at the end, on the same tables tsfresh would build.
+
+    Args:
+
+        blocks: The data frames holding the columns of the feature
+            matrix, with rows matching y and a RangeIndex.
+
+        y: The target as a pandas.Series with a RangeIndex.
+    """
+    ml_task = infer_ml_task(y)
+    labels = list(y.unique()) if ml_task == "classification" else [None]
+
+    colnames = []
+    types = []
+    p_values = []
+
+    for block in blocks:
+        for col in block.columns:
+            feature_type = get_feature_type(block[col])
+            colnames.append(col)
+            types.append(feature_type)
+            p_values.append(
+                None
+                if feature_type == "constant"
+                else _test_feature(block[col], feature_type, y, ml_task, labels)
+            )
+
+    relevance_table = pd.DataFrame(index=pd.Series(colnames, name="feature"))
+    relevance_table["feature"] = relevance_table.index
+    relevance_table["type"] = types
+
+    table_real = relevance_table[relevance_table.type == "real"]
+    table_binary = relevance_table[relevance_table.type == "binary"]
+
+    table_const = relevance_table[relevance_table.type == "constant"].copy()
+    table_const["p_value"] = float("nan")
+    table_const["relevant"] = False
+
+    if len(table_const) == len(relevance_table):
+        return table_const
+
+    p_values = pd.Series(p_values, index=relevance_table.index, dtype=object)
+    method = "fdr_bh" if defaults.HYPOTHESES_INDEPENDENT else "fdr_by"
+
+    tables = []
+
+    for i in range(len(labels)):
+        table = pd.concat([table_real.copy(), table_binary.copy()])
+        table["p_value"] = [p_values[feature][i] for feature in table.index]
+        table["relevant"] = multipletests(table.p_value, defaults.FDR_LEVEL, method)[0]
+        tables.append(table.sort_values("p_value"))
+
+    return pd.concat([combine_relevance_tables(tables), table_const], axis=0)
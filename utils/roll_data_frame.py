@@ -0,0 +1,181 @@
+"""
+Rolling engines that duplicate data so that it matches the
+format required by featuretools.
+"""
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------------
+
+
+class _ChunkMaker:
+    """
+    Helpers class to create chunks of data frames.
+    """
+
+    def __init__(self, data_frame, id_col, time_col, horizon, memory):
+        self.data_frame = data_frame
+        self.id_col = id_col
+        self.time_col = time_col
+        self.horizon = horizon
+        self.memory = memory
+
+    def make_chunk(self, current_id, now, index):
+        """
+        Generates a chunk of the data frame that
+        contains all rows within horizon and memory.
+
+        Used by roll_data_frame.
+        """
+        begin = now - self.horizon - self.memory
+        end = now - self.horizon
+        chunk = self.data_frame[
+            (self.id_col == current_id)
+            & (self.time_col > begin)
+            & (self.time_col <= end)
+        ]
+        chunk["_featuretools_join_key"] = int(index)
+        return chunk
+
+
+# ------------------------------------------------------------------
+
+
+def _roll_data_frame_iterrows(data_frame, column_id, time_stamp, horizon, memory):
+    """
+    Duplicates data so that it matches the format
+    required by featuretools.
+
+    This is the original row-by-row implementation, which is
+    O(n²). It is kept to verify the vectorized engine.
+    """
+    id_col = data_frame[column_id]
+    time_col = pd.to_datetime(data_frame[time_stamp])
+    chunk_maker = _ChunkMaker(data_frame, id_col, time_col, horizon, memory)
+    chunks = [
+        chunk_maker.make_chunk(row[column_id], pd.to_datetime(row[time_stamp]), index)
+        for index, row in data_frame.iterrows()
+    ]
+    rolled = pd.concat(chunks, ignore_index=True).reset_index()
+    rolled["_featuretools_index"] = np.arange(rolled.shape[0])
+    return rolled
+
+
+# ------------------------------------------------------------------
+
+
+def _to_nanoseconds(time_col):
+    """
+    Returns the time stamps as int64 nanoseconds and a mask
+    marking the rows that are not NaT.
+    """
+    time_col = pd.to_datetime(time_col)
+    if getattr(time_col.dt, "tz", None) is not None:
+        time_col = time_col.dt.tz_convert(None)
+    values = time_col.to_numpy(dtype="datetime64[ns]")
+    return values.view(np.int64), ~np.isnat(values)
+
+
+def _window_bounds(codes, times, horizon, memory):
+    """
+    Sorts the rows once by (id, time stamp) and finds the window
+    (now - horizon - memory, now - horizon] of every row by binary
+    search within its id group.
+
+    Returns the sort order and, for every row in its original
+    position, the half-open range [lower, upper) into that order.
+    Rows with a missing id or time stamp get an empty window and
+    never appear in any other row's window.
+    """
+    horizon = pd.Timedelta(horizon).value
+    memory = pd.Timedelta(memory).value
+
+    valid = np.flatnonzero(codes >= 0)
+    order = valid[np.lexsort((times[valid], codes[valid]))]
+
+    sorted_codes = codes[order]
+    sorted_times = times[order]
+
+    group_bounds = np.flatnonzero(np.diff(sorted_codes)) + 1
+    group_begins = np.concatenate([[0], group_bounds])
+    group_ends = np.concatenate([group_bounds, [len(order)]])
+
+    lower = np.zeros(len(codes), dtype=np.int64)
+    upper = np.zeros(len(codes), dtype=np.int64)
+
+    for begin, end in zip(group_begins, group_ends):
+        group_times = sorted_times[begin:end]
+        rows = order[begin:end]
+        lower[rows] = begin + np.searchsorted(
+            group_times, group_times - horizon - memory, side="right"
+        )
+        upper[rows] = begin + np.searchsorted(
+            group_times, group_times - horizon, side="right"
+        )
+
+    return order, lower, upper
+
+
+def _gather_windows(order, lower, upper):
+    """
+    Expands the window bounds into the positions of the rows to
+    gather and the population row each of them belongs to.
+
+    Within every window, rows keep their original order, just like
+    a boolean mask over the data frame would.
+    """
+    counts = upper - lower
+    window_ids = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    positions = order[np.repeat(lower, counts) + offsets]
+
+    if np.any((np.diff(positions) < 0) & (np.diff(window_ids) == 0)):
+        resort = np.lexsort((positions, window_ids))
+        positions = positions[resort]
+
+    return positions, window_ids
+
+
+def _find_windows(data_frame, column_id, time_stamp, horizon, memory):
+    """
+    Finds the window of every row without materializing anything.
+
+    Returns the arguments expected by _gather_rolled. The rolled
+    frame will have (upper - lower).sum() rows, so this can be used
+    to estimate its size before rolling.
+    """
+    codes, _ = pd.factorize(data_frame[column_id])
+    times, not_nat = _to_nanoseconds(data_frame[time_stamp])
+    codes = np.where(not_nat, codes, -1)
+    return _window_bounds(codes, times, horizon, memory)
+
+
+def _gather_rolled(data_frame, order, lower, upper, join_keys):
+    """
+    Materializes the rolled frame for the windows [lower, upper)
+    in a single gather. The rows in the i-th window get join_keys[i]
+    as their _featuretools_join_key.
+    """
+    positions, window_ids = _gather_windows(order, lower, upper)
+    rolled = data_frame.iloc[positions].reset_index(drop=True)
+    rolled["_featuretools_join_key"] = np.asarray(join_keys, dtype=np.int64)[
+        window_ids
+    ]
+    rolled.insert(0, "index", np.arange(rolled.shape[0]))
+    rolled["_featuretools_index"] = np.arange(rolled.shape[0])
+    return rolled
+
+
+def _roll_data_frame(data_frame, column_id, time_stamp, horizon, memory):
+    """
+    Duplicates data so that it matches the format
+    required by featuretools.
+
+    Produces the same output as _roll_data_frame_iterrows, but sorts
+    once and materializes the rolled frame in a single gather.
+    """
+    order, lower, upper = _find_windows(
+        data_frame, column_id, time_stamp, horizon, memory
+    )
+    return _gather_rolled(data_frame, order, lower, upper, data_frame.index)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+# The number of columns checked at a time, which bounds
+# the size of the temporary mask.
+_BLOCK_COLUMNS = 256
+
+
+def _is_float(dtype):
+    return isinstance(dtype, np.dtype) and dtype.kind == "f"
+
+
+def _replace_in_place(values, replace_inf):
+    """
+    Replaces NaN (and inf, if replace_inf) by 0 in the two-dimensional
+    array values and returns the number of replaced values per column.
+    """
+    replaced = np.zeros(values.shape[1], dtype=np.int64)
+    for begin in range(0, values.shape[1], _BLOCK_COLUMNS):
+        block = values[:, begin : begin + _BLOCK_COLUMNS]
+        invalid = ~np.isfinite(block) if replace_inf else np.isnan(block)
+        replaced[begin : begin + _BLOCK_COLUMNS] = invalid.sum(axis=0)
+        block[invalid] = 0.0
+    return replaced
+
+
+def _sanitize_features(data_frame, replace_inf=True, dtype=None):
+    """
+    Replaces NaN (and inf, if replace_inf) by 0 in all numeric columns.
+
+    The float columns are sanitized in a single pass over one array,
+    which is the data frame's own array if it consists of a single float
+    block, so no copy is made. If dtype is passed (e.g. np.float32), the
+    float columns are cast while they are gathered into that array.
+    Nullable integer and boolean columns are filled column by column.
+
+    Returns the sanitized data frame and the number of replaced values
+    per column.
+    """
+    is_float = np.asarray([_is_float(dtype) for dtype in data_frame.dtypes], dtype=bool)
+
+    float_frame = data_frame if is_float.all() else data_frame.loc[:, is_float]
+    values = float_frame.to_numpy(dtype=dtype)
+
+    replaced = pd.Series(0, index=data_frame.columns, dtype=np.int64)
+    replaced[is_float] = _replace_in_place(values, replace_inf)
+
+    sanitized = pd.DataFrame(
+        values, index=data_frame.index, columns=float_frame.columns, copy=False
+    )
+
+    if not is_float.all():
+        others = data_frame.loc[:, ~is_float]
+        for col in others:
+            if is_numeric_dtype(others[col]):
+                is_na = others[col].isna()
+                if is_na.any():
+                    replaced[col] = is_na.sum()
+                    fill = False if is_bool_dtype(others[col]) else 0
+                    others[col] = others[col].mask(is_na, fill)
+        sanitized = pd.concat([sanitized, others], axis=1)[data_frame.columns]
+
+    if replaced.sum():
+        print(
+            "Replaced "
+            + str(replaced.sum())
+            + " invalid values in "
+            + str((replaced > 0).sum())
+            + " columns by 0."
+        )
+
+    return sanitized, replaced
@@ -0,0 +1,306 @@
+"""
+Feature builder that aggregates over sliding windows with NumPy.
+"""
+
+import datetime
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_numeric_dtype
+
+from .add_original_columns import OUTPUTS, _add_original_columns
+from .print_time_taken import _print_time_taken
+from .rank_by_correlation import _rank_by_correlation
+from .remove_target_column import _remove_target_column
+from .roll_data_frame import _find_windows, _to_nanoseconds
+from .sanitize_features import _sanitize_features
+from .stage_profiler import _StageProfiler
+
+# ------------------------------------------------------------------
+
+
+def _window_sums(values, lower, upper):
+    """
+    Returns the sum of values over every window [lower, upper)
+    from a single prefix sum.
+    """
+    prefix = np.concatenate([[0.0], np.cumsum(values)])
+    return prefix[upper] - prefix[lower]
+
+
+def _sliding_min(values, lower, upper):
+    """
+    Returns the minimum of values over every window [lower, upper),
+    ignoring NaN. Both bounds must be non-decreasing, so that a
+    monotonic deque finds all minima in a single pass.
+    """
+    values = values.tolist()
+    result = [np.nan] * len(lower)
+    candidates = deque()
+    right = 0
+    for k, (begin, end) in enumerate(zip(lower.tolist(), upper.tolist())):
+        while right < end:
+            value = values[right]
+            # NaN != NaN, so missing values are skipped.
+            if value == value:
+                while candidates and values[candidates[-1]] >= value:
+                    candidates.pop()
+                candidates.append(right)
+            right += 1
+        while candidates and candidates[0] < begin:
+            candidates.popleft()
+        if candidates:
+            result[k] = values[candidates[0]]
+    return np.asarray(result, dtype=np.float64)
+
+
+def _aggregate_column(name, values, times, lower, upper):
+    """
+    Calculates the windowed aggregates of one column. All arrays are
+    in sorted order. The values are centered before they are summed,
+    which keeps the variance and the trend numerically stable.
+    """
+    is_valid = ~np.isnan(values)
+    offset = values[is_valid].mean() if is_valid.any() else 0.0
+    centered = np.where(is_valid, values - offset, 0.0)
+    centered_times = np.where(is_valid, times, 0.0)
+
+    count = _window_sums(is_valid.astype(np.float64), lower, upper)
+    sum_x = _window_sums(centered, lower, upper)
+    sum_xx = _window_sums(centered * centered, lower, upper)
+    sum_t = _window_sums(centered_times, lower, upper)
+    sum_tt = _window_sums(centered_times * centered_times, lower, upper)
+    sum_xt = _window_sums(centered * centered_times, lower, upper)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sum_x / count
+        variance = (sum_xx - sum_x * mean) / (count - 1.0)
+        trend = (count * sum_xt - sum_x * sum_t) / (count * sum_tt - sum_t * sum_t)
+
+    variance[count < 2] = np.nan
+    trend[count < 2] = np.nan
+
+    return {
+        "COUNT(" + name + ")": count,
+        "SUM(" + name + ")": sum_x + count * offset,
+        "MEAN(" + name + ")": mean + offset,
+        "VAR(" + name + ")": np.maximum(variance, 0.0),
+        "MIN(" + name + ")": _sliding_min(values, lower, upper),
+        "MAX(" + name + ")": -_sliding_min(-values, lower, upper),
+        "TREND(" + name + ")": trend,
+    }
+
+
+# ------------------------------------------------------------------
+
+
+class SlidingWindowBuilder:
+    """
+    Scikit-learn-style feature builder that aggregates every numerical
+    column over the window (now - horizon - memory, now - horizon] of
+    every row, like the FTTimeSeriesBuilder, but without ever
+    materializing the rolled frame.
+
+    Counts, sums, means, variances and trends are calculated from prefix
+    sums, minima and maxima with monotonic deques, so apart from sorting
+    the rows once, the time is linear in the number of rows, no matter
+    how long the windows are. The trend is the slope of the least-squares
+    line per second. The time since the last row in the window is added
+    as well.
+
+    Args:
+
+        num_features: The (maximum) number of features to build.
+
+        horizon: The time between the end of the window and the
+                 row the features are built for.
+
+        memory: How much back in time you want to go until the
+                feature builder starts "forgetting" data.
+
+        column_id: The name of the column containing the ids.
+
+        time_stamp: The name of the column containing the time stamps.
+
+        target: The name of the target column.
+
+        allow_lagged_targets: Whether the target may be aggregated.
+
+        dtype: The dtype the features are cast to, for instance
+                 np.float32. None keeps float64.
+
+        output: What fit and transform return. "pandas" (the default)
+                 returns a data frame, "columns" returns a dict mapping
+                 the column names to NumPy arrays, "arrow" returns a
+                 pyarrow.Table for to_getml.
+    """
+
+    def __init__(
+        self,
+        num_features,
+        horizon,
+        memory,
+        column_id,
+        time_stamp,
+        target,
+        allow_lagged_targets=False,
+        dtype=None,
+        output="pandas",
+    ):
+        if output not in OUTPUTS:
+            raise ValueError(
+                "output must be one of " + str(OUTPUTS) + ", got " + repr(output) + "."
+            )
+
+        self.num_features = num_features
+        self.horizon = horizon
+        self.memory = memory
+        self.column_id = column_id
+        self.time_stamp = time_stamp
+        self.target = target
+        self.allow_lagged_targets = allow_lagged_targets
+        self.dtype = dtype
+        self.output = output
+
+        self._runtime = None
+        self.fitted = False
+
+        self.selected_features = []
+        self.replaced_values = None
+
+        self._profiler = _StageProfiler()
+        self._profiles = {}
+
+    def _extract_features(self, data_frame):
+        with self._profiler.stage("rolling"):
+            order, lower, upper = _find_windows(
+                data_frame, self.column_id, self.time_stamp, self.horizon, self.memory
+            )
+
+        self._profiler.count("population_rows", data_frame.shape[0])
+        self._profiler.count("rolled_rows", int(np.sum(upper - lower)))
+
+        with self._profiler.stage("extraction"):
+            nanoseconds, _ = _to_nanoseconds(data_frame[self.time_stamp])
+            sorted_nanoseconds = nanoseconds[order]
+
+            # The windows of the rows in sorted order. Both bounds
+            # are non-decreasing, which _sliding_min relies on.
+            sorted_lower = lower[order]
+            sorted_upper = upper[order]
+
+            # The times are relative to the first row of every id, so
+            # that the sums of squares in the trend stay small.
+            codes = pd.factorize(data_frame[self.column_id])[0][order]
+            group_begins = np.flatnonzero(np.diff(codes, prepend=-2))
+            first = np.repeat(
+                sorted_nanoseconds[group_begins], np.diff(group_begins, append=len(order))
+            )
+            times = (sorted_nanoseconds - first) / 1e9
+
+            features = {}
+
+            is_empty = sorted_upper == sorted_lower
+            last = order[np.maximum(sorted_upper - 1, 0)]
+            time_since_last = (sorted_nanoseconds - nanoseconds[last]) / 1e9
+            time_since_last[is_empty] = np.nan
+            features["COUNT"] = (sorted_upper - sorted_lower).astype(np.float64)
+            features["TIME_SINCE_LAST"] = time_since_last
+
+            for col in data_frame.columns:
+                if col in (self.column_id, self.time_stamp):
+                    continue
+                if not is_numeric_dtype(data_frame[col]) or is_bool_dtype(
+                    data_frame[col]
+                ):
+                    continue
+                values = data_frame[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                features.update(
+                    _aggregate_column(
+                        col, values[order], times, sorted_lower, sorted_upper
+                    )
+                )
+
+            # Rows with a missing id or time stamp are not in order
+            # and have no features.
+            df_extracted = pd.DataFrame(
+                np.nan, index=np.arange(data_frame.shape[0]), columns=list(features)
+            )
+            df_extracted.iloc[order] = np.column_stack(list(features.values()))
+
+        with self._profiler.stage("sanitization"):
+            df_extracted, self.replaced_values = _sanitize_features(
+                df_extracted, dtype=self.dtype
+            )
+
+        return df_extracted
+
+    def _select_features(self, data_frame, target):
+        print(
+            "Selecting the best out of " + str(len(data_frame.columns)) + " features..."
+        )
+        self.selected_features = _rank_by_correlation(
+            data_frame, target, self.num_features
+        )
+        return data_frame[self.selected_features]
+
+    def fit(self, data_frame):
+        """
+        Fits the features on the data frame and returns
+        the features for the training set.
+        """
+        print("Sliding windows: Trying features...")
+        begin = time.time()
+        self._profiler = _StageProfiler()
+        target = np.asarray(data_frame[self.target])
+        df_for_extraction = (
+            data_frame
+            if self.allow_lagged_targets
+            else _remove_target_column(data_frame, self.target)
+        )
+        df_extracted = self._extract_features(df_for_extraction)
+        self._profiler.count("candidate_features", df_extracted.shape[1])
+        with self._profiler.stage("selection"):
+            df_selected = self._select_features(df_extracted, target)
+        self._profiler.count("selected_features", len(self.selected_features))
+        with self._profiler.stage("add_original_columns"):
+            df_selected = _add_original_columns(data_frame, df_selected, self.output)
+        self._profiles["fit"] = self._profiler.to_dict()
+        end = time.time()
+        _print_time_taken(begin, end)
+        self.fitted = True
+        self._runtime = datetime.timedelta(seconds=end - begin)
+        return df_selected
+
+    @property
+    def runtime(self):
+        if self.fitted:
+            return self._runtime
+
+    @property
+    def profile(self):
+        """
+        The profiles of the last calls to fit and transform, keyed by the
+        name of the method, in the format of FTTimeSeriesBuilder.profile.
+        """
+        return self._profiles
+
+    def transform(self, data_frame):
+        """
+        Builds the features selected by fit.
+        """
+        self._profiler = _StageProfiler()
+        df_for_extraction = (
+            data_frame
+            if self.allow_lagged_targets
+            else _remove_target_column(data_frame, self.target)
+        )
+        df_extracted = self._extract_features(df_for_extraction)
+        df_selected = df_extracted[self.selected_features]
+        self._profiler.count("selected_features", len(self.selected_features))
+        with self._profiler.stage("add_original_columns"):
+            df_selected = _add_original_columns(data_frame, df_selected, self.output)
+        self._profiles["transform"] = self._profiler.to_dict()
+        return df_selected
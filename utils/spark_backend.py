@@ -0,0 +1,264 @@
+"""
+Spark backend for the time series builders, used if backend="spark".
+
+The rolling is expressed as a range join, so the rolled frame lives in
+Spark rather than in this process. It is many times larger than the
+original data, and Spark spills it to disk when it does not fit into
+memory. The extraction runs with applyInPandas on buckets of
+population rows, one task per bucket. In local[*] mode, that uses all
+cores of one machine.
+"""
+
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype,
+    is_datetime64_any_dtype,
+    is_float_dtype,
+    is_integer_dtype,
+)
+from pyspark.sql import SparkSession, Window
+from pyspark.sql import functions as F
+from pyspark.sql import types as T
+
+from .roll_data_frame import _to_nanoseconds
+
+# The number of buckets per core, if the size of the buckets is not
+# limited otherwise. More buckets balance the load better.
+BUCKETS_PER_CORE = 4
+
+_SHIPPED = set()
+
+# ------------------------------------------------------------------
+
+
+def _get_spark_session(spark=None):
+    """
+    Returns spark, if it is a SparkSession. Otherwise, gets or creates
+    a session with spark as the master URL, "local[*]" by default.
+    """
+    if not isinstance(spark, SparkSession):
+        spark = (
+            SparkSession.builder.master(spark or "local[*]")
+            .appName("getml-demo")
+            .config("spark.sql.execution.arrow.pyspark.enabled", "true")
+            .config("spark.sql.session.timeZone", "UTC")
+            .getOrCreate()
+        )
+    _ship_package(spark)
+    return spark
+
+
+def _ship_package(spark):
+    """
+    The workers unpickle functions from this package, but do not
+    share the sys.path of the notebook, so the package is sent along.
+    """
+    application_id = spark.sparkContext.applicationId
+    if application_id in _SHIPPED:
+        return
+    package = Path(__file__).resolve().parent
+    archive = Path(tempfile.mkdtemp()) / (package.name + ".zip")
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        for path in package.glob("*.py"):
+            zip_file.write(path, Path(package.name) / path.name)
+    spark.sparkContext.addPyFile(archive.as_posix())
+    _SHIPPED.add(application_id)
+
+
+def _num_buckets(spark, num_rolled, max_rows_per_bucket=None):
+    num_buckets = spark.sparkContext.defaultParallelism * BUCKETS_PER_CORE
+    if max_rows_per_bucket is not None:
+        num_buckets = max(num_buckets, -(-num_rolled // max_rows_per_bucket))
+    return int(num_buckets)
+
+
+# ------------------------------------------------------------------
+
+
+def _col(name):
+    return F.col("`" + name.replace("`", "``") + "`")
+
+
+def _spark_type(dtype):
+    if isinstance(dtype, pd.CategoricalDtype):
+        return _spark_type(dtype.categories.dtype)
+    if is_bool_dtype(dtype):
+        return T.BooleanType()
+    if is_integer_dtype(dtype):
+        return T.LongType()
+    if is_float_dtype(dtype):
+        return T.DoubleType()
+    if is_datetime64_any_dtype(dtype):
+        return T.TimestampType()
+    return T.StringType()
+
+
+def _make_schema(dtypes):
+    return T.StructType(
+        [T.StructField(name, _spark_type(dtype)) for name, dtype in dtypes.items()]
+    )
+
+
+def _to_spark_values(series):
+    """
+    Passes categories as their values and everything
+    else Spark has no type for as strings.
+    """
+    if isinstance(_spark_type(series.dtype), T.StringType):
+        values = series.astype(object).where(series.notna(), None)
+        return values.map(lambda value: value if value is None else str(value))
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(object).where(series.notna(), None)
+    return series
+
+
+def _to_spark(spark, data_frame, time_stamp=None):
+    """
+    Converts data_frame to a Spark data frame with an additional
+    column, _position, holding the row positions and, if time_stamp is
+    passed, _time_ns, holding the time stamps as int64 nanoseconds.
+
+    Returns the Spark data frame and the dtypes of data_frame, which
+    _restore_dtypes needs to restore the original columns.
+    """
+    dtypes = data_frame.dtypes.to_dict()
+    converted = pd.DataFrame(
+        {col: _to_spark_values(data_frame[col]) for col in data_frame.columns}
+    )
+    converted["_position"] = np.arange(data_frame.shape[0], dtype=np.int64)
+    if time_stamp is not None:
+        times, not_nat = _to_nanoseconds(data_frame[time_stamp])
+        converted["_time_ns"] = pd.array(times, dtype="Int64")
+        converted.loc[~not_nat, "_time_ns"] = pd.NA
+    return spark.createDataFrame(converted), dtypes
+
+
+def _restore_dtypes(data_frame, dtypes):
+    for col, dtype in dtypes.items():
+        if data_frame[col].dtype == dtype:
+            continue
+        if isinstance(dtype, pd.CategoricalDtype):
+            data_frame[col] = pd.Categorical(data_frame[col], dtype=dtype)
+        elif isinstance(dtype, pd.DatetimeTZDtype):
+            # Spark returns time stamps as naive UTC.
+            data_frame[col] = (
+                pd.to_datetime(data_frame[col]).dt.tz_localize("UTC").dt.tz_convert(dtype.tz)
+            )
+        else:
+            data_frame[col] = data_frame[col].astype(dtype)
+    return data_frame
+
+
+# ------------------------------------------------------------------
+
+
+def _with_buckets(data, column, width, adjacent):
+    """
+    Adds _range_bucket, the start of the bucket of the given width
+    that the value of column falls into. If adjacent is True, every
+    row is duplicated into the next bucket as well.
+
+    The bucket is an equi-key for the range joins below, so that Spark
+    can split a single id into many tasks. A window is never wider than
+    a bucket, so it lies in the bucket of its last row and the one
+    before, which is why the rows are duplicated into the next one.
+    """
+    bucket = F.col(column) - F.pmod(F.col(column), F.lit(width))
+    if adjacent:
+        bucket = F.explode(F.array(bucket, bucket + width))
+    return data.withColumn("_range_bucket", bucket)
+
+
+def _roll_by_time(data, column_id, horizon, memory):
+    """
+    Joins every row with the rows of the same id within the window
+    (now - horizon - memory, now - horizon], just like _window_bounds.
+    horizon and memory are in nanoseconds. The position of the row
+    the window belongs to is stored in _join_key.
+    """
+    width = max(horizon + memory, 1)
+    ends = _with_buckets(data, "_time_ns", width, adjacent=False).select(
+        _col(column_id).alias("_end_id"),
+        F.col("_range_bucket").alias("_end_bucket"),
+        F.col("_time_ns").alias("_end_time"),
+        F.col("_position").alias("_join_key"),
+    )
+    return (
+        _with_buckets(data, "_time_ns", width, adjacent=True)
+        .join(
+            ends,
+            (_col(column_id) == F.col("_end_id"))
+            & (F.col("_range_bucket") == F.col("_end_bucket"))
+            & (F.col("_time_ns") > F.col("_end_time") - (horizon + memory))
+            & (F.col("_time_ns") <= F.col("_end_time") - horizon),
+        )
+        .drop("_end_id", "_end_bucket", "_end_time", "_range_bucket")
+    )
+
+
+def _roll_by_rows(data, column_id, time_stamp, memory):
+    """
+    Joins every row with itself and the memory rows of the same id that
+    precede it in time, just like roll_time_series with max_timeshift.
+    The id and time stamp of the last row, which identify the window in
+    tsfresh, are stored in _window_id and _window_time, its position in
+    _join_key.
+    """
+    window = Window.partitionBy(_col(column_id)).orderBy(
+        _col(time_stamp), F.col("_position")
+    )
+    data = data.withColumn("_row_number", F.row_number().over(window))
+    ends = _with_buckets(data, "_row_number", memory + 1, adjacent=False).select(
+        _col(column_id).alias("_window_id"),
+        _col(time_stamp).alias("_window_time"),
+        F.col("_range_bucket").alias("_end_bucket"),
+        F.col("_row_number").alias("_end_row_number"),
+        F.col("_position").alias("_join_key"),
+    )
+    return (
+        _with_buckets(data, "_row_number", memory + 1, adjacent=True)
+        .join(
+            ends,
+            (_col(column_id) == F.col("_window_id"))
+            & (F.col("_range_bucket") == F.col("_end_bucket"))
+            & (F.col("_row_number") >= F.col("_end_row_number") - memory)
+            & (F.col("_row_number") <= F.col("_end_row_number")),
+        )
+        .drop("_end_bucket", "_end_row_number", "_range_bucket")
+    )
+
+
+def _apply_to_buckets(
+    rolled, func, schema, num_buckets, population=None, first_position=0
+):
+    """
+    Splits the windows into num_buckets buckets by the position of the
+    row they belong to and calls func once per bucket, with the rolled
+    rows of the bucket or, if population is passed, with the population
+    rows and the rolled rows of the bucket. Windows never span buckets,
+    so the memory a task needs is bounded by the size of its bucket,
+    no matter how large a single id is. The windows of the rows before
+    first_position are skipped.
+    """
+    rolled = rolled.where(F.col("_join_key") >= first_position).withColumn(
+        "_bucket", F.col("_join_key") % num_buckets
+    )
+    if population is None:
+        return rolled.groupBy("_bucket").applyInPandas(func, schema)
+    # The rolled rows are joined from the population, so its columns
+    # are renamed to new ones, which Spark could not tell apart otherwise.
+    population = (
+        population.toDF(*population.columns)
+        .where(F.col("_position") >= first_position)
+        .withColumn("_bucket", F.col("_position") % num_buckets)
+    )
+    return (
+        population.groupBy("_bucket")
+        .cogroup(rolled.groupBy("_bucket"))
+        .applyInPandas(func, schema)
+    )
@@ -0,0 +1,61 @@
+import time
+from contextlib import contextmanager
+
+from .benchmark import _cpu_time, _PeakRSS
+
+
+class _StageProfiler:
+    """
+    Records the wall time, CPU time and peak memory of named stages,
+    as well as counters, for a single call to fit or transform.
+
+    A stage that is entered several times, for instance once per batch,
+    accumulates its times and keeps the largest peak. Stages may be
+    nested, in each other or in a Benchmark, in which case the peak of
+    the outer block includes the peaks of the inner ones.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.counters = {}
+        self._begin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        peak_rss = _PeakRSS()
+        cpu_begin = _cpu_time()
+        begin = time.perf_counter()
+        try:
+            with peak_rss:
+                yield
+        finally:
+            wall_time = time.perf_counter() - begin
+            cpu_time = _cpu_time() - cpu_begin
+            peak = peak_rss.peak
+
+            stats = self.stages.setdefault(
+                name, dict(wall_time=0.0, cpu_time=0.0, peak_memory=0, calls=0)
+            )
+            stats["wall_time"] += wall_time
+            stats["cpu_time"] += cpu_time
+            stats["peak_memory"] = max(stats["peak_memory"], peak)
+            stats["calls"] += 1
+
+    def count(self, name, value):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        """
+        Returns the profile as a dict of plain Python types. Times are in
+        seconds, memory is in bytes.
+        """
+        counters = dict(self.counters)
+        if counters.get("population_rows"):
+            counters["average_window_size"] = (
+                counters.get("rolled_rows", 0) / counters["population_rows"]
+            )
+        return dict(
+            wall_time=time.perf_counter() - self._begin,
+            stages={name: dict(stats) for name, stats in self.stages.items()},
+            counters=counters,
+        )
@@ -2,19 +2,40 @@
 Utility wrapper around tsfresh.
 """
 
+import copy
 import datetime
+import functools
 import gc
 import time
 import warnings
+import weakref
 
 import numpy as np
 import pandas as pd
 import tsfresh
-from scipy.stats import pearsonr
+from tsfresh.feature_extraction.settings import (
+    IndexBasedFCParameters,
+    MinimalFCParameters,
+    from_columns,
+)
 from tsfresh.utilities.dataframe_functions import roll_time_series
+from tsfresh.utilities.distribution import (
+    IterableDistributorBaseClass,
+    MapDistributor,
+    MultiprocessingDistributor,
+)
 
-from .add_original_columns import _add_original_columns
-from .print_time_taken import _print_time_taken
+from .add_original_columns import OUTPUTS, _add_original_columns
+from .correlate_columns import _correlate_columns
+from .draw_selection_sample import SAMPLINGS, _draw_selection_sample
+from .feature_cache import FeatureCache
+from .feature_spill import _FeatureSpill
+from .make_batches import _make_batches
+from .print_time_taken import _print_cache_stats, _print_time_taken
+from .relevance_table import _relevance_table
+from .roll_data_frame import _gather_windows
+from .sanitize_features import _sanitize_features
+from .stage_profiler import _StageProfiler
 
 
 def _hide_warnings(func):
@@ -26,7 +47,148 @@ def _hide_warnings(func):
                 message="Your time stamps are not uniformly sampled, which makes rolling nonsensical in some domains.")
             return func(*args, **kwargs)
     return wrapper
-    
+
+
+class _SharedDistributor(IterableDistributorBaseClass):
+    """
+    Wraps a distributor, so that it can be passed to several tsfresh
+    calls. Both map_reduce and roll_time_series close the distributor
+    they are given, which would shut down the worker pool, so this
+    only borrows the wrapped distributor's workers and close is a no-op.
+    """
+
+    def __init__(self, distributor, progressbar_title):
+        self.distributor = distributor
+        self.progressbar_title = progressbar_title
+        self.disable_progressbar = getattr(distributor, "disable_progressbar", False)
+
+    def calculate_best_chunk_size(self, data_length):
+        return self.distributor.calculate_best_chunk_size(data_length)
+
+    def distribute(self, func, partitioned_chunks, kwargs):
+        return self.distributor.distribute(func, partitioned_chunks, kwargs)
+
+    def close(self):
+        pass
+
+
+def _merge_settings():
+    """
+    Merges the MinimalFCParameters and the IndexBasedFCParameters,
+    so that both can be extracted in a single pass.
+    """
+    settings = MinimalFCParameters()
+    settings.update(IndexBasedFCParameters())
+    return settings
+
+
+def _order_columns(extracted_features):
+    """
+    Puts the minimal features in front of the index-based ones,
+    which is the order the two separate extractions used to produce.
+    """
+    minimal = MinimalFCParameters()
+    is_minimal = np.asarray(
+        [col.split("__")[1] in minimal for col in extracted_features.columns],
+        dtype=bool,
+    )
+    colnames = np.asarray(extracted_features.columns)
+    return extracted_features[
+        np.concatenate([colnames[is_minimal], colnames[~is_minimal]])
+    ]
+
+
+def _in_original_order(extracted_features, data_frame, column_id, time_stamp):
+    """
+    tsfresh sorts the windows by id and time stamp. Returns the features
+    in the order of the rows of data_frame, which the target is in.
+    """
+    window_ids = pd.MultiIndex.from_arrays(
+        [data_frame[column_id], data_frame[time_stamp]]
+    )
+    if extracted_features.index.equals(window_ids):
+        return extracted_features
+    return extracted_features.iloc[extracted_features.index.get_indexer(window_ids)]
+
+
+def _roll_windows(data_frame, column_id, time_stamp, memory, window_ids):
+    """
+    Builds the frame roll_time_series returns, but only for the windows
+    ending at the rows identified by window_ids, the (id, time stamp)
+    pairs of these rows. Every window holds its last row and the memory
+    rows of the same id in front of it, so the size of the rolled frame
+    depends on the number of windows, not on the length of the history.
+    """
+    is_end = pd.MultiIndex.from_arrays(
+        [data_frame[column_id], data_frame[time_stamp]]
+    ).isin(window_ids)
+    ends = np.flatnonzero(is_end)
+
+    codes = pd.factorize(data_frame[column_id], use_na_sentinel=False)[0]
+    order = np.lexsort((data_frame[time_stamp].to_numpy(), codes))
+    sorted_codes = codes[order]
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    upper = rank[ends] + 1
+    group_begins = np.searchsorted(sorted_codes, codes[ends], side="left")
+    lower = np.maximum(upper - memory - 1, group_begins)
+
+    positions, windows = _gather_windows(order, lower, upper)
+
+    rolled = data_frame.iloc[positions].reset_index(drop=True)
+    rolled[column_id] = pd.Series(
+        list(
+            zip(
+                data_frame[column_id].iloc[ends[windows]],
+                data_frame[time_stamp].iloc[ends[windows]],
+            )
+        ),
+        dtype=object,
+    )
+    return rolled
+
+
+def _extract_windows(columns, dtypes, column_id, time_stamp, settings, colnames, rolled):
+    """
+    Runs on a Spark worker, once per bucket of windows, and extracts
+    their features, just like tsfresh.extract_features on the frame
+    returned by roll_time_series. Must be a module-level function, so
+    that it can be pickled. The features are returned as the columns
+    _f0, _f1, ..., in the order of colnames.
+    """
+    from .spark_backend import _restore_dtypes
+
+    rolled = rolled.sort_values(["_join_key", "_row_number"])
+
+    window_ids = _restore_dtypes(
+        rolled[["_window_id", "_window_time"]].reset_index(drop=True),
+        {"_window_id": dtypes[column_id], "_window_time": dtypes[time_stamp]},
+    )
+
+    frame = _restore_dtypes(rolled[columns].reset_index(drop=True), dtypes)
+    frame[column_id] = pd.Series(
+        list(zip(window_ids["_window_id"], window_ids["_window_time"])), dtype=object
+    )
+
+    extracted_features = _hide_warnings(tsfresh.extract_features)(
+        frame,
+        column_id=column_id,
+        column_sort=time_stamp,
+        distributor=MapDistributor(disable_progressbar=True),
+        **settings,
+    )
+
+    result = pd.DataFrame(
+        {
+            "_window_id": extracted_features.index.get_level_values(0),
+            "_window_time": extracted_features.index.get_level_values(1),
+        }
+    )
+    for i, col in enumerate(colnames):
+        result["_f" + str(i)] = extracted_features[col].to_numpy()
+    return result
+
 
 class TSFreshBuilder:
     """
@@ -44,8 +206,86 @@ class TSFreshBuilder:
         time_stamp: The name of the column containing the time stamps.
 
         target: The name of the target column.
+
+        n_jobs: The number of worker processes. None uses the tsfresh
+                default, 0 or 1 disable multiprocessing. The worker pool
+                is created once and serves roll_time_series as well as
+                the extraction, across fit and transform. Call close(),
+                or use the builder in a with statement, to shut it down.
+                Otherwise, it is shut down once the builder is garbage
+                collected.
+
+        chunksize: The number of time series each worker processes at
+                a time. None lets tsfresh choose.
+
+        dtype: The dtype the extracted features are cast to, for
+                instance np.float32, which halves their memory footprint.
+                None keeps float64.
+
+        distributor: A tsfresh distributor derived from
+                IterableDistributorBaseClass to use instead of the worker
+                pool the builder creates itself. The caller is
+                responsible for closing it.
+
+        output: What fit and transform return. "pandas" (the default)
+                returns a data frame, "columns" returns a dict mapping
+                the column names to NumPy arrays, which avoids building
+                a data frame, for instance to pass the features to
+                getml.data.DataFrame.from_dict. "arrow" returns a
+                pyarrow.Table, which to_getml sends to the getML engine
+                with the roles already set.
+
+        cache: A FeatureCache or the path of its directory. The extracted
+                feature matrices are stored there and reused whenever
+                the same data is passed to a builder with the same
+                parameters. None (the default) disables caching.
+
+        backend: "pandas" (the default) rolls and extracts with the
+                distributor. "spark" rolls with a window function and a
+                range join in Spark and extracts on buckets of windows
+                with applyInPandas, so that the rolled frame never has to
+                fit into the memory of this process and is spilled to
+                disk if needed. partial_transform always uses pandas.
+                Requires pyspark.
+
+        spark: The SparkSession used if backend="spark", or the URL of
+                the master to create one with. None (the default)
+                creates a session with master "local[*]", which uses all
+                cores of this machine.
+
+        selection_sample: The fraction (a float up to 1) or number of
+                rows the candidate features are extracted and selected
+                on. The windows of these rows still cover all of their
+                history. Only the calculators behind the num_features
+                selected features are then run on all windows, so fit
+                takes roughly as much less time as the share of rows
+                left out. None (the default) selects on all rows.
+
+        sampling: How the rows for selection_sample are drawn.
+                "stratified" (the default) draws the same share of rows
+                from every id at random, "time_blocked" draws blocks of
+                consecutive rows of an id.
+
+        max_rows_per_batch: The maximum number of rows the rolled
+                frame may have. If it would have more, the ids are split
+                into shards of at most max_rows_per_batch rolled rows,
+                which are rolled and extracted one after the other.
+                An id larger than that forms a shard on its own. In fit,
+                the candidate features of every shard are written to
+                memory-mapped files in spill_dir and the selection reads
+                them back in blocks of columns, so the full candidate
+                matrix is never in memory and peak memory stays flat
+                however many ids there are. The cache is not used in
+                that case. If backend="spark", it limits the size of the
+                buckets instead. None (the default) never shards.
+
+        spill_dir: The directory the candidate features are spilled to.
+                None uses the default temporary directory. The files are
+                deleted once fit is done.
     """
 
+    backends = ["pandas", "spark"]
+
     def __init__(
         self,
         num_features,
@@ -55,7 +295,47 @@ class TSFreshBuilder:
         target,
         horizon=0,
         allow_lagged_targets=False,
+        n_jobs=None,
+        chunksize=None,
+        distributor=None,
+        dtype=None,
+        output="pandas",
+        cache=None,
+        backend="pandas",
+        spark=None,
+        selection_sample=None,
+        sampling="stratified",
+        max_rows_per_batch=None,
+        spill_dir=None,
     ):
+        if output not in OUTPUTS:
+            raise ValueError(
+                "output must be one of " + str(OUTPUTS) + ", got " + repr(output) + "."
+            )
+
+        if backend not in self.backends:
+            raise ValueError(
+                "backend must be one of "
+                + str(self.backends)
+                + ", got "
+                + repr(backend)
+                + "."
+            )
+
+        if selection_sample is not None and selection_sample <= 0:
+            raise ValueError(
+                "selection_sample must be positive, got " + repr(selection_sample) + "."
+            )
+
+        if sampling not in SAMPLINGS:
+            raise ValueError(
+                "sampling must be one of "
+                + str(SAMPLINGS)
+                + ", got "
+                + repr(sampling)
+                + "."
+            )
+
         self.num_features = num_features
         self.memory = memory
         self.column_id = column_id
@@ -63,48 +343,347 @@ class TSFreshBuilder:
         self.target = target
         self.horizon = horizon
         self.allow_lagged_targets = allow_lagged_targets
+        self.n_jobs = n_jobs
+        self.chunksize = chunksize
+        self.distributor = distributor
+        self.dtype = dtype
+        self.output = output
+        self.cache = (
+            FeatureCache(cache)
+            if cache is not None and not isinstance(cache, FeatureCache)
+            else cache
+        )
+        self.backend = backend
+        self.spark = spark
+        self.selection_sample = selection_sample
+        self.sampling = sampling
+        self.max_rows_per_batch = max_rows_per_batch
+        self.spill_dir = spill_dir
 
         self._runtime = None
+        self._pool = None
+        self._pool_finalizer = None
 
         self.selected_features = []
+        self.kind_to_fc_parameters = None
+        self.replaced_values = None
 
-    @_hide_warnings
-    def _extract_features(self, data_frame):
-        df_rolled = roll_time_series(
+        self._history = {}
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        self._profiler = _StageProfiler()
+        self._profiles = {}
+
+    def _get_distributor(self, progressbar_title):
+        if self.distributor is not None:
+            return _SharedDistributor(self.distributor, progressbar_title)
+
+        if self._pool is None:
+            n_jobs = (
+                tsfresh.defaults.N_PROCESSES if self.n_jobs is None else self.n_jobs
+            )
+            self._pool = (
+                MapDistributor()
+                if n_jobs in (0, 1)
+                else MultiprocessingDistributor(n_workers=n_jobs)
+            )
+            # Shuts the pool down once the builder is garbage collected,
+            # if close has not been called by then.
+            self._pool_finalizer = weakref.finalize(self, self._pool.close)
+
+        return _SharedDistributor(self._pool, progressbar_title)
+
+    def close(self):
+        """
+        Shuts down the worker pool, if the builder has created one.
+        The builder creates a new one if it is used again.
+        """
+        if self._pool is not None:
+            self._pool_finalizer()
+            self._pool = None
+            self._pool_finalizer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _extract_features(self, data_frame, kind_to_fc_parameters=None, window_ids=None):
+        """
+        Extracts the features in a single pass. If kind_to_fc_parameters
+        is passed, only the calculators it contains are run. If window_ids
+        is passed, only the windows with these (id, time stamp) pairs are
+        extracted.
+
+        If there is a cache, the result is looked up there first, unless
+        window_ids is passed, which is only done for small increments.
+        """
+        if self.cache is None or window_ids is not None:
+            return self._compute_features(data_frame, kind_to_fc_parameters, window_ids)
+
+        key = self.cache.key(
             data_frame,
-            column_id=self.column_id,
-            column_sort=self.time_stamp,
-            max_timeshift=self.memory,
+            "tsfresh",
+            tsfresh.__version__,
+            pd.__version__,
+            np.__version__,
+            self.memory,
+            self.column_id,
+            self.time_stamp,
+            str(np.dtype(self.dtype or np.float64)),
+            kind_to_fc_parameters,
         )
 
-        extracted_minimal = tsfresh.extract_features(
-            df_rolled,
-            column_id=self.column_id,
-            column_sort=self.time_stamp,
-            default_fc_parameters=tsfresh.feature_extraction.MinimalFCParameters(),
+        def compute():
+            extracted_features = self._compute_features(data_frame, kind_to_fc_parameters)
+            return extracted_features, {
+                "replaced_values": self.replaced_values.to_dict()
+            }
+
+        extracted_features, meta, hit = self.cache.fetch(key, compute)
+
+        if hit:
+            self.cache_hits += 1
+            self._profiler.count("cache_hits", 1)
+        else:
+            self.cache_misses += 1
+            self._profiler.count("cache_misses", 1)
+
+        self.replaced_values = pd.Series(meta["replaced_values"], dtype=np.int64)
+
+        return extracted_features
+
+    @_hide_warnings
+    def _compute_features(self, data_frame, kind_to_fc_parameters=None, window_ids=None):
+        shards = (
+            self._make_id_shards(data_frame)
+            if self.backend != "spark" and window_ids is None
+            else []
         )
 
-        extracted_index_based = tsfresh.extract_features(
-            df_rolled,
-            column_id=self.column_id,
-            column_sort=self.time_stamp,
-            default_fc_parameters=tsfresh.feature_extraction.settings.IndexBasedFCParameters(),
+        if self.backend == "spark" and window_ids is None:
+            extracted_features = self._extract_features_spark(
+                data_frame, kind_to_fc_parameters
+            )
+        elif len(shards) > 1:
+            feature_matrices = []
+            self.replaced_values = 0
+            for matrix, replaced_values in self._extract_shards(
+                data_frame, shards, kind_to_fc_parameters
+            ):
+                feature_matrices.append(matrix)
+                self.replaced_values = self.replaced_values + replaced_values
+            return _in_original_order(
+                pd.concat(feature_matrices), data_frame, self.column_id, self.time_stamp
+            )
+        else:
+            extracted_features = self._extract_features_local(
+                data_frame, kind_to_fc_parameters, window_ids
+            )
+
+        extracted_features = self._sanitize(extracted_features, kind_to_fc_parameters)[0]
+
+        if window_ids is not None:
+            return extracted_features
+
+        return _in_original_order(
+            extracted_features, data_frame, self.column_id, self.time_stamp
         )
 
-        extracted_features = pd.concat(
-            [extracted_minimal, extracted_index_based], axis=1
+    def _sanitize(self, extracted_features, kind_to_fc_parameters):
+        with self._profiler.stage("sanitization"):
+            if kind_to_fc_parameters is None:
+                extracted_features = _order_columns(extracted_features)
+
+            extracted_features, self.replaced_values = _sanitize_features(
+                extracted_features, dtype=self.dtype
+            )
+
+        return extracted_features, self.replaced_values
+
+    def _make_id_shards(self, data_frame):
+        """
+        Splits the ids, in the order they first appear, into shards
+        of at most max_rows_per_batch rolled rows. Returns the ranges
+        of the codes pd.factorize assigns to the ids.
+        """
+        codes, uniques = pd.factorize(data_frame[self.column_id], use_na_sentinel=False)
+
+        if self.max_rows_per_batch is None:
+            return [(0, len(uniques))]
+
+        # Every row is the end of a window with at
+        # most memory rows in front of it.
+        counts = data_frame.groupby(codes, sort=False).cumcount().to_numpy()
+        rolled_rows_per_id = np.bincount(
+            codes, weights=np.minimum(counts, self.memory) + 1, minlength=len(uniques)
         )
-        del extracted_minimal
-        del extracted_index_based
 
-        gc.collect()
+        shards = list(_make_batches(rolled_rows_per_id, self.max_rows_per_batch))
 
-        extracted_features[np.isnan(extracted_features)] = 0.0
+        if len(shards) > 1:
+            print(
+                "The rolled data frame would have "
+                + str(int(rolled_rows_per_id.sum()))
+                + " rows, extracting "
+                + str(len(shards))
+                + " shards of at most "
+                + str(self.max_rows_per_batch)
+                + " rows..."
+            )
 
-        extracted_features[np.isinf(extracted_features)] = 0.0
+        return shards
+
+    def _extract_shards(self, data_frame, shards, kind_to_fc_parameters):
+        """
+        Rolls and extracts the shards one after the other and yields
+        their sanitized feature matrices and replaced values.
+        """
+        codes = pd.factorize(data_frame[self.column_id], use_na_sentinel=False)[0]
+        for begin, end in shards:
+            shard = data_frame[(codes >= begin) & (codes < end)]
+            extracted_features = self._extract_features_local(
+                shard, kind_to_fc_parameters, None
+            )
+            del shard
+            yield self._sanitize(extracted_features, kind_to_fc_parameters)
+            del extracted_features
+
+    def _extract_features_local(self, data_frame, kind_to_fc_parameters, window_ids):
+        with self._profiler.stage("rolling"):
+            if window_ids is None:
+                df_rolled = roll_time_series(
+                    data_frame,
+                    column_id=self.column_id,
+                    column_sort=self.time_stamp,
+                    max_timeshift=self.memory,
+                    chunksize=self.chunksize,
+                    distributor=self._get_distributor("Rolling"),
+                )
+            else:
+                df_rolled = _roll_windows(
+                    data_frame, self.column_id, self.time_stamp, self.memory, window_ids
+                )
+
+        self._profiler.count(
+            "population_rows",
+            len(data_frame) if window_ids is None else len(window_ids),
+        )
+        self._profiler.count("rolled_rows", len(df_rolled))
+
+        with self._profiler.stage("extraction"):
+            extracted_features = tsfresh.extract_features(
+                df_rolled,
+                column_id=self.column_id,
+                column_sort=self.time_stamp,
+                default_fc_parameters=(
+                    _merge_settings() if kind_to_fc_parameters is None else None
+                ),
+                kind_to_fc_parameters=kind_to_fc_parameters,
+                chunksize=self.chunksize,
+                distributor=self._get_distributor("Feature Extraction"),
+            )
+
+            del df_rolled
+            gc.collect()
 
         return extracted_features
 
+    def _extract_features_spark(self, data_frame, kind_to_fc_parameters):
+        # pyspark is only needed, and therefore only imported, here.
+        from .spark_backend import (
+            _apply_to_buckets,
+            _get_spark_session,
+            _make_schema,
+            _num_buckets,
+            _restore_dtypes,
+            _roll_by_rows,
+            _to_spark,
+        )
+
+        spark = _get_spark_session(self.spark)
+
+        settings = dict(
+            default_fc_parameters=(
+                _merge_settings() if kind_to_fc_parameters is None else None
+            ),
+            kind_to_fc_parameters=kind_to_fc_parameters,
+        )
+
+        # tsfresh builds the same columns for every window, so
+        # extracting a single one tells us the columns of the result.
+        first = data_frame.iloc[:1].copy()
+        first[self.column_id] = pd.Series(
+            [(first[self.column_id].iloc[0], first[self.time_stamp].iloc[0])],
+            index=first.index,
+            dtype=object,
+        )
+        colnames = list(
+            tsfresh.extract_features(
+                first,
+                column_id=self.column_id,
+                column_sort=self.time_stamp,
+                distributor=MapDistributor(disable_progressbar=True),
+                **settings,
+            ).columns
+        )
+
+        counts = data_frame.groupby(self.column_id, sort=False).cumcount().to_numpy()
+        num_rolled = int(np.sum(np.minimum(counts, self.memory) + 1))
+        self._profiler.count("population_rows", data_frame.shape[0])
+        self._profiler.count("rolled_rows", num_rolled)
+
+        data, dtypes = _to_spark(spark, data_frame)
+
+        # Spark is lazy, so the rolling is part of the extraction stage.
+        rolled = _roll_by_rows(data, self.column_id, self.time_stamp, self.memory)
+
+        extract = functools.partial(
+            _extract_windows,
+            list(data_frame.columns),
+            dtypes,
+            self.column_id,
+            self.time_stamp,
+            settings,
+            colnames,
+        )
+
+        schema = _make_schema(
+            {
+                "_window_id": dtypes[self.column_id],
+                "_window_time": dtypes[self.time_stamp],
+                **{"_f" + str(i): np.dtype(np.float64) for i in range(len(colnames))},
+            }
+        )
+
+        print("Extracting features with Spark...")
+
+        with self._profiler.stage("extraction"):
+            result = _apply_to_buckets(
+                rolled,
+                extract,
+                schema,
+                _num_buckets(spark, num_rolled, self.max_rows_per_batch),
+            ).toPandas()
+
+        result = _restore_dtypes(
+            result,
+            {
+                "_window_id": dtypes[self.column_id],
+                "_window_time": dtypes[self.time_stamp],
+            },
+        )
+
+        return (
+            result.set_index(["_window_id", "_window_time"])
+            .rename_axis([None, None])
+            .set_axis(colnames, axis=1)
+            .sort_index()
+        )
+
     def _remove_target_column(self, data_frame):
         colnames = np.asarray(data_frame.columns)
 
@@ -124,24 +703,81 @@ class TSFreshBuilder:
 
         colnames = np.asarray(df_selected.columns)
 
-        correlations = np.asarray(
-            [np.abs(pearsonr(target, df_selected[col]))[0] for col in colnames]
-        )
+        correlations, _ = _correlate_columns(df_selected, target)
 
-        # [::-1] is somewhat unintuitive syntax,
-        # but it reverses the entire column.
-        self.selected_features = colnames[np.argsort(correlations)][::-1][
+        # A stable sort ranks ties in the order of the columns. Otherwise,
+        # their order would depend on the values of the other columns.
+        self.selected_features = colnames[np.argsort(-correlations, kind="stable")][
             : self.num_features
         ]
 
         return df_selected[self.selected_features]
 
+    def _select_on_sample(self, data_frame, target):
+        """
+        Extracts the candidate features for the windows ending at a
+        sample of the rows and selects the best of them.
+        """
+        rows = _draw_selection_sample(
+            data_frame,
+            self.column_id,
+            self.time_stamp,
+            self.selection_sample,
+            self.sampling,
+        )
+
+        print(
+            "Selecting on a sample of "
+            + str(len(rows))
+            + " out of "
+            + str(data_frame.shape[0])
+            + " rows..."
+        )
+
+        self._profiler.count("sampled_rows", len(rows))
+
+        window_ids = list(
+            zip(
+                data_frame[self.column_id].iloc[rows],
+                data_frame[self.time_stamp].iloc[rows],
+            )
+        )
+
+        df_extracted = self._extract_features(data_frame, window_ids=window_ids).loc[
+            window_ids
+        ]
+
+        self._profiler.count("candidate_features", df_extracted.shape[1])
+
+        with self._profiler.stage("selection"):
+            self._select_features(df_extracted, target[rows])
+
+    def _extract_selected(self, data_frame):
+        """
+        Extracts the selected features for all rows. If no feature has
+        been selected, there is nothing to extract, so the calculators
+        are not run at all, which an empty kind_to_fc_parameters would
+        not guarantee.
+        """
+        if len(self.selected_features) == 0:
+            return pd.DataFrame(index=data_frame.index)
+
+        df_extracted = self._extract_features(data_frame, self.kind_to_fc_parameters)
+
+        return df_extracted[self.selected_features]
+
     def fit(self, data_frame):
         """
         Fits the features.
+
+        If selection_sample is passed, the features are selected on a
+        sample of the rows and only the selected features are
+        calculated for all of them.
         """
         begin = time.time()
 
+        self._profiler = _StageProfiler()
+
         target = np.asarray(data_frame[self.target])
 
         df_for_extraction = (
@@ -150,14 +786,43 @@ class TSFreshBuilder:
             else self._remove_target_column(data_frame)
         )
 
-        df_extracted = self._extract_features(df_for_extraction)
+        shards = (
+            self._make_id_shards(df_for_extraction)
+            if self.selection_sample is None and self.backend != "spark"
+            else []
+        )
 
-        df_selected = self._select_features(df_extracted, target)
+        if len(shards) > 1:
+            df_selected = self._select_out_of_core(df_for_extraction, shards, target)
+
+            self.kind_to_fc_parameters = from_columns(self.selected_features)
+        elif self.selection_sample is None:
+            df_extracted = self._extract_features(df_for_extraction)
+
+            self._profiler.count("candidate_features", df_extracted.shape[1])
+
+            with self._profiler.stage("selection"):
+                df_selected = self._select_features(df_extracted, target)
+
+            self.kind_to_fc_parameters = from_columns(self.selected_features)
+
+            del df_extracted
+        else:
+            self._select_on_sample(df_for_extraction, target)
+
+            self.kind_to_fc_parameters = from_columns(self.selected_features)
+
+            df_selected = self._extract_selected(df_for_extraction)
+
+        self._profiler.count("selected_features", len(self.selected_features))
+        self._history = {}
 
-        del df_extracted
         gc.collect()
 
-        df_selected = _add_original_columns(data_frame, df_selected)
+        with self._profiler.stage("add_original_columns"):
+            df_selected = _add_original_columns(data_frame, df_selected, self.output)
+
+        self._profiles["fit"] = self._profiler.to_dict()
 
         end = time.time()
 
@@ -165,29 +830,283 @@ class TSFreshBuilder:
 
         _print_time_taken(begin, end)
 
+        if self.cache is not None:
+            _print_cache_stats(self.cache_hits, self.cache_misses)
+
         return df_selected
 
+    def _select_out_of_core(self, data_frame, shards, target):
+        """
+        Extracts the candidate features shard by shard, spills them to
+        disk and selects the best of them, reading them back in blocks
+        of columns. Returns the selected features, in the order of
+        the rows of data_frame.
+        """
+        spill = _FeatureSpill(self.spill_dir)
+
+        try:
+            self.replaced_values = 0
+
+            for matrix, replaced_values in self._extract_shards(
+                data_frame, shards, None
+            ):
+                with self._profiler.stage("spill"):
+                    spill.append(matrix)
+                self.replaced_values = self.replaced_values + replaced_values
+                del matrix
+                gc.collect()
+
+            self._profiler.count("candidate_features", len(spill.columns))
+
+            # The shards are in the order of the ids, but the target is in the
+            # order of the rows, so every stored row is read into the row
+            # of data_frame its window ends at.
+            index = spill.index
+            destination = pd.MultiIndex.from_arrays(
+                [data_frame[self.column_id], data_frame[self.time_stamp]]
+            ).get_indexer(index)
+
+            # A block has at most as many values as the
+            # rolled frame of a shard has rows.
+            block_columns = max(1, self.max_rows_per_batch // max(len(index), 1))
+
+            with self._profiler.stage("selection"):
+                print(
+                    "Selecting the best out of "
+                    + str(len(spill.columns))
+                    + " features..."
+                )
+
+                relevance_table = _relevance_table(
+                    spill.blocks(spill.columns, block_columns, destination),
+                    pd.Series(target),
+                )
+
+                colnames = np.asarray(
+                    relevance_table[relevance_table.relevant].feature, dtype=object
+                )
+
+                correlations = np.concatenate(
+                    [np.zeros(0)]
+                    + [
+                        _correlate_columns(block, target)[0]
+                        for block in spill.blocks(colnames, block_columns, destination)
+                    ]
+                )
+
+                self.selected_features = colnames[
+                    np.argsort(-correlations, kind="stable")
+                ][: self.num_features]
+
+            return spill.read(self.selected_features, destination).set_axis(
+                index[np.argsort(destination)]
+            )
+
+        finally:
+            spill.close()
+
+    def fit_many(self, data_frame, pairs):
+        """
+        Fits one selection per (target, horizon) pair in pairs.
+
+        The windows only depend on memory, so the candidate features are
+        rolled and extracted once and only the selection runs once per
+        pair. All targets are left out of the extraction, unless
+        allow_lagged_targets is set, so that no target ends up in the
+        features of another one. The builder itself is not fitted.
+
+        Returns two dicts, both keyed by the pairs: the fitted copies
+        of the builder, which have the target and horizon of their pair,
+        and their features for the training set.
+
+        Args:
+
+            data_frame: The data frame to fit on, containing all targets.
+
+            pairs: The (target, horizon) pairs, for instance
+                [("y", 0), ("y", 20)].
+        """
+        pairs = list(dict.fromkeys(tuple(pair) for pair in pairs))
+
+        if not pairs:
+            raise ValueError("pairs must contain at least one (target, horizon) pair.")
+
+        if self.selection_sample is not None:
+            raise ValueError("fit_many does not support selection_sample.")
+
+        targets = list(dict.fromkeys(target for target, _ in pairs))
+
+        begin = time.time()
+
+        self._profiler = _StageProfiler()
+
+        df_for_extraction = (
+            data_frame
+            if self.allow_lagged_targets
+            else data_frame[[col for col in data_frame.columns if col not in targets]]
+        )
+
+        df_extracted = self._extract_features(df_for_extraction)
+
+        self._profiler.count("candidate_features", df_extracted.shape[1])
+
+        builders = {}
+        features_train = {}
+
+        for target, horizon in pairs:
+            builder = copy.copy(self)
+            builder.target = target
+            builder.horizon = horizon
+            builder._history = {}
+            builder._profiles = {}
+
+            # Every copy creates a worker pool of its own, once it needs
+            # one, so that closing one builder does not break the others.
+            builder._pool = None
+            builder._pool_finalizer = None
+
+            with self._profiler.stage("selection"):
+                df_selected = builder._select_features(
+                    df_extracted, np.asarray(data_frame[target])
+                )
+
+            self._profiler.count("selected_features", len(builder.selected_features))
+
+            builder.kind_to_fc_parameters = from_columns(builder.selected_features)
+
+            with self._profiler.stage("add_original_columns"):
+                features_train[(target, horizon)] = _add_original_columns(
+                    data_frame, df_selected, self.output
+                )
+
+            builders[(target, horizon)] = builder
+
+        del df_extracted
+        gc.collect()
+
+        self._profiles["fit_many"] = self._profiler.to_dict()
+
+        end = time.time()
+
+        _print_time_taken(begin, end)
+
+        if self.cache is not None:
+            _print_cache_stats(self.cache_hits, self.cache_misses)
+
+        for builder in builders.values():
+            builder._profiler = _StageProfiler()
+            builder._runtime = datetime.timedelta(seconds=end - begin)
+
+        return builders, features_train
+
     @property
     def runtime(self):
         return self._runtime
 
+    @property
+    def profile(self):
+        """
+        The profiles of the last calls to fit, fit_many, transform and
+        partial_transform, keyed by the name of the method.
+
+        Every profile contains the total wall time and, for every stage
+        (rolling, extraction, sanitization, selection and
+        add_original_columns), the wall time, CPU time and peak memory.
+        The CPU time includes the worker processes that have finished,
+        the peak memory only covers this process. The counters contain
+        the number of population and rolled rows, the average window
+        size, the number of sampled rows, candidate and selected
+        features and the cache hits and misses. Times are in seconds, memory is in bytes.
+        Can be passed to Benchmark.ingest.
+        """
+        return self._profiles
+
     def transform(self, data_frame):
         """
         Transforms the raw data into a set of features.
+
+        Only the calculators behind the features selected by fit
+        are run.
         """
+        self._profiler = _StageProfiler()
+
         df_for_extraction = (
             data_frame
             if self.allow_lagged_targets
             else self._remove_target_column(data_frame)
         )
 
-        df_extracted = self._extract_features(df_for_extraction)
+        df_selected = self._extract_selected(df_for_extraction)
 
-        df_selected = df_extracted[self.selected_features]
+        self._profiler.count("selected_features", len(self.selected_features))
 
-        del df_extracted
         gc.collect()
 
-        df_selected = _add_original_columns(data_frame, df_selected)
+        with self._profiler.stage("add_original_columns"):
+            df_selected = _add_original_columns(data_frame, df_selected, self.output)
+
+        self._profiles["transform"] = self._profiler.to_dict()
+
+        return df_selected
+
+    def partial_transform(self, new_rows):
+        """
+        Calculates the features selected by fit for new rows, which
+        are appended to the rows passed to previous calls.
+
+        Only the last memory rows of every id are kept, so the time per
+        call depends on the number of new rows, but not on the length of
+        the history, and only the windows ending at the new rows are
+        extracted. The rows of every id must arrive in the order of their
+        time stamps. The result matches that of transform on all rows
+        passed so far, in the order of new_rows. fit resets the history.
+        """
+        if self.kind_to_fc_parameters is None:
+            raise ValueError("The builder must be fitted before partial_transform.")
+
+        self._profiler = _StageProfiler()
+
+        df_for_extraction = (
+            new_rows
+            if self.allow_lagged_targets
+            else self._remove_target_column(new_rows)
+        )
+
+        # The history is kept per id, because other ids
+        # do not affect the windows of the new rows.
+        ids = df_for_extraction[self.column_id].unique()
+        history = [self._history[key] for key in ids if key in self._history]
+        data_frame = pd.concat(history + [df_for_extraction], ignore_index=True)
+
+        window_ids = list(
+            zip(df_for_extraction[self.column_id], df_for_extraction[self.time_stamp])
+        )
+
+        if len(self.selected_features) == 0:
+            df_selected = pd.DataFrame(index=new_rows.index)
+        else:
+            df_extracted = self._extract_features(
+                data_frame, self.kind_to_fc_parameters, window_ids
+            )
+            df_selected = df_extracted.loc[
+                window_ids, self.selected_features
+            ].set_axis(new_rows.index)
+
+        for key in ids:
+            self._history.pop(key, None)
+
+        recent = (
+            data_frame.sort_values(self.time_stamp, kind="stable")
+            .groupby(self.column_id, sort=False)
+            .tail(self.memory)
+        )
+
+        for key, rows_of_id in recent.groupby(self.column_id, sort=False):
+            self._history[key] = rows_of_id
+
+        with self._profiler.stage("add_original_columns"):
+            df_selected = _add_original_columns(new_rows, df_selected, self.output)
+
+        self._profiles["partial_transform"] = self._profiler.to_dict()
 
         return df_selected
@@ -1,7 +1,6 @@
 
 import json
 import numpy as np
-from torch_geometric.datasets import Planetoid
 
 
 def run_zuordnung(getml_word_data):
@@ -11,41 +10,51 @@ def run_zuordnung(getml_word_data):
     It turns out there is a perfect match between both sources and every observation in one source finds its counterpart in the other source.
     """
 
+    # torch_geometric is only needed, and therefore only imported, here.
+    from torch_geometric.datasets import Planetoid
+
     getml_word_data = getml_word_data.to_pandas()
 
     gnn_word_data = Planetoid(name="Cora", root="")
 
-    zuordnung = []
-    for getml_idx in getml_word_data["paper_id"].unique():
-        getml_positions = [
-            int(ele[4:])
-            for ele in getml_word_data[getml_word_data["paper_id"] == getml_idx][
-                "word_cited_id"
-            ].values
-        ]
-        getml_positions = np.sort(getml_positions)
-
-        getml_words_pattern = [
-            j - i for i, j in zip(getml_positions[:-1], getml_positions[1:])
-        ]
-
-        for gnn_idx in range(len(gnn_word_data[0].x)):
-            gnn_positions = [
-                i
-                for i, x in enumerate(
-                    [int(x) for x in list(gnn_word_data[0].x[gnn_idx])]
-                )
-                if x == 1
-            ]
-            gnn_words_pattern = [
-                j - i for i, j in zip(gnn_positions[:-1], gnn_positions[1:])
-            ]
-
-            if gnn_words_pattern == getml_words_pattern:
-                match = (int(getml_idx), gnn_idx)
-                zuordnung.append(match)
-                break
+    getml_patterns = _getml_patterns(getml_word_data)
+
+    # The feature matrix is converted to NumPy once, instead
+    # of converting one row at a time for every paper.
+    gnn_patterns = _gnn_patterns(gnn_word_data[0].x.numpy())
+
+    zuordnung, unmatched, ambiguous = _match_patterns(getml_patterns, gnn_patterns)
+
+    matched = {}
+    for getml_idx, gnn_idx in zuordnung:
+        matched.setdefault(gnn_idx, []).append(getml_idx)
+    duplicates = {
+        gnn_idx: getml_indices
+        for gnn_idx, getml_indices in matched.items()
+        if len(getml_indices) > 1
+    }
+
+    print(
+        "Matched "
+        + str(len(zuordnung))
+        + " of "
+        + str(len(getml_patterns))
+        + " papers."
+    )
+
+    if unmatched:
+        print("No match for " + str(len(unmatched)) + " papers: " + str(unmatched))
+
+    if ambiguous:
+        print(
+            "Ambiguous match for "
+            + str(len(ambiguous))
+            + " papers, the first GNN row has been used: "
+            + str(ambiguous)
+        )
 
+    if duplicates:
+        print("GNN rows matched by more than one paper: " + str(duplicates))
 
     with open('assets/zuordnung.json', 'w') as file:
         print("Writing to file")
@@ -54,3 +63,76 @@ def run_zuordnung(getml_word_data):
 
     print(zuordnung)
 
+
+def _match_patterns(getml_patterns, gnn_patterns):
+    """
+    Matches every paper to the first GNN row with the same pattern.
+
+    Returns the (paper_id, GNN row) pairs, the paper_ids without a match
+    and the papers matching several GNN rows, along with these rows.
+    """
+    # Maps every pattern to the GNN rows sharing it.
+    gnn_index = {}
+    for gnn_idx, pattern in enumerate(gnn_patterns):
+        gnn_index.setdefault(pattern, []).append(gnn_idx)
+
+    zuordnung = []
+    unmatched = []
+    ambiguous = []
+    for getml_idx, pattern in getml_patterns.items():
+        gnn_indices = gnn_index.get(pattern)
+        if gnn_indices is None:
+            unmatched.append(int(getml_idx))
+            continue
+        if len(gnn_indices) > 1:
+            ambiguous.append((int(getml_idx), gnn_indices))
+        # Just like a linear scan, we take the first row that matches.
+        zuordnung.append((int(getml_idx), gnn_indices[0]))
+
+    return zuordnung, unmatched, ambiguous
+
+
+def _to_pattern(positions):
+    """
+    The differences between adjacent word indices, as bytes,
+    so that they can be used as a key.
+    """
+    return np.diff(positions).astype(np.int64).tobytes()
+
+
+def _getml_patterns(getml_word_data):
+    """
+    Returns a dict mapping every paper_id to its pattern, in the
+    order the papers first appear in.
+    """
+    paper_ids = getml_word_data["paper_id"].to_numpy()
+    positions = getml_word_data["word_cited_id"].str[4:].astype(np.int64).to_numpy()
+
+    order = np.lexsort((positions, paper_ids))
+    paper_ids, positions = paper_ids[order], positions[order]
+
+    bounds = np.flatnonzero(paper_ids[1:] != paper_ids[:-1]) + 1
+    begins = np.concatenate([[0], bounds])
+    ends = np.concatenate([bounds, [len(paper_ids)]])
+
+    patterns = {
+        paper_ids[begin]: _to_pattern(positions[begin:end])
+        for begin, end in zip(begins, ends)
+    }
+
+    return {
+        paper_id: patterns[paper_id]
+        for paper_id in getml_word_data["paper_id"].unique()
+    }
+
+
+def _gnn_patterns(gnn_x):
+    """
+    Returns the pattern of every row of the one-hot-encoded word matrix.
+    """
+    rows, positions = np.nonzero(gnn_x == 1)
+    bounds = np.searchsorted(rows, np.arange(gnn_x.shape[0] + 1))
+    return [
+        _to_pattern(positions[begin:end])
+        for begin, end in zip(bounds[:-1], bounds[1:])
+    ]